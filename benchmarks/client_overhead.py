@@ -0,0 +1,168 @@
+"""
+Micro-benchmark of the Gemini clients' per-call CPU overhead.
+
+The backend answers instantly with a fixed, schema-valid response, so the
+timings cover only client work: request config, response-cache key,
+response validation and, for multi-report requests, splitting the batch.
+Each scenario runs twice:
+
+- before: output schema and validator rebuilt for every request, and batch
+  items re-validated through ``model_dump``/``model_validate`` (the
+  behaviour before ``OutputSpec``)
+- after: the client's cached ``OutputSpec``
+
+Example:
+    python benchmarks/client_overhead.py --calls 2000 --output runs/client_overhead.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pydantic import BaseModel
+from rich.console import Console
+from rich.table import Table
+
+from bikeclf.base_client import BaseGeminiClient, OutputSpec
+from bikeclf.cache import ResponseCache
+from bikeclf.config import APIConfig
+from bikeclf.gemini_client import FusedGeminiClient, GeminiClient
+from bikeclf.phase2.gemini_client import Phase2GeminiClient
+from bikeclf.rate_limit import RateLimiter
+
+MODEL = "gemini-2.5-flash-lite"
+BATCH_SIZE = 10
+PROMPT = "Du klassifizierst Meldungen. " * 100 + "Betreff: Scherben auf dem Radweg"
+
+PHASE1_ANSWER = {"label": "true", "evidence": ["Scherben auf dem Radweg"], "reasoning": "Radweg erwähnt.", "confidence": 0.9}
+PHASE2_ANSWER = {
+    "category": "Müll / Scherben / Splitter (Sharp objects & debris)",
+    "evidence": ["Scherben"],
+    "reasoning": "Scherben auf dem Radweg.",
+    "confidence": 0.85,
+}
+FUSED_ANSWER = {**PHASE1_ANSWER, "issue": PHASE2_ANSWER}
+
+console = Console()
+
+
+class CannedBackend:
+    """``genai.Client`` stand-in that returns the same response instantly."""
+
+    def __init__(self, answer: Any):
+        self.models = self
+        self.response = SimpleNamespace(text=json.dumps(answer, ensure_ascii=False), usage_metadata=None)
+
+    def generate_content(self, model: str, contents: Any, config: Any = None):
+        return self.response
+
+
+class PerCallSpec(OutputSpec):
+    """Pre-``OutputSpec`` behaviour: batch items are dumped and re-validated."""
+
+    def from_validated(self, instance: BaseModel):
+        return self.model.model_validate(instance.model_dump(exclude={"id"}))
+
+
+def make_client(client_class, answer: Any, cache_dir: Path = None, before: bool = False) -> BaseGeminiClient:
+    cache = ResponseCache(cache_dir / "responses.sqlite") if cache_dir else None
+    client = client_class(
+        APIConfig(api_key="", backend="fake"),
+        rate_limiter=RateLimiter(),
+        cache=cache,
+        backend=CannedBackend(answer),
+    )
+    if before:
+        # Build the schema and validator for every request, as before
+        client.output_spec = PerCallSpec
+    return client
+
+
+def per_call_us(call: Callable[[], Any], calls: int, repeats: int) -> float:
+    """Median microseconds per call over ``repeats`` rounds of ``calls`` calls."""
+    call()  # Warm up (schema build, cache entry, imports)
+    rounds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        rounds.append((time.perf_counter() - start) / calls * 1e6)
+    return statistics.median(rounds)
+
+
+def scenarios(tmp: Path) -> Dict[str, Callable[[bool], Callable[[], Any]]]:
+    """Scenario name -> factory building the call to time (before or after)."""
+    ids = [str(i) for i in range(BATCH_SIZE)]
+    prompts = {item_id: f"{PROMPT} {item_id}" for item_id in ids}
+
+    def classify(client_class, answer):
+        def factory(before: bool):
+            client = make_client(client_class, answer, before=before)
+            return lambda: client.classify(PROMPT, MODEL)
+        return factory
+
+    def cache_hit(before: bool):
+        client = make_client(GeminiClient, PHASE1_ANSWER, cache_dir=tmp / f"cache-{before}", before=before)
+        return lambda: client.classify(PROMPT, MODEL)
+
+    def batch(before: bool):
+        answer = {"results": [{"id": item_id, **PHASE1_ANSWER} for item_id in ids]}
+        client = make_client(GeminiClient, answer, before=before)
+        return lambda: client.classify_many(PROMPT, prompts, MODEL)
+
+    return {
+        "phase1 classify": classify(GeminiClient, PHASE1_ANSWER),
+        "phase2 classify": classify(Phase2GeminiClient, PHASE2_ANSWER),
+        "fused classify": classify(FusedGeminiClient, FUSED_ANSWER),
+        "phase1 cache hit": cache_hit,
+        f"phase1 batch of {BATCH_SIZE}": batch,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure per-call client overhead before and after schema caching")
+    parser.add_argument("--calls", type=int, default=2000, help="Calls per timing round")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing rounds (the median is reported)")
+    parser.add_argument("--output", type=Path, default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, factory in scenarios(Path(tmp)).items():
+            console.print(f"[blue]Running {name}...[/blue]")
+            before = per_call_us(factory(True), args.calls, args.repeats)
+            after = per_call_us(factory(False), args.calls, args.repeats)
+            results.append(
+                {
+                    "scenario": name,
+                    "before_us": round(before, 1),
+                    "after_us": round(after, 1),
+                    "speedup": round(before / after, 2),
+                }
+            )
+
+    table = Table(title="Client overhead per call (µs, canned backend)")
+    table.add_column("Scenario", style="cyan")
+    table.add_column("Before", justify="right")
+    table.add_column("After", justify="right")
+    table.add_column("Speedup", justify="right")
+    for r in results:
+        table.add_row(r["scenario"], f"{r['before_us']:.1f}", f"{r['after_us']:.1f}", f"{r['speedup']:.1f}×")
+    console.print(table)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"settings": {k: str(v) for k, v in vars(args).items()}, "results": results}
+        args.output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        console.print(f"[green]✓ Results written to {args.output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
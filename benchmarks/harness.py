@@ -0,0 +1,137 @@
+"""Shared helpers for the offline benchmark suite."""
+import csv
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import httpx
+
+from bikeclf.fake_backend import LatencyModel
+from bikeclf.timing import percentile
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SAMPLE_EVENTS_CSV = PROJECT_ROOT / "data" / "supabase_test_200.csv"
+
+
+@dataclass
+class BenchResult:
+    """Outcome of one benchmark scenario."""
+
+    scenario: str
+    events: int
+    seconds: float
+    latencies_ms: List[float] = field(default_factory=list, repr=False)
+    attempts: List[int] = field(default_factory=list, repr=False)
+    errors: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def events_per_sec(self) -> float:
+        return self.events / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serializable summary with throughput, percentiles and retry rates."""
+        data = asdict(self)
+        del data["latencies_ms"], data["attempts"]
+        data["events_per_sec"] = round(self.events_per_sec, 2)
+        data["latency_ms"] = {}
+        for q in (50, 95, 99):
+            value = percentile(self.latencies_ms, q)
+            data["latency_ms"][f"p{q}"] = round(value, 1) if value is not None else None
+        calls = sum(self.attempts)
+        data["retry_rate"] = (
+            round(sum(1 for a in self.attempts if a > 1) / len(self.attempts), 4)
+            if self.attempts
+            else None
+        )
+        data["extra_attempts_per_event"] = (
+            round((calls - len(self.attempts)) / len(self.attempts), 4) if self.attempts else None
+        )
+        return data
+
+
+class Stopwatch:
+    """Context manager measuring wall-clock seconds."""
+
+    def __enter__(self) -> "Stopwatch":
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.seconds = time.perf_counter() - self.start
+
+
+def load_sample_events(count: int, path: Path = SAMPLE_EVENTS_CSV) -> List[Dict[str, str]]:
+    """Load ``count`` Supabase-shaped events, cycling the sample CSV with unique IDs.
+
+    Args:
+        count: Number of events to return
+        path: CSV with id, subject, description and service_name columns
+
+    Returns:
+        Event dicts usable by both pipelines' ``classify_batch``
+    """
+    with open(path, "r", encoding="utf-8", newline="") as handle:
+        rows = [row for row in csv.DictReader(handle) if row.get("description")]
+
+    events = []
+    for i in range(count):
+        row = rows[i % len(rows)]
+        event_id = row["id"] if i < len(rows) else f"{row['id']}-{i // len(rows)}"
+        events.append(
+            {
+                "id": event_id,
+                "service_request_id": event_id,
+                "subject": row["subject"],
+                "title": row["subject"],
+                "description": row["description"],
+                "service_name": row.get("service_name", ""),
+                "category": row.get("service_name", ""),
+                "subcategory": "NULL",
+                "subcategory2": "NULL",
+            }
+        )
+    return events
+
+
+class SimulatedPostgREST(httpx.BaseTransport):
+    """httpx transport acknowledging every write after a simulated latency."""
+
+    def __init__(self, latency: LatencyModel, per_row_ms: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.per_row_ms = per_row_ms
+        self.request_latencies_ms: List[float] = []
+        self.rows_written = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.read() or b"null")
+        rows = body["rows"] if isinstance(body, dict) and "rows" in body else body or []
+        with self._lock:
+            latency_ms = self.latency.sample(self._rng) + self.per_row_ms * len(rows)
+        time.sleep(latency_ms / 1000)
+        with self._lock:
+            self.request_latencies_ms.append(latency_ms)
+            self.rows_written += len(rows)
+        return httpx.Response(201, json=[])
+
+
+def attempts_and_latencies(predictions: Iterable[dict]) -> Dict[str, List[float]]:
+    """Collect per-event latency and attempts from prediction dicts."""
+    latencies, attempts = [], []
+    for pred in predictions:
+        meta = pred["meta"]
+        latencies.append(meta["latency_ms"])
+        attempts.append(meta["attempts"])
+    return {"latencies_ms": latencies, "attempts": attempts}
+
+
+def stage_seconds(summary: Dict[str, Any]) -> Dict[str, float]:
+    """Total seconds per stage from a ``Timings.summary()`` (or timings.json)."""
+    return {stage: data["total_seconds"] for stage, data in summary["stages"].items()}
@@ -0,0 +1,275 @@
+"""
+Offline benchmarks for the classification pipelines.
+
+Every scenario runs against the simulated Gemini API (``FakeBackend``) and a
+simulated PostgREST endpoint, so no API key, network or database is needed
+and results are comparable between runs:
+
+- phase1-batch / phase2-batch: ``classify_batch`` of the Supabase pipelines
+- phase1-eval / phase2-eval: the ``evaluate`` CLI commands (--no-cache)
+- phase1-write / phase2-write: chunked Supabase write-back of the predictions
+
+Reports events/sec, p50/p95/p99 LLM latency per event and retry rates.
+
+Example:
+    python benchmarks/run_benchmarks.py --events 400 --concurrency 16 \\
+        --fake-backend "latency=lognormal:300:0.4,throttle_every=200,throttle_burst=8"
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from rich.console import Console
+from rich.table import Table
+from typer.testing import CliRunner
+
+import run_supabase_pipeline as phase1_pipeline
+from benchmarks.harness import (
+    BenchResult,
+    SimulatedPostgREST,
+    Stopwatch,
+    attempts_and_latencies,
+    load_sample_events,
+    stage_seconds,
+)
+from bikeclf.config import APIConfig
+from bikeclf.fake_backend import FakeBackend, FakeBackendConfig, LatencyModel
+from bikeclf.gemini_client import GeminiClient
+from bikeclf.io import read_predictions_jsonl
+from bikeclf.phase1 import eval as phase1_eval
+from bikeclf.phase1.prompt_loader import load_prompt
+from bikeclf.phase2 import eval as phase2_eval
+from bikeclf.phase2 import pipeline as phase2_pipeline
+from bikeclf.phase2.gemini_client import Phase2GeminiClient
+from bikeclf.phase2.prompt_loader import load_prompt as load_phase2_prompt
+from bikeclf.supabase import SupabaseClient
+from bikeclf.timing import Timings, recording
+from bikeclf.usage import UsageMeter, metering
+
+DEFAULT_FAKE_BACKEND = "latency=lognormal:300:0.4,throttle_every=200,throttle_burst=8,malformed_rate=0.01,invalid_rate=0.01"
+MODEL = "gemini-2.5-flash-lite"
+SCENARIOS = ["phase1-batch", "phase2-batch", "phase1-eval", "phase2-eval", "phase1-write", "phase2-write"]
+
+console = Console()
+
+
+def make_client(client_class, args: argparse.Namespace):
+    """Client on a fresh fake backend (no cache, no rate budget)."""
+    backend = FakeBackend(FakeBackendConfig.parse(args.fake_backend))
+    config = APIConfig(api_key="", backend="fake", backoff_base_seconds=args.backoff_base)
+    return client_class(config, backend=backend), backend
+
+
+def bench_phase1_batch(args: argparse.Namespace, state: Dict) -> BenchResult:
+    client, backend = make_client(GeminiClient, args)
+    system_prompt, prompt_hash = load_prompt(args.phase1_prompt)
+    events = load_sample_events(args.events)
+    with Stopwatch() as watch, recording(Timings()) as timings, metering(UsageMeter()) as meter, contextlib.redirect_stdout(io.StringIO()):
+        predictions, errors = phase1_pipeline.classify_batch(
+            client,
+            system_prompt,
+            prompt_hash,
+            events,
+            args.phase1_prompt,
+            MODEL,
+            0.0,
+            concurrency=args.concurrency,
+            reports_per_request=args.reports_per_request,
+        )
+    state["phase1_predictions"] = predictions
+    return BenchResult(
+        "phase1-batch",
+        len(events),
+        watch.seconds,
+        errors=len(errors),
+        extra={
+            "backend": dict(backend.stats),
+            "stage_seconds": stage_seconds(timings.summary()),
+            "tokens_per_event": meter.summary(events=len(events))["tokens_per_event"],
+        },
+        **attempts_and_latencies(predictions),
+    )
+
+
+def bench_phase2_batch(args: argparse.Namespace, state: Dict) -> BenchResult:
+    client, backend = make_client(Phase2GeminiClient, args)
+    system_prompt, prompt_hash = load_phase2_prompt(args.phase2_prompt)
+    events = load_sample_events(args.events)
+    with Stopwatch() as watch, recording(Timings()) as timings, metering(UsageMeter()) as meter, contextlib.redirect_stdout(io.StringIO()):
+        predictions, errors = phase2_pipeline.classify_batch(
+            client,
+            system_prompt,
+            prompt_hash,
+            events,
+            args.phase2_prompt,
+            MODEL,
+            0.0,
+            concurrency=args.concurrency,
+            reports_per_request=args.reports_per_request,
+        )
+    state["phase2_predictions"] = predictions
+    return BenchResult(
+        "phase2-batch",
+        len(events),
+        watch.seconds,
+        errors=len(errors),
+        extra={
+            "backend": dict(backend.stats),
+            "stage_seconds": stage_seconds(timings.summary()),
+            "tokens_per_event": meter.summary(events=len(events))["tokens_per_event"],
+        },
+        **attempts_and_latencies(predictions),
+    )
+
+
+def bench_evaluate(name: str, module, runs_dir_attr: str, prompt: str, args: argparse.Namespace) -> BenchResult:
+    """Run an ``evaluate`` command end to end with the fake backend selected via env."""
+    env = {
+        "BIKECLF_BACKEND": "fake",
+        "BIKECLF_FAKE_BACKEND": args.fake_backend,
+        "LANGFUSE_PUBLIC_KEY": "",
+        "LANGFUSE_SECRET_KEY": "",
+    }
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(module, runs_dir_attr, Path(tmp)):
+        with Stopwatch() as watch:
+            result = CliRunner().invoke(
+                module.app,
+                ["evaluate", "--prompt", prompt, "--model", MODEL, "--no-cache", "--workers", str(args.concurrency)],
+                env=env,
+            )
+        if result.exit_code != 0:
+            raise RuntimeError(f"{name} failed:\n{result.output}")
+        run_dir = next(Path(tmp).iterdir())
+        predictions = read_predictions_jsonl(run_dir / "predictions.jsonl")
+        config = json.loads((run_dir / "config.json").read_text(encoding="utf-8"))
+        timings = json.loads((run_dir / "timings.json").read_text(encoding="utf-8"))
+    return BenchResult(
+        name,
+        config["dataset_rows"],
+        watch.seconds,
+        errors=config["failed_predictions"],
+        extra={"stage_seconds": stage_seconds(timings), "tokens_per_event": config["usage"]["tokens_per_event"]},
+        **attempts_and_latencies(predictions),
+    )
+
+
+def bench_write(name: str, rows: List[dict], write: Callable, args: argparse.Namespace) -> BenchResult:
+    """Write rows through ``SupabaseClient`` into a simulated PostgREST endpoint."""
+    transport = SimulatedPostgREST(LatencyModel.parse(args.write_latency), per_row_ms=args.write_per_row_ms)
+    client = SupabaseClient("http://postgrest.local", "bench-key", transport=transport)
+    with Stopwatch() as watch, contextlib.redirect_stdout(io.StringIO()):
+        failed = write(client, rows)
+    client.close()
+    return BenchResult(
+        name,
+        len(rows),
+        watch.seconds,
+        latencies_ms=transport.request_latencies_ms,
+        errors=len(failed),
+        extra={"requests": len(transport.request_latencies_ms), "chunk_size": args.write_chunk_size},
+    )
+
+
+def run_scenario(scenario: str, args: argparse.Namespace, state: Dict) -> BenchResult:
+    if scenario == "phase1-batch":
+        return bench_phase1_batch(args, state)
+    if scenario == "phase2-batch":
+        return bench_phase2_batch(args, state)
+    if scenario == "phase1-eval":
+        return bench_evaluate(scenario, phase1_eval, "RUNS_DIR", args.phase1_prompt, args)
+    if scenario == "phase2-eval":
+        return bench_evaluate(scenario, phase2_eval, "PHASE2_RUNS_DIR", args.phase2_prompt, args)
+    if scenario == "phase1-write":
+        if "phase1_predictions" not in state:
+            bench_phase1_batch(args, state)
+        rows = [phase1_pipeline.prediction_to_update(p) for p in state["phase1_predictions"]]
+        return bench_write(
+            scenario,
+            rows,
+            lambda client, rows: phase1_pipeline.write_updates(client, rows, chunk_size=args.write_chunk_size),
+            args,
+        )
+    if "phase2_predictions" not in state:
+        bench_phase2_batch(args, state)
+    predictions = state["phase2_predictions"]
+    return bench_write(
+        scenario,
+        predictions,
+        lambda client, preds: phase2_pipeline.write_predictions_to_supabase(
+            client, preds, chunk_size=args.write_chunk_size
+        ),
+        args,
+    )
+
+
+def print_results(summaries: List[dict]) -> None:
+    table = Table(title="Benchmark Results (simulated backends)")
+    table.add_column("Scenario", style="cyan")
+    table.add_column("Events", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Events/s", justify="right")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("p99 ms", justify="right")
+    table.add_column("Retry rate", justify="right")
+    table.add_column("Errors", justify="right")
+
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    for s in summaries:
+        table.add_row(
+            s["scenario"],
+            str(s["events"]),
+            f"{s['seconds']:.2f}",
+            f"{s['events_per_sec']:.1f}",
+            fmt(s["latency_ms"]["p50"], ".0f"),
+            fmt(s["latency_ms"]["p95"], ".0f"),
+            fmt(s["latency_ms"]["p99"], ".0f"),
+            fmt(s["retry_rate"], ".1%"),
+            str(s["errors"]),
+        )
+    console.print(table)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the pipelines against simulated backends")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--events", type=int, default=400, help="Events for the batch and write scenarios")
+    parser.add_argument("--concurrency", type=int, default=16, help="LLM requests in flight (evaluate --workers)")
+    parser.add_argument("--reports-per-request", type=int, default=1, help="Reports per LLM request in the batch scenarios")
+    parser.add_argument("--fake-backend", default=DEFAULT_FAKE_BACKEND, help="FakeBackend settings (see FakeBackendConfig.parse)")
+    parser.add_argument("--backoff-base", type=float, default=0.1, help="Client backoff base in seconds")
+    parser.add_argument("--phase1-prompt", default="v006", help="Phase 1 prompt version")
+    parser.add_argument("--phase2-prompt", default="v001", help="Phase 2 prompt version")
+    parser.add_argument("--write-latency", default="lognormal:40:0.3", help="PostgREST latency per request (ms)")
+    parser.add_argument("--write-per-row-ms", type=float, default=0.05, help="Extra PostgREST latency per written row")
+    parser.add_argument("--write-chunk-size", type=int, default=phase1_pipeline.DEFAULT_WRITE_CHUNK_SIZE, help="Rows per bulk write")
+    parser.add_argument("--output", type=Path, default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    state: Dict = {}
+    summaries = []
+    for scenario in args.scenario or SCENARIOS:
+        console.print(f"[blue]Running {scenario}...[/blue]")
+        summaries.append(run_scenario(scenario, args, state).summary())
+
+    print_results(summaries)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"settings": {k: str(v) for k, v in vars(args).items()}, "results": summaries}
+        args.output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        console.print(f"[green]✓ Results written to {args.output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
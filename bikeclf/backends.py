@@ -0,0 +1,46 @@
+"""Backends the Gemini clients send their requests to.
+
+``BaseGeminiClient`` only uses the ``models.generate_content`` surface of
+``genai.Client`` (plus ``caches`` for ``--context-cache cached``), so any
+object offering it can be plugged in: the real SDK client, test stubs, or
+the simulated ``FakeBackend``.
+"""
+from typing import Any, Dict, Protocol
+from google import genai
+from bikeclf.config import APIConfig
+from bikeclf.fake_backend import FakeBackend, FakeBackendConfig
+
+BACKENDS = ("gemini", "fake")
+
+
+class ModelsAPI(Protocol):
+    """``genai.Client().models``: returns a response with a ``text`` attribute."""
+
+    def generate_content(self, *, model: str, contents: Any, config: Dict[str, Any]) -> Any:
+        ...
+
+
+class Backend(Protocol):
+    """The part of ``genai.Client`` the clients depend on."""
+
+    models: ModelsAPI
+
+
+def create_backend(config: APIConfig) -> Backend:
+    """Create the backend selected by ``config.backend``.
+
+    Args:
+        config: API configuration ('gemini' uses ``api_key``; 'fake' is
+            tuned by ``fake_backend``, see ``FakeBackendConfig.parse``)
+
+    Returns:
+        Backend instance
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if config.backend == "gemini":
+        return genai.Client(api_key=config.api_key)
+    if config.backend == "fake":
+        return FakeBackend(FakeBackendConfig.parse(config.fake_backend))
+    raise ValueError(f"Unknown backend: {config.backend} (supported: {', '.join(BACKENDS)})")
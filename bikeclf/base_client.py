@@ -0,0 +1,367 @@
+"""Shared Gemini client logic for structured classification outputs."""
+import time
+from typing import Any, Dict, Generic, Optional, Tuple, Type, TypeVar, Union
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from bikeclf.backends import Backend, create_backend
+from bikeclf.cache import ResponseCache, canonical_json, make_cache_key
+from bikeclf.concurrency import AdaptiveConcurrency, backoff_delay
+from bikeclf.config import APIConfig
+from bikeclf.context_cache import SystemPromptCache
+from bikeclf.errors import ErrorKind, LLMError, THROTTLE_KINDS, classify_exception
+from bikeclf.rate_limit import ModelRateLimiters, RateLimiter, estimate_tokens
+from bikeclf.timing import span
+from bikeclf import usage
+
+OutputT = TypeVar("OutputT", bound=BaseModel)
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# (output, latency_ms, attempts, error) as returned by classify_with_retry
+RetryResult = Tuple[Optional[OutputT], int, int, Optional[LLMError]]
+
+
+class OutputSpec(Generic[ModelT]):
+    """Response schema and validator of an output model, prepared once.
+
+    Generating a JSON schema takes 0.5-1.5 ms for these models (more for
+    the batch and fused ones), hundreds of times the cost of validating a
+    response, so clients build it once per output model instead of per
+    request.
+    """
+
+    def __init__(self, model: Type[ModelT]):
+        self.model = model
+        self.json_schema: Dict[str, Any] = model.model_json_schema()
+        # Serialized form for cache keys (see ``make_cache_key``)
+        self.schema_json = canonical_json(self.json_schema)
+        self.adapter: TypeAdapter[ModelT] = TypeAdapter(model)
+
+    def validate_json(self, text: str) -> ModelT:
+        """Parse and validate a raw JSON response."""
+        return self.adapter.validate_json(text)
+
+    def from_validated(self, instance: BaseModel) -> ModelT:
+        """Narrow a validated instance of a subclass (e.g. a batch item).
+
+        The subclass shares this model's fields and validators, so its
+        values are copied without validating them again.
+        """
+        if not isinstance(instance, self.model):
+            return self.model.model_validate(instance.model_dump())
+        return self.model.model_construct(
+            **{name: getattr(instance, name) for name in self.model.model_fields}
+        )
+
+
+class BaseGeminiClient(Generic[OutputT]):
+    """Gemini client parameterized by a Pydantic output schema.
+
+    Subclasses set ``output_model``, ``batch_output_model`` and
+    ``repair_instructions``; everything else (structured output config,
+    response caching, context caching, rate limiting, error classification,
+    backoff, repair retry and multi-report batching) is shared.
+    """
+
+    output_model: Type[OutputT]
+    batch_output_model: Type[BaseModel]
+    repair_instructions: str = ""
+
+    def __init__(
+        self,
+        config: APIConfig,
+        rate_limiter: Optional[Union[RateLimiter, ModelRateLimiters]] = None,
+        concurrency_controller: Optional[AdaptiveConcurrency] = None,
+        cache: Optional[ResponseCache] = None,
+        backend: Optional[Backend] = None,
+    ):
+        """Initialize client.
+
+        Args:
+            config: API configuration with credentials
+            rate_limiter: Limiter acquired before every request, either one
+                for all models or per-model limiters (defaults to per-model
+                limiters built from ``config.rate_budget``)
+            concurrency_controller: Optional AIMD controller fed with
+                success/throttle signals from every call
+            cache: Optional persistent response cache consulted before
+                every request
+            backend: ``genai.Client``-compatible backend (defaults to the
+                one selected by ``config.backend``)
+        """
+        self.config = config
+        self.client = backend if backend is not None else create_backend(config)
+        self.rate_limiter = rate_limiter or ModelRateLimiters(config.rate_budget)
+        self.concurrency_controller = concurrency_controller
+        self.cache = cache
+        self.context_cache: Optional[SystemPromptCache] = None
+        self._specs: Dict[Type[BaseModel], OutputSpec] = {}
+
+    def output_spec(self, output_model: Type[ModelT]) -> OutputSpec[ModelT]:
+        """Schema and validator for ``output_model``, built on first use."""
+        spec = self._specs.get(output_model)
+        if spec is None:
+            # Concurrent first calls may both build it; either result is fine
+            spec = self._specs.setdefault(output_model, OutputSpec(output_model))
+        return spec
+
+    def enable_context_cache(
+        self,
+        system_prompt: str,
+        mode: str = "cached",
+        ttl_seconds: int = 3600,
+    ) -> None:
+        """Register the run's system prompt so it isn't resent with every request.
+
+        Prompts passed to ``classify``/``classify_many`` keep their usual
+        format; any prompt starting with ``system_prompt`` has that prefix
+        replaced by the cached content (or ``system_instruction``) handle.
+
+        Args:
+            system_prompt: Static system prompt returned by ``load_prompt``
+            mode: 'cached', 'instruction', or 'off' (see ``SystemPromptCache``)
+            ttl_seconds: Lifetime of server-side cached content
+        """
+        if self.context_cache is not None:
+            self.context_cache.close()
+        self.context_cache = None
+        if mode != "off":
+            self.context_cache = SystemPromptCache(
+                self.client, system_prompt, mode=mode, ttl_seconds=ttl_seconds
+            )
+
+    def classify(
+        self,
+        prompt: str,
+        model_id: str,
+        temperature: float = 0.0,
+        max_tokens: int = 512,
+    ) -> Tuple[Optional[OutputT], int, Optional[LLMError]]:
+        """Classify a report with structured output.
+
+        Args:
+            prompt: Complete prompt with system instructions and user message
+            model_id: Model identifier (e.g., 'gemini-2.0-flash-001')
+            temperature: Sampling temperature (0.0 for determinism)
+            max_tokens: Maximum output tokens
+
+        Returns:
+            Tuple of (output, latency_ms, error_message):
+            - output: Parsed output model or None if failed
+            - latency_ms: Time taken in milliseconds (excluding rate-limit wait,
+              0 for cache hits)
+            - error_message: ``LLMError`` (a str with ``.kind``) if failed, else None
+        """
+        return self._generate(
+            prompt, model_id, temperature, max_tokens, self.output_model
+        )
+
+    def _generate(
+        self,
+        prompt: str,
+        model_id: str,
+        temperature: float,
+        max_tokens: int,
+        output_model: Type[ModelT],
+    ) -> Tuple[Optional[ModelT], int, Optional[LLMError]]:
+        """Run one structured-output request validated against ``output_model``."""
+        spec = self.output_spec(output_model)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(
+                model_id, prompt, temperature, max_tokens, spec.json_schema, spec.schema_json
+            )
+            cached_text = self.cache.get(cache_key)
+            if cached_text is not None:
+                try:
+                    with span("parse_validate"):
+                        return spec.validate_json(cached_text), 0, None
+                except ValidationError:
+                    pass  # Stale entry; fall through and re-query
+
+        contents = prompt
+        request_config = {
+            "response_mime_type": "application/json",
+            "response_json_schema": spec.json_schema,
+            "temperature": temperature,
+            "max_output_tokens": max_tokens,
+        }
+        if self.context_cache is not None:
+            split = self.context_cache.split(prompt, model_id)
+            if split is not None:
+                contents, extra_config = split
+                request_config.update(extra_config)
+
+        with span("rate_limit_wait"):
+            self.rate_limiter.for_model(model_id).acquire(estimate_tokens(prompt, max_tokens))
+        start_time = time.perf_counter()
+
+        try:
+            # Use structured output with JSON schema
+            with span("llm_wait"):
+                response = self.client.models.generate_content(
+                    model=model_id,
+                    contents=contents,
+                    config=request_config,
+                )
+            usage.record(model_id, response)
+
+            latency_ms = int((time.perf_counter() - start_time) * 1000)
+
+            # Parse and validate response with Pydantic
+            with span("parse_validate"):
+                output = spec.validate_json(response.text)
+            self._record_outcome(None)
+            if cache_key is not None:
+                self.cache.put(cache_key, response.text)
+            return output, latency_ms, None
+
+        except ValidationError as e:
+            latency_ms = int((time.perf_counter() - start_time) * 1000)
+            self._record_outcome(ErrorKind.VALIDATION)
+            return None, latency_ms, LLMError(ErrorKind.VALIDATION, str(e))
+
+        except Exception as e:
+            latency_ms = int((time.perf_counter() - start_time) * 1000)
+            kind = classify_exception(e)
+            self._record_outcome(kind)
+            if kind == ErrorKind.API and "cached_content" in request_config:
+                # Cached content may have expired server-side; recreate next time
+                self.context_cache.invalidate(model_id)
+            return None, latency_ms, LLMError(kind, str(e))
+
+    def _record_outcome(self, kind: Optional[ErrorKind]) -> None:
+        """Feed call outcome to the AIMD controller, if any."""
+        if self.concurrency_controller is None:
+            return
+        if kind is None or kind == ErrorKind.VALIDATION:
+            # The service answered; only overload signals shrink the limit
+            self.concurrency_controller.record_success()
+        elif kind in THROTTLE_KINDS:
+            self.concurrency_controller.record_throttle()
+
+    def _generate_with_backoff(
+        self,
+        prompt: str,
+        model_id: str,
+        temperature: float,
+        max_tokens: int,
+        output_model: Type[ModelT],
+    ) -> Tuple[Optional[ModelT], int, int, Optional[LLMError]]:
+        """Run ``_generate``, retrying transient errors with jittered backoff."""
+        total_latency = 0
+        attempts = 0
+
+        while True:
+            output, latency, error = self._generate(
+                prompt, model_id, temperature, max_tokens, output_model
+            )
+            attempts += 1
+            total_latency += latency
+
+            if output is not None:
+                return output, total_latency, attempts, None
+
+            if error.is_transient and attempts <= self.config.max_transient_retries:
+                time.sleep(backoff_delay(attempts, self.config.backoff_base_seconds))
+                continue
+
+            return None, total_latency, attempts, error
+
+    def classify_with_retry(
+        self,
+        prompt: str,
+        model_id: str,
+        temperature: float = 0.0,
+        max_tokens: int = 512,
+    ) -> RetryResult:
+        """Classify with backoff on transient errors and one repair retry.
+
+        Quota, server and timeout errors are retried with exponential backoff
+        and jitter (up to ``config.max_transient_retries`` times). If a
+        response fails validation, we retry once with a repair prompt that
+        adds explicit schema instructions. Other API errors are not retried.
+
+        Args:
+            prompt: Complete prompt
+            model_id: Model identifier
+            temperature: Sampling temperature
+            max_tokens: Maximum output tokens
+
+        Returns:
+            Tuple of (output, latency_ms, attempts, error_message):
+            - output: Parsed output or None if all attempts failed
+            - latency_ms: Total time taken across all attempts (excluding backoff)
+            - attempts: Number of API calls made
+            - error_message: Last ``LLMError`` if failed, else None
+        """
+        output, latency, attempts, error = self._generate_with_backoff(
+            prompt, model_id, temperature, max_tokens, self.output_model
+        )
+
+        if output is not None or error.kind != ErrorKind.VALIDATION:
+            return output, latency, attempts, error
+
+        # Retry with repair prompt (add explicit schema reminder)
+        repair_prompt = f"{prompt}\n\n{self.repair_instructions}"
+
+        output, latency2, attempts2, error2 = self._generate_with_backoff(
+            repair_prompt, model_id, temperature, max_tokens, self.output_model
+        )
+
+        return output, latency + latency2, attempts + attempts2, error2
+
+    def classify_many(
+        self,
+        batch_prompt: str,
+        prompts: Dict[str, str],
+        model_id: str,
+        temperature: float = 0.0,
+        max_tokens: int = 512,
+    ) -> Dict[str, RetryResult]:
+        """Classify several reports with a single request.
+
+        The batch response is split back into per-report results by ID.
+        Reports missing from the response (or the whole batch, if the
+        request fails) fall back to ``classify_with_retry`` individually.
+
+        Args:
+            batch_prompt: Prompt containing all reports with their IDs
+                (see ``format_batch_prompt``)
+            prompts: Single-report prompt per ID, used for fallback retries
+            model_id: Model identifier
+            temperature: Sampling temperature
+            max_tokens: Maximum output tokens per report
+
+        Returns:
+            Dict mapping each ID in ``prompts`` to (output, latency_ms,
+            attempts, error). Batch latency is split evenly across the
+            reports answered by the batch.
+        """
+        batch, latency, attempts, _ = self._generate_with_backoff(
+            batch_prompt,
+            model_id,
+            temperature,
+            max_tokens * len(prompts),
+            self.batch_output_model,
+        )
+
+        answered: Dict[str, OutputT] = {}
+        if batch is not None:
+            spec = self.output_spec(self.output_model)
+            with span("parse_validate"):
+                for item in batch.results:
+                    if item.id in prompts and item.id not in answered:
+                        # Items subclass the output model, so they are already validated
+                        answered[item.id] = spec.from_validated(item)
+
+        share = latency // max(len(answered), 1)
+        results: Dict[str, RetryResult] = {}
+        for item_id, prompt in prompts.items():
+            if item_id in answered:
+                results[item_id] = (answered[item_id], share, attempts, None)
+            else:
+                output, item_latency, item_attempts, error = self.classify_with_retry(
+                    prompt, model_id, temperature, max_tokens
+                )
+                results[item_id] = (output, item_latency, item_attempts, error)
+        return results
@@ -0,0 +1,178 @@
+"""Persistent content-addressed cache for LLM responses."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+from bikeclf.config import CACHE_DIR
+
+DEFAULT_CACHE_PATH = CACHE_DIR / "responses.sqlite"
+DEFAULT_MAX_ENTRIES = 200_000
+
+
+def canonical_json(value: Any) -> str:
+    """Serialize ``value`` the way cache keys do (sorted keys, UTF-8 text)."""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def make_cache_key(
+    model_id: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    response_schema: Any,
+    schema_json: Optional[str] = None,
+) -> str:
+    """Build a content-addressed key for a generation request.
+
+    Args:
+        model_id: Model identifier
+        prompt: Full formatted prompt
+        temperature: Sampling temperature
+        max_tokens: Maximum output tokens
+        response_schema: JSON schema the response must follow
+        schema_json: ``canonical_json(response_schema)`` if already computed;
+            serializing a schema on every call costs more than hashing the
+            prompt
+
+    Returns:
+        SHA-256 hex digest identifying the request
+    """
+    if schema_json is None:
+        schema_json = canonical_json(response_schema)
+    # Same bytes as canonical_json() of the whole request dict, whose keys
+    # sort as max_tokens, model_id, prompt, response_schema, temperature
+    head = canonical_json({"max_tokens": max_tokens, "model_id": model_id, "prompt": prompt})
+    tail = canonical_json({"temperature": temperature})
+    payload = f'{head[:-1]}, "response_schema": {schema_json}, {tail[1:]}'
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache mapping request keys to raw response text.
+
+    Safe to share between threads; WAL mode lets several processes use the
+    same cache file.
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        refresh: bool = False,
+    ):
+        """Open (or create) the cache.
+
+        Args:
+            path: SQLite database file
+            max_entries: Size cap; least recently used entries are evicted beyond it
+            refresh: If True, ignore existing entries but still store new responses
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)"
+        )
+        self._conn.commit()
+        # Running entry count so put() doesn't scan the table on every insert
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str, count: bool = True) -> Optional[str]:
+        """Return cached response text for ``key`` (None on miss or refresh).
+
+        Args:
+            key: Cache key
+            count: Update the hit/miss counters (False for non-LLM lookups)
+        """
+        if self.refresh:
+            self.misses += count
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += count
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += count
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store response text, evicting least recently used entries over the cap."""
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_entries:
+                # Evict down to 90% of the cap so we don't evict on every insert
+                excess = self._count - int(self.max_entries * 0.9)
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= cursor.rowcount
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    def stats(self) -> dict:
+        """Hit/miss counters for run summaries."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def open_cache(no_cache: bool = False, refresh: bool = False) -> Optional[ResponseCache]:
+    """Create the default response cache from CLI flags.
+
+    Args:
+        no_cache: Disable caching entirely
+        refresh: Re-query the model and overwrite cached entries
+
+    Returns:
+        ResponseCache instance or None if caching is disabled
+    """
+    if no_cache:
+        return None
+    return ResponseCache(refresh=refresh)
@@ -0,0 +1,111 @@
+"""Model cascade: answer with a cheap model, escalate low-confidence results."""
+from typing import Any, Dict, Optional, Sequence, Tuple
+from pydantic import BaseModel
+from bikeclf.base_client import BaseGeminiClient, RetryResult
+from bikeclf.schema import CascadeMeta
+
+DEFAULT_CASCADE_MODEL = "gemini-2.5-flash"
+DEFAULT_CASCADE_THRESHOLD = 0.7
+
+
+def needs_escalation(output: BaseModel, threshold: float) -> bool:
+    """Check whether a primary result should be re-queried on the larger model.
+
+    Args:
+        output: Parsed classification output (Phase 1 or Phase 2)
+        threshold: Escalate when confidence is below this value
+
+    Returns:
+        True for Phase 1 ``uncertain`` labels or confidence below ``threshold``
+    """
+    if getattr(output, "label", None) == "uncertain":
+        return True
+    return output.confidence < threshold
+
+
+def escalate(
+    client: BaseGeminiClient,
+    result: RetryResult,
+    prompt: str,
+    primary_model_id: str,
+    escalation_model_id: str,
+    threshold: float = DEFAULT_CASCADE_THRESHOLD,
+    temperature: float = 0.0,
+    max_tokens: int = 512,
+) -> Tuple[RetryResult, Optional[CascadeMeta]]:
+    """Re-query ``escalation_model_id`` if the primary result is low-confidence.
+
+    If the escalation call fails, the primary output is kept.
+
+    Args:
+        client: Client used for the primary call
+        result: (output, latency_ms, attempts, error) from the primary model
+        prompt: Prompt the primary model was called with
+        primary_model_id: Model that produced ``result``
+        escalation_model_id: Larger model used for escalation
+        threshold: Confidence below which results are escalated
+        temperature: Sampling temperature
+        max_tokens: Maximum output tokens
+
+    Returns:
+        Tuple of (final result, cascade metadata). Latency and attempts of
+        the final result include both stages; metadata is None if the
+        primary call failed.
+    """
+    output, latency_ms, attempts, error = result
+    if output is None:
+        return result, None
+
+    meta = CascadeMeta(
+        escalated=False,
+        primary_model_id=primary_model_id,
+        primary_pred=output.model_dump(),
+        primary_latency_ms=latency_ms,
+    )
+    if not needs_escalation(output, threshold):
+        return result, meta
+
+    output2, latency2, attempts2, error2 = client.classify_with_retry(
+        prompt=prompt,
+        model_id=escalation_model_id,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    meta.escalated = True
+    meta.escalation_model_id = escalation_model_id
+    meta.escalation_latency_ms = latency2
+    if output2 is None:
+        meta.escalation_error = str(error2)
+        return (output, latency_ms + latency2, attempts + attempts2, None), meta
+
+    meta.escalation_pred = output2.model_dump()
+    return (output2, latency_ms + latency2, attempts + attempts2, None), meta
+
+
+def summarize_cascade(metas: Sequence[CascadeMeta]) -> Dict[str, Any]:
+    """Summarize how much traffic the cascade escalated and what it cost.
+
+    Args:
+        metas: Cascade metadata of all successful predictions
+
+    Returns:
+        Dict with escalation counts/rate, latency per stage and calls per model
+    """
+    escalated = [m for m in metas if m.escalated]
+    calls_per_model: Dict[str, int] = {}
+    for meta in metas:
+        calls_per_model[meta.primary_model_id] = calls_per_model.get(meta.primary_model_id, 0) + 1
+        if meta.escalated:
+            calls_per_model[meta.escalation_model_id] = (
+                calls_per_model.get(meta.escalation_model_id, 0) + 1
+            )
+
+    return {
+        "predictions": len(metas),
+        "escalated": len(escalated),
+        "escalation_rate": len(escalated) / len(metas) if metas else 0.0,
+        "escalation_failures": sum(1 for m in escalated if m.escalation_pred is None),
+        "primary_latency_ms": sum(m.primary_latency_ms for m in metas),
+        "escalation_latency_ms": sum(m.escalation_latency_ms or 0 for m in escalated),
+        "calls_per_model": calls_per_model,
+    }
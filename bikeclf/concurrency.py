@@ -0,0 +1,147 @@
+"""Bounded-concurrency execution helpers for LLM request fan-out."""
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter.
+
+    Args:
+        attempt: Retry number (1 for the first retry)
+        base: Delay scale in seconds
+        cap: Maximum delay in seconds
+
+    Returns:
+        Random delay in ``[0, min(cap, base * 2 ** (attempt - 1))]``
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit driven by success and throttle feedback.
+
+    The limit grows by ``increase`` after every ``limit`` successful calls
+    (one "round" of requests) and is multiplied by ``decrease_factor`` when
+    the service signals overload (429/503). Throttles arriving within
+    ``cooldown`` seconds of a decrease are ignored so that a burst of
+    in-flight failures only halves the limit once.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 2.0,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._active = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of calls allowed in flight."""
+        return int(self._limit)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one concurrency slot for the duration of a call."""
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def record_success(self) -> None:
+        """Additive increase: roughly +``increase`` per round of successes."""
+        with self._cond:
+            self._limit = min(self.maximum, self._limit + self.increase / max(self._limit, 1.0))
+            self._cond.notify_all()
+
+    def record_throttle(self) -> None:
+        """Multiplicative decrease on an overload signal."""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._limit = max(self.minimum, self._limit * self.decrease_factor)
+
+
+def map_concurrent(
+    func: Callable[[T], R],
+    items: Sequence[T],
+    concurrency: int = 1,
+    on_done: Optional[Callable[[int, int], None]] = None,
+    controller: Optional[AdaptiveConcurrency] = None,
+) -> List[R]:
+    """Apply ``func`` to every item with at most ``concurrency`` calls in flight.
+
+    Results are returned in input order regardless of completion order, so
+    callers get deterministic output even when requests finish out of order.
+    Each call runs in a copy of the caller's ``contextvars`` context, so
+    tracing spans opened around the call (e.g. Langfuse) stay its parent.
+
+    Args:
+        func: Function applied to each item (must be thread-safe)
+        items: Items to process
+        concurrency: Maximum number of simultaneous calls (1 = sequential)
+        on_done: Optional callback invoked as ``on_done(completed, total)``
+            after each item finishes (always called from the calling thread)
+        controller: Optional AIMD controller; when given, ``concurrency`` is
+            the upper bound and the controller decides the live limit
+
+    Returns:
+        List of results aligned with ``items``
+    """
+    total = len(items)
+    if total == 0:
+        return []
+
+    if concurrency <= 1:
+        results = []
+        for idx, item in enumerate(items, start=1):
+            results.append(func(item))
+            if on_done:
+                on_done(idx, total)
+        return results
+
+    def controlled(item: T) -> R:
+        with controller.slot():
+            return func(item)
+
+    task = controlled if controller is not None else func
+
+    results: List[Optional[R]] = [None] * total
+    with ThreadPoolExecutor(max_workers=min(concurrency, total)) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, task, item): idx
+            for idx, item in enumerate(items)
+        }
+        for completed, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if on_done:
+                on_done(completed, total)
+
+    return results
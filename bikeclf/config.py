@@ -1,17 +1,25 @@
 """Configuration management for bikeclf system."""
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+
+def _env_int(name: str) -> Optional[int]:
+    """Integer environment variable, or None if unset or empty."""
+    value = os.getenv(name, "")
+    return int(value) if value else None
+
+
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent
 PROMPTS_DIR = PROJECT_ROOT / "prompts" / "phase1"
 RUNS_DIR = PROJECT_ROOT / "runs"
+CACHE_DIR = RUNS_DIR / ".cache"
 
 
 class APIConfig(BaseModel):
@@ -21,9 +29,32 @@ class APIConfig(BaseModel):
     default_model: str = "gemini-2.0-flash-001"
     default_temperature: float = 0.0
     default_max_tokens: int = 512
+    # Quota budgets shared by all requests per model (0 = unlimited). Unset
+    # budgets default to the model's quota for ``quota_tier``
+    requests_per_minute: Optional[int] = Field(
+        default_factory=lambda: _env_int("GEMINI_RPM")
+    )
+    tokens_per_minute: Optional[int] = Field(
+        default_factory=lambda: _env_int("GEMINI_TPM")
+    )
+    # Key of MODEL_QUOTAS matching the API key's usage tier
+    quota_tier: str = Field(default_factory=lambda: os.getenv("GEMINI_TIER", "free"))
+    # Retries for quota/5xx/timeout errors (exponential backoff with jitter)
+    max_transient_retries: int = 4
+    backoff_base_seconds: float = 1.0
+    # 'gemini' or 'fake' (simulated API for offline runs and benchmarks)
+    backend: str = Field(default_factory=lambda: os.getenv("BIKECLF_BACKEND", "gemini"))
+    fake_backend: str = Field(default_factory=lambda: os.getenv("BIKECLF_FAKE_BACKEND", ""))
 
     def validate_required(self) -> None:
         """Ensure required credentials are present."""
+        if self.quota_tier not in MODEL_QUOTAS:
+            raise ValueError(
+                f"Unknown GEMINI_TIER: {self.quota_tier!r}. "
+                f"Use one of: {', '.join(MODEL_QUOTAS)}"
+            )
+        if self.backend == "fake":
+            return
         if not self.api_key:
             raise ValueError(
                 "GOOGLE_API_KEY not found. "
@@ -31,6 +62,37 @@ class APIConfig(BaseModel):
                 "Get your API key from: https://aistudio.google.com/apikey"
             )
 
+    def rate_budget(self, model_id: str) -> Tuple[int, int]:
+        """Requests and tokens per minute to pace ``model_id`` at.
+
+        Explicit budgets win (0 = unlimited). Unset budgets come from the
+        model's quota for ``quota_tier``; the fake backend is unlimited.
+
+        Args:
+            model_id: Gemini model identifier
+
+        Returns:
+            ``(rpm, tpm)``, 0 meaning unlimited
+
+        Raises:
+            ValueError: If a budget is unset and the model has no known quota
+        """
+        rpm, tpm = self.requests_per_minute, self.tokens_per_minute
+        if rpm is not None and tpm is not None:
+            return rpm, tpm
+        if self.backend == "fake":
+            return rpm or 0, tpm or 0
+        quota = MODEL_QUOTAS.get(self.quota_tier, {}).get(model_id)
+        if quota is None:
+            raise ValueError(
+                f"No {self.quota_tier!r} tier quota known for {model_id}. "
+                "Pass --rpm/--tpm (or set GEMINI_RPM/GEMINI_TPM; 0 = unlimited)"
+            )
+        return (
+            quota["rpm"] if rpm is None else rpm,
+            quota["tpm"] if tpm is None else tpm,
+        )
+
 
 class LangfuseConfig(BaseModel):
     """Langfuse tracing configuration."""
@@ -72,6 +134,38 @@ MODEL_DISPLAY_NAMES = {
     "gemini-2.5-flash": "Gemini 2.5 Flash",
 }
 
+# List prices in USD per 1M tokens (paid tier, text) for cost estimates in
+# config.json and the dashboard. "cached" applies to prompt tokens served
+# from context caching; thinking tokens are billed as output. Check
+# https://ai.google.dev/gemini-api/docs/pricing when adding a model.
+MODEL_PRICES = {
+    "gemini-2.0-flash-001": {"input": 0.10, "cached": 0.025, "output": 0.40},
+    "gemini-2.0-flash": {"input": 0.10, "cached": 0.025, "output": 0.40},
+    "gemini-2.0-flash-exp": {"input": 0.10, "cached": 0.025, "output": 0.40},  # Priced as 2.0 Flash
+    "gemini-2.5-flash-lite": {"input": 0.10, "cached": 0.01, "output": 0.40},
+    "gemini-2.5-flash": {"input": 0.30, "cached": 0.03, "output": 2.50},
+}
+
+# Per-model rate limits by usage tier (GEMINI_TIER), used as the default
+# RPM/TPM budgets so runs pace themselves just under quota. Check
+# https://ai.google.dev/gemini-api/docs/rate-limits when adding a model.
+MODEL_QUOTAS = {
+    "free": {
+        "gemini-2.0-flash-001": {"rpm": 15, "tpm": 1_000_000},
+        "gemini-2.0-flash": {"rpm": 15, "tpm": 1_000_000},
+        "gemini-2.0-flash-exp": {"rpm": 10, "tpm": 250_000},
+        "gemini-2.5-flash-lite": {"rpm": 15, "tpm": 250_000},
+        "gemini-2.5-flash": {"rpm": 10, "tpm": 250_000},
+    },
+    "tier1": {
+        "gemini-2.0-flash-001": {"rpm": 2_000, "tpm": 4_000_000},
+        "gemini-2.0-flash": {"rpm": 2_000, "tpm": 4_000_000},
+        "gemini-2.0-flash-exp": {"rpm": 10, "tpm": 250_000},  # Experimental: free-tier limits
+        "gemini-2.5-flash-lite": {"rpm": 4_000, "tpm": 4_000_000},
+        "gemini-2.5-flash": {"rpm": 1_000, "tpm": 1_000_000},
+    },
+}
+
 def get_model_short_name(model_id: str) -> str:
     """Get a short name for model ID suitable for file naming.
 
@@ -0,0 +1,134 @@
+"""Register the static system prompt once per run instead of resending it."""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# Supported modes for sending the system prompt
+CONTEXT_CACHE_MODES = ["off", "cached", "instruction"]
+
+
+@dataclass
+class _CacheHandle:
+    """Server-side cached content registered for one model."""
+
+    name: str
+    expires_at: float
+
+
+class SystemPromptCache:
+    """Send a run's system prompt as Gemini cached content or system instruction.
+
+    In ``cached`` mode the prompt is uploaded once per model with
+    ``caches.create`` and every request references it via ``cached_content``;
+    the TTL is extended whenever less than ``refresh_fraction`` of it remains,
+    so long backfills never lose the handle. If cached content can't be
+    created (e.g. the prompt is below the model's minimum cache size), that
+    model falls back to ``instruction`` mode, which passes the prompt as
+    ``system_instruction`` so it is at least not duplicated in ``contents``.
+    """
+
+    def __init__(
+        self,
+        genai_client: Any,
+        system_prompt: str,
+        mode: str = "cached",
+        ttl_seconds: int = 3600,
+        refresh_fraction: float = 0.5,
+    ):
+        """Initialize cache.
+
+        Args:
+            genai_client: ``genai.Client`` (or compatible) instance
+            system_prompt: Static system prompt shared by every request
+            mode: 'cached' (server-side cached content) or 'instruction'
+            ttl_seconds: Lifetime of the cached content
+            refresh_fraction: Extend the TTL when less than this fraction remains
+        """
+        if mode not in ("cached", "instruction"):
+            raise ValueError(f"Unsupported context cache mode: {mode}")
+
+        self.genai_client = genai_client
+        self.system_prompt = system_prompt
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.refresh_fraction = refresh_fraction
+        self._handles: Dict[str, Optional[_CacheHandle]] = {}
+        self._lock = threading.Lock()
+
+    def split(self, prompt: str, model_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Split a full prompt into (user contents, extra generation config).
+
+        Args:
+            prompt: Full prompt as produced by ``format_prompt``
+            model_id: Model the request is sent to
+
+        Returns:
+            Tuple of (contents, config entries) or None if ``prompt`` does not
+            start with the registered system prompt
+        """
+        if not prompt.startswith(self.system_prompt):
+            return None
+
+        contents = prompt[len(self.system_prompt):].lstrip("\n")
+        handle = self._handle_for(model_id) if self.mode == "cached" else None
+        if handle is not None:
+            return contents, {"cached_content": handle.name}
+        return contents, {"system_instruction": self.system_prompt}
+
+    def _handle_for(self, model_id: str) -> Optional[_CacheHandle]:
+        """Return a live cached-content handle for ``model_id``, creating or refreshing it."""
+        with self._lock:
+            if model_id in self._handles and self._handles[model_id] is None:
+                return None  # Creation failed before; use instruction mode
+
+            handle = self._handles.get(model_id)
+            now = time.monotonic()
+
+            if handle is None:
+                try:
+                    cached = self.genai_client.caches.create(
+                        model=model_id,
+                        config={
+                            "system_instruction": self.system_prompt,
+                            "ttl": f"{self.ttl_seconds}s",
+                            "display_name": "bikeclf-system-prompt",
+                        },
+                    )
+                except Exception:
+                    self._handles[model_id] = None
+                    return None
+                handle = _CacheHandle(name=cached.name, expires_at=now + self.ttl_seconds)
+                self._handles[model_id] = handle
+
+            elif handle.expires_at - now < self.ttl_seconds * self.refresh_fraction:
+                try:
+                    self.genai_client.caches.update(
+                        name=handle.name,
+                        config={"ttl": f"{self.ttl_seconds}s"},
+                    )
+                    handle.expires_at = now + self.ttl_seconds
+                except Exception:
+                    # Handle is gone (expired or deleted); recreate on next call
+                    del self._handles[model_id]
+                    return None
+
+            return handle
+
+    def invalidate(self, model_id: str) -> None:
+        """Forget the handle for ``model_id`` so the next request recreates it."""
+        with self._lock:
+            if self._handles.get(model_id) is not None:
+                del self._handles[model_id]
+
+    def close(self) -> None:
+        """Delete all cached contents created by this instance."""
+        with self._lock:
+            for handle in self._handles.values():
+                if handle is None:
+                    continue
+                try:
+                    self.genai_client.caches.delete(name=handle.name)
+                except Exception:
+                    pass  # Expires on its own
+            self._handles.clear()
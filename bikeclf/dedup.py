@@ -0,0 +1,333 @@
+"""Text-level deduplication of reports before they are sent to the LLM.
+
+Civic reports are often repeated or filled from templates. Events whose
+normalized subject + description are identical share one LLM result:
+
+- within a batch, only the first copy is classified and its result is
+  fanned out to the other IDs;
+- across batches of the same run, results are remembered in memory;
+- across runs, results are stored in the response cache under a key made of
+  the run configuration (prompt hash, model, ...) and the text hash.
+
+Optionally, near-duplicates are matched with MinHash + LSH: events whose
+estimated Jaccard similarity of character shingles reaches a threshold
+reuse the result of the earlier event.
+"""
+import copy
+import hashlib
+import json
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from bikeclf.cache import ResponseCache
+
+DEFAULT_NEAR_THRESHOLD = 0.9
+DEFAULT_NUM_PERM = 64
+DEFAULT_SHINGLE_SIZE = 5
+
+# Ticket number prefixes such as "#1-2025 " in front of report subjects
+_ID_PREFIX = re.compile(r"^\s*#\s*[\w-]+\s*")
+_WHITESPACE = re.compile(r"\s+")
+
+# Mersenne prime for the MinHash permutations (a * x + b) mod p; small
+# enough that a * x + b never overflows uint64
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_text(subject: Optional[str], description: Optional[str]) -> str:
+    """Normalize a report for duplicate detection.
+
+    Strips leading ``#id`` prefixes from the subject, case-folds and collapses
+    whitespace.
+
+    Args:
+        subject: Report subject/title
+        description: Report description
+
+    Returns:
+        Normalized "subject\\ndescription" text
+    """
+    subject = _ID_PREFIX.sub("", subject or "")
+    parts = [_WHITESPACE.sub(" ", part).strip().casefold() for part in (subject, description or "")]
+    return "\n".join(parts)
+
+
+def text_hash(subject: Optional[str], description: Optional[str]) -> str:
+    """SHA-256 of the normalized report text."""
+    return hashlib.sha256(normalize_text(subject, description).encode("utf-8")).hexdigest()
+
+
+def dedup_namespace(
+    phase: str,
+    prompt_hash: str,
+    model: str,
+    temperature: float,
+    cascade_model: Optional[str] = None,
+    cascade_threshold: Optional[float] = None,
+) -> str:
+    """Build the namespace results are shared in (see ``Deduplicator``).
+
+    Results are only reused between runs with the same phase, prompt, model,
+    temperature and cascade settings.
+    """
+    parts = [phase, prompt_hash, model, str(temperature)]
+    if cascade_model:
+        parts += [cascade_model, str(cascade_threshold)]
+    return ":".join(parts)
+
+
+def _lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Pick (bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+class MinHashLSH:
+    """In-memory MinHash/LSH index of character-shingle signatures."""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_NEAR_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        """Initialize index.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity for a match
+            num_perm: Number of hash permutations per signature
+            shingle_size: Character n-gram length
+            seed: Seed for the permutation coefficients
+        """
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"Near-duplicate threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _lsh_bands(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        """Compute the MinHash signature of a text."""
+        k = self.shingle_size
+        shingles = {text[i : i + k] for i in range(max(len(text) - k + 1, 1))}
+        hashes = np.array(
+            [zlib.crc32(s.encode("utf-8")) % _MERSENNE_PRIME for s in shingles],
+            dtype=np.uint64,
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(_MERSENNE_PRIME)
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def query(self, signature: np.ndarray) -> Optional[str]:
+        """Return the key of the most similar indexed text at or above threshold."""
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band_key, ()))
+        best_key, best_similarity = None, self.threshold
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key
+
+    def insert(self, key: str, signature: np.ndarray) -> None:
+        """Add a signature to the index."""
+        self._signatures[key] = signature
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, []).append(key)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+@dataclass
+class DedupPlan:
+    """How one batch of events is split into LLM calls and reused results."""
+
+    events: List[dict]  # All input events, in order
+    unique: List[dict]  # Events that still need an LLM call
+    hashes: Dict[str, str]  # Event ID -> text hash
+    duplicates: Dict[str, Tuple[str, str]] = field(default_factory=dict)  # ID -> (representative ID, kind)
+    reused: Dict[str, Tuple[dict, str]] = field(default_factory=dict)  # ID -> (stored result, kind)
+
+
+class Deduplicator:
+    """Share one LLM result between identical (or near-identical) reports.
+
+    Events are dicts with ``id``, ``subject`` and ``description`` keys, as
+    passed to the pipelines' ``classify_batch``. Use ``plan`` before
+    classification and ``expand`` afterwards.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        cache: Optional[ResponseCache] = None,
+        near_threshold: Optional[float] = None,
+        num_perm: int = DEFAULT_NUM_PERM,
+    ):
+        """Initialize deduplicator.
+
+        Args:
+            namespace: Run configuration the results depend on (prompt hash,
+                model, temperature, ...); results are only shared within it
+            cache: Optional response cache used to share results across runs
+            near_threshold: Enable MinHash near-duplicate matching at this
+                estimated Jaccard similarity (None = exact matches only)
+            num_perm: MinHash permutations for near-duplicate matching
+        """
+        self.namespace = namespace
+        self.cache = cache
+        self.lsh = MinHashLSH(near_threshold, num_perm=num_perm) if near_threshold else None
+        self._results: Dict[str, dict] = {}  # text hash -> stored result
+        self.stats = {"seen": 0, "exact": 0, "near": 0, "cross_run": 0}
+
+    def _cache_key(self, digest: str) -> str:
+        return hashlib.sha256(f"dedup\n{self.namespace}\n{digest}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, digest: str) -> Optional[dict]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self._cache_key(digest), count=False)
+        return json.loads(cached) if cached is not None else None
+
+    def plan(self, events: List[dict]) -> DedupPlan:
+        """Decide which events need an LLM call.
+
+        Args:
+            events: Events of one batch
+
+        Returns:
+            DedupPlan whose ``unique`` events should be classified
+        """
+        plan = DedupPlan(events=list(events), unique=[], hashes={})
+        batch_reps: Dict[str, str] = {}  # text hash -> representative event ID
+
+        for event in events:
+            event_id = str(event["id"])
+            digest = text_hash(event.get("subject"), event.get("description"))
+            plan.hashes[event_id] = digest
+            self.stats["seen"] += 1
+
+            if digest in batch_reps:
+                plan.duplicates[event_id] = (batch_reps[digest], "exact")
+                self.stats["exact"] += 1
+                continue
+            if digest in self._results:
+                plan.reused[event_id] = (self._results[digest], "exact")
+                self.stats["exact"] += 1
+                continue
+            stored = self._lookup(digest)
+            if stored is not None:
+                self._results[digest] = stored
+                plan.reused[event_id] = (stored, "cross_run")
+                self.stats["cross_run"] += 1
+                continue
+
+            if self.lsh is not None:
+                signature = self.lsh.signature(normalize_text(event.get("subject"), event.get("description")))
+                match = self.lsh.query(signature)
+                if match in batch_reps:
+                    plan.duplicates[event_id] = (batch_reps[match], "near")
+                    self.stats["near"] += 1
+                    continue
+                if match in self._results:
+                    plan.reused[event_id] = (self._results[match], "near")
+                    self.stats["near"] += 1
+                    continue
+                if match is None:
+                    self.lsh.insert(digest, signature)
+
+            batch_reps[digest] = event_id
+            plan.unique.append(event)
+
+        return plan
+
+    def expand(
+        self,
+        plan: DedupPlan,
+        predictions: List[dict],
+        errors: List[dict],
+    ) -> Tuple[List[dict], List[dict]]:
+        """Fan results of the classified events out to their duplicates.
+
+        Successful results are remembered for later batches and stored in the
+        cache for later runs. Duplicates of failed events get a copy of the
+        error, so they are retried with it on the next run.
+
+        Args:
+            plan: Plan returned by ``plan``
+            predictions: Predictions for ``plan.unique``
+            errors: Errors for ``plan.unique``
+
+        Returns:
+            Tuple of (predictions, errors) for all events, in input order
+        """
+        pred_by_id = {str(p["id"]): p for p in predictions}
+        error_by_id = {str(e["id"]): e for e in errors}
+
+        for event_id, pred in pred_by_id.items():
+            digest = plan.hashes.get(event_id)
+            if digest is None:
+                continue
+            stored = {"id": event_id, "pred": pred["pred"], "meta": pred.get("meta", {})}
+            self._results[digest] = stored
+            if self.cache is not None:
+                self.cache.put(self._cache_key(digest), json.dumps(stored, ensure_ascii=False))
+
+        def copy_for(event: dict, source: dict, source_id: str, kind: str) -> dict:
+            pred = {
+                "id": event["id"],
+                "subject": event.get("subject"),
+                "description": event.get("description"),
+                "pred": copy.deepcopy(source["pred"]),
+                "meta": {
+                    **source.get("meta", {}),
+                    "latency_ms": 0,
+                    "attempts": 0,
+                    "dedup": {"kind": kind, "source_id": source_id},
+                },
+            }
+            return pred
+
+        all_predictions: List[dict] = []
+        all_errors: List[dict] = []
+        for event in plan.events:
+            event_id = str(event["id"])
+            if event_id in plan.duplicates:
+                source_id, kind = plan.duplicates[event_id]
+                if source_id in pred_by_id:
+                    all_predictions.append(copy_for(event, pred_by_id[source_id], source_id, kind))
+                elif source_id in error_by_id:
+                    all_errors.append({**error_by_id[source_id], "id": event["id"]})
+            elif event_id in plan.reused:
+                stored, kind = plan.reused[event_id]
+                all_predictions.append(copy_for(event, stored, str(stored["id"]), kind))
+            elif event_id in pred_by_id:
+                all_predictions.append(pred_by_id[event_id])
+            elif event_id in error_by_id:
+                all_errors.append(error_by_id[event_id])
+
+        return all_predictions, all_errors
+
+    def summary(self) -> Dict[str, float]:
+        """Counters plus the share of events answered without an LLM call."""
+        hits = self.stats["exact"] + self.stats["near"] + self.stats["cross_run"]
+        return {
+            **self.stats,
+            "hits": hits,
+            "hit_rate": hits / self.stats["seen"] if self.stats["seen"] else 0.0,
+        }
@@ -0,0 +1,83 @@
+"""Typed error classification for Gemini API failures."""
+import socket
+from enum import Enum
+from typing import Optional
+from google.genai import errors as genai_errors
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - httpx ships with google-genai
+    httpx = None
+
+
+class ErrorKind(str, Enum):
+    """Category of a failed classification call."""
+
+    QUOTA = "quota"            # 429 / RESOURCE_EXHAUSTED
+    SERVER = "server"          # 5xx (incl. 503 overloaded)
+    TIMEOUT = "timeout"        # Client or gateway timeout
+    VALIDATION = "validation"  # Response did not match the output schema
+    API = "api"                # Any other (non-retryable) failure
+
+
+# Error kinds worth retrying with backoff (the request itself was fine)
+TRANSIENT_KINDS = {ErrorKind.QUOTA, ErrorKind.SERVER, ErrorKind.TIMEOUT}
+
+# Error kinds that signal the service is overloaded (drive AIMD decrease)
+THROTTLE_KINDS = {ErrorKind.QUOTA, ErrorKind.SERVER}
+
+_MESSAGE_PREFIXES = {
+    ErrorKind.QUOTA: "Rate limit error",
+    ErrorKind.SERVER: "Server error",
+    ErrorKind.TIMEOUT: "Timeout error",
+    ErrorKind.VALIDATION: "Validation error",
+    ErrorKind.API: "API error",
+}
+
+
+class LLMError(str):
+    """Error message that also carries its ``ErrorKind``.
+
+    Subclasses ``str`` so existing callers that log or serialize error
+    messages keep working, while new callers can branch on ``.kind``.
+    """
+
+    kind: ErrorKind
+
+    def __new__(cls, kind: ErrorKind, detail: str) -> "LLMError":
+        obj = super().__new__(cls, f"{_MESSAGE_PREFIXES[kind]}: {detail}")
+        obj.kind = kind
+        return obj
+
+    @property
+    def is_transient(self) -> bool:
+        """Whether retrying the same request may succeed."""
+        return self.kind in TRANSIENT_KINDS
+
+
+def classify_exception(exc: BaseException) -> ErrorKind:
+    """Map an exception raised by the Gemini SDK to an ``ErrorKind``.
+
+    Args:
+        exc: Exception raised during ``generate_content``
+
+    Returns:
+        Matching error kind
+    """
+    if isinstance(exc, genai_errors.APIError):
+        code: Optional[int] = getattr(exc, "code", None)
+        status = str(getattr(exc, "status", "") or "")
+        if code == 429 or status == "RESOURCE_EXHAUSTED":
+            return ErrorKind.QUOTA
+        if code in (408, 504) or status == "DEADLINE_EXCEEDED":
+            return ErrorKind.TIMEOUT
+        if code is not None and code >= 500:
+            return ErrorKind.SERVER
+        return ErrorKind.API
+
+    if isinstance(exc, (TimeoutError, socket.timeout)):
+        return ErrorKind.TIMEOUT
+    if httpx is not None and isinstance(exc, httpx.TimeoutException):
+        return ErrorKind.TIMEOUT
+
+    return ErrorKind.API
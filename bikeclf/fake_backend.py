@@ -0,0 +1,251 @@
+"""Deterministic stand-in for the Gemini API.
+
+``FakeBackend`` exposes the ``models.generate_content`` surface of
+``genai.Client`` and answers with JSON generated from the request's
+``response_json_schema`` after a simulated latency. It can also inject the
+failure modes the clients must handle: 429 bursts, malformed JSON and
+schema violations. Every outcome is derived from a seed and the request
+content, so runs are reproducible and need neither network nor API key.
+
+Select it with ``BIKECLF_BACKEND=fake`` (tuned via ``BIKECLF_FAKE_BACKEND``,
+see ``FakeBackendConfig.parse``) or pass ``backend=FakeBackend(...)`` to a
+client directly.
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from google.genai import errors as genai_errors
+from bikeclf.rate_limit import CHARS_PER_TOKEN
+
+# Report IDs inside multi-report prompts (see ``format_batch_prompt``)
+BATCH_ID_PATTERN = re.compile(r"^### Meldung ID: (\S+)", re.MULTILINE)
+
+# Throttled calls fail fast compared to a full generation
+THROTTLE_LATENCY_FACTOR = 0.1
+
+_LATENCY_PARAMS = {"fixed": 1, "uniform": 2, "lognormal": 2}
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Latency distribution in milliseconds.
+
+    ``fixed:MS``, ``uniform:LO:HI`` or ``lognormal:MEDIAN:SIGMA``.
+    """
+
+    kind: str = "lognormal"
+    params: Tuple[float, ...] = (300.0, 0.4)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parse a ``kind:param[:param]`` spec such as ``lognormal:300:0.4``."""
+        kind, *params = spec.split(":")
+        if _LATENCY_PARAMS.get(kind) != len(params):
+            raise ValueError(
+                f"Invalid latency spec {spec!r} "
+                "(use fixed:MS, uniform:LO:HI or lognormal:MEDIAN:SIGMA)"
+            )
+        return cls(kind, tuple(float(p) for p in params))
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one latency in milliseconds."""
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma)
+
+
+@dataclass
+class FakeBackendConfig:
+    """Behaviour of a ``FakeBackend``."""
+
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    throttle_every: int = 0  # Period of 429 bursts in requests (0 = never)
+    throttle_burst: int = 0  # Consecutive 429s at the end of each period
+    malformed_rate: float = 0.0  # Share of responses that are truncated JSON
+    invalid_rate: float = 0.0  # Share of responses missing a required field
+    seed: int = 0
+    time_scale: float = 1.0  # Multiplier for simulated sleeps (0 = instant)
+
+    @classmethod
+    def parse(cls, spec: str) -> "FakeBackendConfig":
+        """Parse comma-separated ``key=value`` pairs.
+
+        Example: ``latency=lognormal:400:0.5,throttle_every=200,throttle_burst=10,malformed_rate=0.02``
+
+        Args:
+            spec: Settings to override; an empty string keeps the defaults
+
+        Returns:
+            Parsed configuration
+        """
+        types = {f.name: f.type for f in fields(cls)}
+        values: Dict[str, Any] = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, sep, value = item.partition("=")
+            if not sep or key not in types:
+                raise ValueError(f"Unknown fake backend setting: {item!r}")
+            if key == "latency":
+                values[key] = LatencyModel.parse(value)
+            else:
+                values[key] = types[key](value)
+        return cls(**values)
+
+
+def build_instance(
+    schema: Dict[str, Any],
+    rng: random.Random,
+    batch_ids: Optional[List[str]] = None,
+    root: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """Generate a value conforming to a (Pydantic-generated) JSON schema.
+
+    Args:
+        schema: Schema node
+        rng: Random source for enum choices and numbers
+        batch_ids: Report IDs; arrays of objects with an ``id`` property get
+            one item per ID (multi-report responses)
+        root: Root schema used to resolve ``$ref`` (defaults to ``schema``)
+
+    Returns:
+        JSON-serializable value
+    """
+    root = root if root is not None else schema
+    if "$ref" in schema:
+        name = schema["$ref"].rsplit("/", 1)[-1]
+        return build_instance(root["$defs"][name], rng, batch_ids, root)
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"] or schema["anyOf"]
+        return build_instance(options[0], rng, batch_ids, root)
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: build_instance(prop, rng, batch_ids, root)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = schema.get("items", {})
+        item_schema = root["$defs"][items["$ref"].rsplit("/", 1)[-1]] if "$ref" in items else items
+        if batch_ids and "id" in item_schema.get("properties", {}):
+            return [
+                {**build_instance(item_schema, rng, None, root), "id": item_id}
+                for item_id in batch_ids
+            ]
+        return [build_instance(items, rng, None, root) for _ in range(schema.get("minItems", 0))]
+    if kind == "string":
+        return "Simulated response."[: schema.get("maxLength", 500)]
+    if kind in ("number", "integer"):
+        value = rng.uniform(schema.get("minimum", 0.0), schema.get("maximum", 1.0))
+        return int(value) if kind == "integer" else round(value, 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return None
+
+
+class FakeBackend:
+    """Simulated ``genai.Client`` for offline runs, tests and benchmarks.
+
+    Answers (labels, confidences) depend only on the seed, model and prompt,
+    so repeated runs agree. Fault injection depends on how often the same
+    request was seen (retries may succeed) and, for 429 bursts, on the
+    global request sequence. The backend is thread-safe.
+    """
+
+    def __init__(self, config: Optional[FakeBackendConfig] = None):
+        """Initialize backend.
+
+        Args:
+            config: Simulated behaviour (defaults: lognormal latency, no faults)
+        """
+        self.config = config or FakeBackendConfig()
+        self.models = self  # ``genai.Client().models`` surface
+        self.stats = {"requests": 0, "throttled": 0, "malformed": 0, "invalid": 0}
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._seen: Dict[str, int] = {}
+
+    def _sleep(self, latency_ms: float) -> None:
+        if self.config.time_scale > 0:
+            time.sleep(latency_ms * self.config.time_scale / 1000)
+
+    def generate_content(self, model: str, contents: Any, config: Optional[Dict[str, Any]] = None):
+        """Simulate ``models.generate_content``.
+
+        Args:
+            model: Model identifier
+            contents: Prompt text
+            config: Request config; ``response_json_schema`` shapes the answer
+
+        Returns:
+            Object with ``text`` and ``usage_metadata`` attributes, like the
+            SDK response (token counts estimated from text length)
+
+        Raises:
+            google.genai.errors.ClientError: 429 during a simulated burst
+        """
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+        request_key = hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+        with self._lock:
+            sequence = self._sequence
+            self._sequence += 1
+            attempt = self._seen.get(request_key, 0)
+            self._seen[request_key] = attempt + 1
+            self.stats["requests"] += 1
+
+        cfg = self.config
+        rng = random.Random(f"{cfg.seed}:{request_key}:{attempt}")
+        latency_ms = cfg.latency.sample(rng)
+
+        if cfg.throttle_every and sequence % cfg.throttle_every >= cfg.throttle_every - cfg.throttle_burst:
+            self._sleep(latency_ms * THROTTLE_LATENCY_FACTOR)
+            with self._lock:
+                self.stats["throttled"] += 1
+            raise genai_errors.ClientError(
+                429,
+                {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Simulated rate limit"}},
+            )
+
+        self._sleep(latency_ms)
+        schema = (config or {}).get("response_json_schema") or {}
+        answer = build_instance(
+            schema,
+            random.Random(f"{cfg.seed}:{request_key}"),
+            BATCH_ID_PATTERN.findall(prompt),
+        )
+        text = json.dumps(answer, ensure_ascii=False)
+
+        roll = rng.random()
+        if roll < cfg.malformed_rate:
+            fault, text = "malformed", text[: len(text) // 2]
+        elif roll < cfg.malformed_rate + cfg.invalid_rate and isinstance(answer, dict) and schema.get("required"):
+            answer.pop(schema["required"][0], None)
+            fault, text = "invalid", json.dumps(answer, ensure_ascii=False)
+        else:
+            fault = None
+        if fault:
+            with self._lock:
+                self.stats[fault] += 1
+        prompt_tokens = len(prompt) // CHARS_PER_TOKEN
+        output_tokens = len(text) // CHARS_PER_TOKEN
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                cached_content_token_count=None,
+                thoughts_token_count=None,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
@@ -0,0 +1,163 @@
+"""Local index of what each event was last classified with.
+
+For every written prediction the pipelines store a fingerprint
+``(prompt_hash, model_id, text_hash)`` per phase and event. Incremental runs
+(``--incremental``) then only reclassify events whose report text changed or
+that were classified with a different prompt or model. The index also keeps
+an ``updated_at`` watermark per phase for ``--changed-since``.
+"""
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+from bikeclf.config import CACHE_DIR
+
+DEFAULT_FINGERPRINT_PATH = CACHE_DIR / "fingerprints.sqlite"
+
+# SQLite's default limit on bound parameters per statement is 999
+_QUERY_CHUNK = 500
+
+
+class FingerprintStore:
+    """SQLite-backed fingerprint index, safe to share between threads."""
+
+    def __init__(self, path: Path = DEFAULT_FINGERPRINT_PATH):
+        """Open (or create) the index.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " phase TEXT NOT NULL,"
+            " event_id TEXT NOT NULL,"
+            " prompt_hash TEXT NOT NULL,"
+            " model_id TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " classified_at TEXT NOT NULL,"
+            " PRIMARY KEY (phase, event_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            " phase TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def stale(
+        self,
+        phase: str,
+        events: Iterable[Tuple[str, str]],
+        prompt_hash: str,
+        model_id: str,
+    ) -> Set[str]:
+        """Return IDs whose stored fingerprint differs from the current one.
+
+        Args:
+            phase: 'phase1' or 'phase2'
+            events: (event_id, text_hash) pairs
+            prompt_hash: Hash of the current prompt
+            model_id: Current model
+
+        Returns:
+            IDs that are new, edited or classified with another prompt/model
+        """
+        current = {str(event_id): digest for event_id, digest in events}
+        ids = list(current)
+        stored = {}
+        with self._lock:
+            for start in range(0, len(ids), _QUERY_CHUNK):
+                chunk = ids[start : start + _QUERY_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT event_id, prompt_hash, model_id, text_hash FROM fingerprints"
+                    f" WHERE phase = ? AND event_id IN ({','.join('?' * len(chunk))})",
+                    (phase, *chunk),
+                ).fetchall()
+                stored.update({row[0]: row[1:] for row in rows})
+        return {
+            event_id
+            for event_id, digest in current.items()
+            if stored.get(event_id) != (prompt_hash, model_id, digest)
+        }
+
+    def record(
+        self,
+        phase: str,
+        events: Iterable[Tuple[str, str]],
+        prompt_hash: str,
+        model_id: str,
+    ) -> None:
+        """Store fingerprints for events whose predictions were written.
+
+        Args:
+            phase: 'phase1' or 'phase2'
+            events: (event_id, text_hash) pairs
+            prompt_hash: Hash of the prompt used
+            model_id: Model the run was configured with
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        rows: List[tuple] = [
+            (phase, str(event_id), prompt_hash, model_id, digest, now)
+            for event_id, digest in events
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints"
+                " (phase, event_id, prompt_hash, model_id, text_hash, classified_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def get_watermark(self, phase: str) -> Optional[str]:
+        """Return the ``updated_at`` watermark of the last complete run."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM watermarks WHERE phase = ?", (phase,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, phase: str, value: str) -> None:
+        """Store the ``updated_at`` watermark for the next ``--changed-since`` run."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks (phase, value) VALUES (?, ?)",
+                (phase, value),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def resolve_changed_since(store: FingerprintStore, phase: str, value: Optional[str]) -> Optional[str]:
+    """Turn a ``--changed-since`` argument into an ``updated_at`` lower bound.
+
+    Args:
+        store: Fingerprint index holding the watermarks
+        phase: 'phase1' or 'phase2'
+        value: ISO timestamp, 'last' for the stored watermark, or None
+
+    Returns:
+        ISO timestamp to filter on, or None for a full scan
+    """
+    if value is None:
+        return None
+    if value == "last":
+        return store.get_watermark(phase)
+    return datetime.fromisoformat(value).isoformat()
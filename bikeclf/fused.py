@@ -0,0 +1,51 @@
+"""Fused Phase 1 + Phase 2 prompt: relevance and issue category in one call."""
+import hashlib
+from typing import Tuple
+from bikeclf.phase1.prompt_loader import load_prompt as load_phase1_prompt
+from bikeclf.phase2.prompt_loader import load_prompt as load_phase2_prompt
+
+FUSED_INSTRUCTIONS = (
+    "ZUSATZAUFGABE (nur wenn label = \"true\"): Ordne die Meldung zusätzlich "
+    "einer Problemkategorie zu. Verwende dafür ausschließlich die folgenden "
+    "Regeln der Kategorisierung."
+)
+
+FUSED_OUTPUT = """AUSGABE (striktes JSON, ersetzt alle obigen Ausgabeformate):
+{
+  "label": "true" | "false" | "uncertain",
+  "evidence": ["kurzes wörtliches Zitat aus dem Input"],
+  "reasoning": "1 Satz, warum (nur auf Evidence gestützt).",
+  "confidence": 0.0 bis 1.0,
+  "issue": null | {
+    "category": "<genau eine der 9 Kategorien>",
+    "evidence": ["kurzes wörtliches Zitat aus dem Input"],
+    "reasoning": "1 Satz, warum diese Kategorie.",
+    "confidence": 0.0 bis 1.0
+  }
+}
+"issue" ist null, wenn label nicht "true" ist."""
+
+
+def load_fused_prompt(phase1_version: str, phase2_version: str) -> Tuple[str, str]:
+    """Combine a Phase 1 and a Phase 2 prompt version into one fused prompt.
+
+    Args:
+        phase1_version: Phase 1 prompt version (e.g., 'v006')
+        phase2_version: Phase 2 prompt version (e.g., 'v001')
+
+    Returns:
+        Tuple of (prompt_content, content_hash) like ``load_prompt``
+
+    Raises:
+        FileNotFoundError: If either prompt version doesn't exist
+    """
+    phase1_prompt, _ = load_phase1_prompt(phase1_version)
+    phase2_prompt, _ = load_phase2_prompt(phase2_version)
+
+    content = (
+        f"{phase1_prompt}\n\n---\n\n{FUSED_INSTRUCTIONS}\n\n"
+        f"{phase2_prompt}\n\n---\n\n{FUSED_OUTPUT}"
+    )
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+
+    return content, content_hash
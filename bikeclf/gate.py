@@ -0,0 +1,197 @@
+"""Local first-stage classifier that labels easy events without an LLM call.
+
+A TF-IDF + logistic regression model is trained on labels from earlier
+``predictions.jsonl`` runs. Events it scores confidently are labeled
+locally; only the ambiguous middle band goes to Gemini. A small, fixed
+share of confident events is still sent to the LLM ("audited") so every
+run can report how well the gate agrees with the model it replaces.
+"""
+import hashlib
+import json
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from bikeclf.config import RUNS_DIR
+
+DEFAULT_GATE_PATH = RUNS_DIR / "gate" / "gate.pkl"
+
+# Model ID recorded for predictions made by the gate
+GATE_MODEL_ID = "local-gate"
+
+
+def gate_text(subject: Optional[str], description: Optional[str]) -> str:
+    """Build the text the gate scores (same fields the LLM prompt uses)."""
+    return f"{subject or ''}\n{description or ''}"
+
+
+def load_training_examples(paths: Iterable[Path]) -> Tuple[List[str], List[bool]]:
+    """Collect true/false labels from previous LLM prediction files.
+
+    ``uncertain`` labels and predictions made by the gate itself are skipped;
+    if an ID appears in several files, the last occurrence wins.
+
+    Args:
+        paths: ``predictions.jsonl`` files from earlier runs
+
+    Returns:
+        Tuple of (texts, labels) where labels are True for bike-related
+    """
+    examples: Dict[str, Tuple[str, bool]] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                pred = row.get("pred", {})
+                if pred.get("label") not in ("true", "false"):
+                    continue
+                if row.get("meta", {}).get("model_id") == GATE_MODEL_ID:
+                    continue
+                examples[str(row["id"])] = (
+                    gate_text(row.get("subject"), row.get("description")),
+                    pred["label"] == "true",
+                )
+
+    texts = [text for text, _ in examples.values()]
+    labels = [label for _, label in examples.values()]
+    return texts, labels
+
+
+@dataclass
+class GateDecision:
+    """Gate verdict for one event."""
+
+    probability: float  # P(bike-related)
+    label: Optional[str]  # 'true'/'false' if confident, None for the LLM
+    audit: bool = False  # Confident, but also sent to the LLM for comparison
+
+
+class LocalGate:
+    """TF-IDF + logistic regression gate in front of the LLM."""
+
+    def __init__(
+        self,
+        negative_threshold: float = 0.05,
+        positive_threshold: float = 0.95,
+        audit_rate: float = 0.05,
+        model: Optional[Pipeline] = None,
+    ):
+        """Initialize gate.
+
+        Args:
+            negative_threshold: Label 'false' when P(bike) is at or below this
+            positive_threshold: Label 'true' when P(bike) is at or above this
+            audit_rate: Share of confident events also sent to the LLM
+            model: Fitted sklearn pipeline (None until ``fit`` or ``load``)
+        """
+        if not 0.0 <= negative_threshold < positive_threshold <= 1.0:
+            raise ValueError(
+                "Gate thresholds must satisfy 0 <= negative < positive <= 1, "
+                f"got {negative_threshold} and {positive_threshold}"
+            )
+        self.negative_threshold = negative_threshold
+        self.positive_threshold = positive_threshold
+        self.audit_rate = audit_rate
+        self.model = model
+
+    def fit(self, texts: Sequence[str], labels: Sequence[bool]) -> "LocalGate":
+        """Train the gate on labeled texts."""
+        self.model = Pipeline(
+            [
+                (
+                    "tfidf",
+                    TfidfVectorizer(
+                        analyzer="char_wb",
+                        ngram_range=(3, 5),
+                        sublinear_tf=True,
+                        min_df=2,
+                    ),
+                ),
+                (
+                    "clf",
+                    LogisticRegression(max_iter=1000, class_weight="balanced"),
+                ),
+            ]
+        )
+        self.model.fit(list(texts), [int(label) for label in labels])
+        return self
+
+    def predict_proba(self, texts: Sequence[str]) -> List[float]:
+        """Return P(bike-related) for each text."""
+        if self.model is None:
+            raise ValueError("Gate model is not trained; call fit() or load()")
+        return [float(p) for p in self.model.predict_proba(list(texts))[:, 1]]
+
+    def label_for(self, probability: float) -> Optional[str]:
+        """Map a probability to 'true', 'false' or None (ambiguous)."""
+        if probability <= self.negative_threshold:
+            return "false"
+        if probability >= self.positive_threshold:
+            return "true"
+        return None
+
+    def should_audit(self, event_id: str) -> bool:
+        """Deterministically pick ``audit_rate`` of IDs for LLM comparison."""
+        if self.audit_rate <= 0:
+            return False
+        digest = hashlib.sha256(str(event_id).encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2**64 < self.audit_rate
+
+    def decide(self, events: Sequence[Tuple[str, str, str]]) -> List[GateDecision]:
+        """Score events given as (id, subject, description) tuples.
+
+        Returns:
+            One ``GateDecision`` per event, in input order
+        """
+        if not events:
+            return []
+        probabilities = self.predict_proba(
+            [gate_text(subject, description) for _, subject, description in events]
+        )
+        decisions = []
+        for (event_id, _, _), probability in zip(events, probabilities):
+            label = self.label_for(probability)
+            decisions.append(
+                GateDecision(
+                    probability=probability,
+                    label=label,
+                    audit=label is not None and self.should_audit(event_id),
+                )
+            )
+        return decisions
+
+    def save(self, path: Path = DEFAULT_GATE_PATH) -> None:
+        """Pickle the trained model."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as handle:
+            pickle.dump(self.model, handle)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_GATE_PATH, **kwargs) -> "LocalGate":
+        """Load a model saved with ``save``; kwargs set thresholds/audit rate."""
+        with open(path, "rb") as handle:
+            model = pickle.load(handle)
+        return cls(model=model, **kwargs)
+
+
+def gate_summary(seen: int, skipped: int, audited: int, agreed: int) -> Dict[str, Optional[float]]:
+    """Skip rate and LLM agreement from a run's gate counters.
+
+    Args:
+        seen: Events scored by the gate
+        skipped: Events labeled by the gate without an LLM call
+        audited: Confident events also classified by the LLM
+        agreed: Audited events where gate and LLM labels match
+
+    Returns:
+        Dict with skip_rate and agreement (None without audits)
+    """
+    return {
+        "skip_rate": skipped / seen if seen else 0.0,
+        "agreement": agreed / audited if audited else None,
+    }
@@ -1,5 +1,6 @@
 """I/O utilities for reading datasets and writing artifacts."""
 import json
+import os
 from pathlib import Path
 from typing import List, Dict, Any
 import pandas as pd
@@ -54,13 +55,25 @@ def write_predictions_jsonl(
 def write_json(data: Dict[str, Any], output_path: Path) -> None:
     """Write dictionary to formatted JSON file.
 
+    The file is written to a temporary sibling, fsynced and renamed over
+    ``output_path``, so readers (and resumes after a crash) never see a
+    partially written file.
+
     Args:
         data: Dictionary to serialize
         output_path: Path to output JSON file
     """
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
 
 
 def append_error_jsonl(error_record: Dict[str, Any], output_path: Path) -> None:
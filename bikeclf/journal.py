@@ -0,0 +1,189 @@
+"""Append-only journal of per-event pipeline progress.
+
+Batch checkpoints only advance after a whole batch is classified and
+written, so a crash mid-batch used to lose every LLM result of that batch.
+The journal records two kinds of entries as they happen:
+
+- ``result``: a prediction, appended as soon as its LLM call returns;
+- ``written``: IDs whose Supabase write-back succeeded.
+
+On resume, ``replay`` rebuilds both sets: written events are skipped
+entirely and journaled results are written without calling the LLM again.
+Entries are flushed to the OS immediately and fsynced in groups, which
+bounds the loss on power failure to the last ``fsync_every`` entries (or
+``fsync_interval`` seconds) without an fsync per event.
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+JOURNAL_FILENAME = "journal.jsonl"
+
+
+@dataclass
+class JournalState:
+    """Progress recovered from a journal."""
+
+    results: Dict[str, dict] = field(default_factory=dict)  # ID -> prediction
+    written: Set[str] = field(default_factory=set)
+
+    def split(
+        self,
+        events: List[dict],
+        event_id: Callable[[dict], str],
+    ) -> Tuple[List[dict], List[dict], int]:
+        """Split a batch by what a previous attempt already did.
+
+        Args:
+            events: Events of one batch
+            event_id: Returns the ID of an event
+
+        Returns:
+            Tuple of (events still to classify, journaled predictions to
+            write, number of events already written)
+        """
+        pending, recovered, skipped = [], [], 0
+        for event in events:
+            eid = str(event_id(event))
+            if eid in self.written:
+                skipped += 1
+            elif eid in self.results:
+                recovered.append(self.results[eid])
+            else:
+                pending.append(event)
+        return pending, recovered, skipped
+
+
+class Journal:
+    """Thread-safe append-only JSONL journal with grouped fsyncs."""
+
+    def __init__(self, path: Path, fsync_every: int = 50, fsync_interval: float = 1.0):
+        """Open the journal for appending.
+
+        Args:
+            path: Journal file (usually ``<run_dir>/journal.jsonl``)
+            fsync_every: Entries between fsyncs
+            fsync_interval: Maximum seconds between fsyncs while appending
+        """
+        self.path = Path(path)
+        self.fsync_every = max(fsync_every, 1)
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        repair_tail(self.path)
+        self._handle = open(self.path, "a", encoding="utf-8")
+
+    def _append(self, entries: Iterable[dict], sync: bool = False) -> None:
+        lines = [json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries]
+        if not lines and not sync:
+            return
+        with self._lock:
+            self._handle.writelines(lines)
+            self._handle.flush()
+            self._unsynced += len(lines)
+            if (
+                sync
+                or self._unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval
+            ):
+                os.fsync(self._handle.fileno())
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+
+    def record_result(self, prediction: dict) -> None:
+        """Journal a prediction as soon as it is available."""
+        self._append([{"type": "result", "id": str(prediction["id"]), "prediction": prediction}])
+
+    def record_written(self, ids: Iterable[str]) -> None:
+        """Journal IDs whose write-back succeeded (fsynced immediately)."""
+        ids = [str(i) for i in ids]
+        if ids:
+            self._append([{"type": "written", "ids": ids}], sync=True)
+
+    def flush(self) -> None:
+        """Fsync everything appended so far."""
+        self._append([], sync=True)
+
+    def close(self) -> None:
+        """Fsync and close the journal."""
+        if not self._handle.closed:
+            self.flush()
+            self._handle.close()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def repair_tail(path: Path) -> None:
+    """Make a journal end with a complete line before appending to it.
+
+    A crash during a write can leave a partial last line; appending the
+    next entry to it would corrupt that entry too. A partial line is
+    truncated, while a complete entry that only lost its newline gets it
+    back.
+
+    Args:
+        path: Journal file; a missing or empty file is left alone
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, "rb+") as handle:
+        size = handle.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            handle.seek(start)
+            newline = handle.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end == size:
+            return
+        handle.seek(end)
+        tail = handle.read()
+        try:
+            json.loads(tail)
+        except ValueError:
+            handle.truncate(end)
+        else:
+            handle.write(b"\n")
+
+
+def replay(path: Path) -> JournalState:
+    """Rebuild progress from a journal file.
+
+    A truncated last line (crash during a write) is ignored.
+
+    Args:
+        path: Journal file; a missing file yields an empty state
+
+    Returns:
+        JournalState with journaled predictions and written IDs
+    """
+    state = JournalState()
+    if not Path(path).exists():
+        return state
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("type") == "result":
+                state.results[entry["id"]] = entry["prediction"]
+            elif entry.get("type") == "written":
+                state.written.update(entry["ids"])
+    for event_id in state.written:
+        state.results.pop(event_id, None)
+    return state
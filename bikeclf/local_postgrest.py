@@ -0,0 +1,679 @@
+"""Local PostgREST stand-in backed by SQLite.
+
+Implements the subset of the Supabase REST API the pipelines use, so they
+can run against a local database instead of production:
+
+- ``GET``/``HEAD /rest/v1/<table>`` with ``select``, ``order``, ``limit``,
+  ``offset`` and filters (``eq``, ``neq``, ``gt``, ``gte``, ``lt``, ``lte``,
+  ``is``, ``in``, ``like``, ``match``, ``not.`` negation, nested ``or``/``and``), plus
+  ``Prefer: count=exact`` (``Content-Range``);
+- ``PATCH /rest/v1/<table>`` with the same filters;
+- ``POST /rest/v1/<table>?on_conflict=...`` bulk upserts
+  (``resolution=merge-duplicates`` or ``ignore-duplicates``);
+- ``POST /rest/v1/rpc/<function>`` for the bulk write-back and backfill
+  lease functions in ``migrations/``.
+
+The ``events.updated_at`` trigger mirrors ``add_updated_at_column.sql``.
+Start it with ``scripts/local_supabase.py`` and point ``SUPABASE_URL`` at it.
+"""
+import csv
+import gzip
+import json
+import random
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib import parse
+
+from config.supabase_config import DEFINITELY_EXCLUDE, HIGH_POTENTIAL, MEDIUM_POTENTIAL
+
+# Column types: text, bool, real, int, json (arrays), timestamptz (ISO text)
+TABLES: Dict[str, Dict[str, str]] = {
+    "events": {
+        "service_request_id": "text",
+        "title": "text",
+        "description": "text",
+        "service_name": "text",
+        "category": "text",
+        "subcategory": "text",
+        "subcategory2": "text",
+        "requested_datetime": "timestamptz",
+        "updated_at": "timestamptz",
+        "bike_related": "bool",
+        "bike_confidence": "real",
+        "bike_evidence": "json",
+        "bike_reasoning": "text",
+        "bike_issue_category": "text",
+        "bike_issue_confidence": "real",
+        "bike_issue_evidence": "json",
+        "bike_issue_reasoning": "text",
+    },
+    "backfill_ranges": {
+        "job": "text",
+        "range_id": "int",
+        "lo": "text",
+        "hi": "text",
+        "cursor": "text",
+        "owner": "text",
+        "expires_at": "timestamptz",
+        "done": "bool",
+    },
+}
+PRIMARY_KEYS = {"events": ("service_request_id",), "backfill_ranges": ("job", "range_id")}
+COLUMN_DEFAULTS = {("backfill_ranges", "done"): "0"}
+
+# Report content columns; only changes to these bump events.updated_at
+CONTENT_COLUMNS = ("title", "description", "service_name", "category", "subcategory", "subcategory2")
+
+# RPCs updating events by service_request_id from {"rows": [...]}
+BULK_UPDATE_FUNCTIONS = {
+    "update_bike_classifications",
+    "update_bike_issue_classifications",
+    "update_bike_fused_classifications",
+}
+
+_COMPARISONS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+_NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')"
+
+
+class PostgRESTError(Exception):
+    """Request error reported to the client with an HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def utc_now() -> str:
+    """Current time in the stored timestamp format."""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def split_top_level(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses or double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    escaped = False
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+            continue
+        if char == "\\" and quoted:
+            current.append(char)
+            escaped = True
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current))
+    return [part for part in parts if part != ""]
+
+
+def unquote(value: str) -> str:
+    """Strip PostgREST double quotes and backslash escapes."""
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+class LocalPostgREST:
+    """SQLite database answering PostgREST-style queries (thread-safe)."""
+
+    def __init__(self, path: Path):
+        """Open (or create) the database.
+
+        Args:
+            path: SQLite file (``:memory:`` for a throwaway database)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        # Postgres ``~`` for the match/imatch operators (close enough for \S etc.)
+        self._conn.create_function(
+            "REGEXP", 2, lambda pattern, value: value is not None and re.search(pattern, value) is not None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        for table, columns in TABLES.items():
+            definitions = []
+            for name, kind in columns.items():
+                definition = f"{name} {'TEXT' if kind in ('text', 'json', 'timestamptz') else kind.upper()}"
+                if (table, name) in COLUMN_DEFAULTS:
+                    definition += f" NOT NULL DEFAULT {COLUMN_DEFAULTS[(table, name)]}"
+                definitions.append(definition)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"{', '.join(definitions)}, PRIMARY KEY ({', '.join(PRIMARY_KEYS[table])}))"
+            )
+        # No secondary indexes: SQLite would pick them over the primary key
+        # and sort every keyset page instead of walking service_request_id
+        changed = " OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in CONTENT_COLUMNS)
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS events_touch_updated_at"
+            f" AFTER UPDATE OF {', '.join(CONTENT_COLUMNS)} ON events"
+            f" FOR EACH ROW WHEN {changed}"
+            f" BEGIN UPDATE events SET updated_at = {_NOW_SQL} WHERE rowid = NEW.rowid; END"
+        )
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Value conversion
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _columns(table: str) -> Dict[str, str]:
+        if table not in TABLES:
+            raise PostgRESTError(404, f"relation \"{table}\" does not exist")
+        return TABLES[table]
+
+    def _column(self, table: str, name: str) -> str:
+        columns = self._columns(table)
+        if name not in columns:
+            raise PostgRESTError(400, f"column {table}.{name} does not exist")
+        return columns[name]
+
+    @staticmethod
+    def _to_sql(kind: str, value: Any) -> Any:
+        if value is None:
+            return None
+        if kind == "bool":
+            if isinstance(value, str):
+                return {"true": 1, "false": 0}[value.lower()]
+            return int(bool(value))
+        if kind == "json":
+            return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        if kind == "real":
+            return float(value)
+        if kind == "int":
+            return int(value)
+        return str(value)
+
+    @staticmethod
+    def _from_sql(kind: str, value: Any) -> Any:
+        if value is None:
+            return None
+        if kind == "bool":
+            return bool(value)
+        if kind == "json":
+            return json.loads(value)
+        return value
+
+    # ------------------------------------------------------------------
+    # Filters
+    # ------------------------------------------------------------------
+
+    def _condition(self, table: str, column: str, expr: str) -> Tuple[str, List[Any]]:
+        """Compile ``column=<expr>`` (e.g. ``gt.5``, ``not.is.null``) to SQL."""
+        kind = self._column(table, column)
+        negate = expr.startswith("not.")
+        if negate:
+            expr = expr[4:]
+        op, _, value = expr.partition(".")
+
+        if op == "is":
+            if value.lower() == "null":
+                sql, params = f"{column} IS NULL", []
+            elif value.lower() in ("true", "false"):
+                sql, params = f"{column} = ?", [self._to_sql("bool", value)]
+            else:
+                raise PostgRESTError(400, f"invalid is value: {value}")
+        elif op == "in":
+            if not (value.startswith("(") and value.endswith(")")):
+                raise PostgRESTError(400, f"invalid in list: {value}")
+            items = [self._to_sql(kind, unquote(item)) for item in split_top_level(value[1:-1])]
+            sql, params = f"{column} IN ({', '.join('?' * len(items))})", items
+        elif op in _COMPARISONS:
+            sql, params = f"{column} {_COMPARISONS[op]} ?", [self._to_sql(kind, unquote(value))]
+        elif op in ("like", "ilike"):
+            pattern = unquote(value).replace("*", "%")
+            sql = f"{column} LIKE ?" if op == "ilike" else f"{column} GLOB ?"
+            params = [pattern if op == "ilike" else pattern.replace("%", "*")]
+        elif op in ("match", "imatch"):
+            pattern = unquote(value)
+            sql, params = f"{column} REGEXP ?", [f"(?i){pattern}" if op == "imatch" else pattern]
+        else:
+            raise PostgRESTError(400, f"unsupported operator: {op}")
+
+        return (f"NOT ({sql})", params) if negate else (sql, params)
+
+    def _logic(self, table: str, operator: str, body: str) -> Tuple[str, List[Any]]:
+        """Compile ``or=(...)``/``and=(...)`` (possibly nested) to SQL."""
+        if not (body.startswith("(") and body.endswith(")")):
+            raise PostgRESTError(400, f"invalid {operator} expression: {body}")
+        clauses, params = [], []
+        for item in split_top_level(body[1:-1]):
+            negate = item.startswith("not.")
+            inner = item[4:] if negate else item
+            match = re.match(r"^(or|and)(\(.*\))$", inner)
+            if match:
+                sql, item_params = self._logic(table, match.group(1), match.group(2))
+                sql = f"NOT ({sql})" if negate else sql
+            else:
+                column, _, expr = item.partition(".")
+                sql, item_params = self._condition(table, column, expr)
+            clauses.append(f"({sql})")
+            params.extend(item_params)
+        return f" {operator.upper()} ".join(clauses), params
+
+    def _where(self, table: str, query: Sequence[Tuple[str, str]]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for name, value in query:
+            if name in _RESERVED_PARAMS:
+                continue
+            if name in ("or", "and", "not.or", "not.and"):
+                sql, item_params = self._logic(table, name.rsplit(".", 1)[-1], value)
+                sql = f"NOT ({sql})" if name.startswith("not.") else sql
+            else:
+                sql, item_params = self._condition(table, name, value)
+            clauses.append(f"({sql})")
+            params.extend(item_params)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _order(self, table: str, spec: Optional[str]) -> str:
+        if not spec:
+            return ""
+        terms = []
+        for item in spec.split(","):
+            column, *modifiers = item.split(".")
+            self._column(table, column)
+            term = column + (" DESC" if "desc" in modifiers else " ASC")
+            if "nullsfirst" in modifiers:
+                term += " NULLS FIRST"
+            elif "nullslast" in modifiers:
+                term += " NULLS LAST"
+            terms.append(term)
+        return " ORDER BY " + ", ".join(terms)
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+
+    def select(
+        self,
+        table: str,
+        query: Sequence[Tuple[str, str]],
+        count: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[int]]:
+        """Run a filtered, ordered, paginated select.
+
+        Args:
+            table: Table name
+            query: Query parameters in PostgREST syntax
+            count: Also count all matching rows (``Prefer: count=exact``)
+
+        Returns:
+            Tuple of (rows, offset, total matching rows or None)
+        """
+        columns = self._columns(table)
+        params = dict(query)
+        selected = [c for c in params.get("select", "*").split(",") if c]
+        if selected == ["*"]:
+            selected = list(columns)
+        for column in selected:
+            self._column(table, column)
+
+        where, where_params = self._where(table, query)
+        sql = f"SELECT {', '.join(selected)} FROM {table}{where}{self._order(table, params.get('order'))}"
+        limit_params: List[Any] = []
+        offset = int(params.get("offset", 0))
+        if "limit" in params or offset:
+            sql += " LIMIT ? OFFSET ?"
+            limit_params = [int(params.get("limit", -1)), offset]
+
+        with self._lock:
+            rows = self._conn.execute(sql, where_params + limit_params).fetchall()
+            total = None
+            if count:
+                total = self._conn.execute(f"SELECT COUNT(*) FROM {table}{where}", where_params).fetchone()[0]
+
+        kinds = [columns[c] for c in selected]
+        return (
+            [{c: self._from_sql(k, v) for c, k, v in zip(selected, kinds, row)} for row in rows],
+            offset,
+            total,
+        )
+
+    def update(self, table: str, query: Sequence[Tuple[str, str]], values: Dict[str, Any]) -> int:
+        """PATCH: set ``values`` on every row matching the filters.
+
+        Returns:
+            Number of updated rows
+        """
+        if not values:
+            return 0
+        assignments = [f"{c} = ?" for c in values]
+        new_values = [self._to_sql(self._column(table, c), v) for c, v in values.items()]
+        where, where_params = self._where(table, query)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE {table} SET {', '.join(assignments)}{where}", new_values + where_params
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def upsert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        on_conflict: Optional[str] = None,
+        ignore_duplicates: bool = False,
+    ) -> int:
+        """Bulk insert, merging (or ignoring) rows that hit the conflict key.
+
+        All rows must carry the same columns, like PostgREST bulk inserts.
+
+        Returns:
+            Number of rows sent
+        """
+        if not rows:
+            return 0
+        columns = list(rows[0])
+        kinds = [self._column(table, c) for c in columns]
+        keys = (on_conflict or ",".join(PRIMARY_KEYS[table])).split(",")
+        for key in keys:
+            self._column(table, key)
+
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        updates = [c for c in columns if c not in keys]
+        if ignore_duplicates or not updates:
+            sql += f" ON CONFLICT ({', '.join(keys)}) DO NOTHING"
+        else:
+            sql += f" ON CONFLICT ({', '.join(keys)}) DO UPDATE SET " + ", ".join(
+                f"{c} = excluded.{c}" for c in updates
+            )
+        try:
+            values = [[self._to_sql(k, row[c]) for c, k in zip(columns, kinds)] for row in rows]
+        except KeyError as exc:
+            raise PostgRESTError(400, f"all object keys must match: missing {exc}") from exc
+        with self._lock:
+            self._conn.executemany(sql, values)
+            self._conn.commit()
+        return len(rows)
+
+    def rpc(self, name: str, args: Dict[str, Any]) -> Any:
+        """Call one of the functions defined in ``migrations/``."""
+        if name in BULK_UPDATE_FUNCTIONS:
+            return self._bulk_update(args.get("rows") or [])
+        if name == "claim_backfill_range":
+            return self._claim_range(args["p_job"], args["p_owner"], args["p_ttl_seconds"])
+        if name == "renew_backfill_range":
+            return self._renew_range(
+                args["p_job"], args["p_range_id"], args["p_owner"], args["p_ttl_seconds"], args.get("p_cursor")
+            )
+        raise PostgRESTError(404, f"function {name} does not exist")
+
+    def _bulk_update(self, rows: List[Dict[str, Any]]) -> int:
+        updated = 0
+        with self._lock:
+            for row in rows:
+                values = {c: v for c, v in row.items() if c != "service_request_id"}
+                if not values:
+                    continue
+                cursor = self._conn.execute(
+                    f"UPDATE events SET {', '.join(f'{c} = ?' for c in values)} WHERE service_request_id = ?",
+                    [self._to_sql(self._column("events", c), v) for c, v in values.items()]
+                    + [str(row["service_request_id"])],
+                )
+                updated += cursor.rowcount
+            self._conn.commit()
+        return updated
+
+    def _claim_range(self, job: str, owner: str, ttl_seconds: int) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        expires = (now + timedelta(seconds=ttl_seconds)).isoformat(timespec="milliseconds")
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT range_id FROM backfill_ranges WHERE job = ? AND NOT done"
+                " AND (owner IS NULL OR expires_at < ?) ORDER BY range_id LIMIT 1",
+                (job, now.isoformat(timespec="milliseconds")),
+            ).fetchone()
+            if row is None:
+                return []
+            self._conn.execute(
+                "UPDATE backfill_ranges SET owner = ?, expires_at = ? WHERE job = ? AND range_id = ?",
+                (owner, expires, job, row[0]),
+            )
+            self._conn.commit()
+        rows, _, _ = self.select(
+            "backfill_ranges", [("job", f"eq.{job}"), ("range_id", f"eq.{row[0]}")]
+        )
+        return rows
+
+    def _renew_range(
+        self, job: str, range_id: int, owner: str, ttl_seconds: int, cursor: Optional[str]
+    ) -> bool:
+        expires = (datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)).isoformat(timespec="milliseconds")
+        with self._lock:
+            result = self._conn.execute(
+                "UPDATE backfill_ranges SET expires_at = ?, cursor = COALESCE(?, cursor)"
+                " WHERE job = ? AND range_id = ? AND owner = ? AND NOT done",
+                (expires, cursor, job, range_id, owner),
+            )
+            self._conn.commit()
+        return result.rowcount > 0
+
+    # ------------------------------------------------------------------
+    # Seeding
+    # ------------------------------------------------------------------
+
+    def seed(self, events: Iterable[Dict[str, Any]], batch_size: int = 10_000) -> int:
+        """Insert events (replacing existing IDs) in large transactions.
+
+        Args:
+            events: Event dicts keyed by ``events`` column names
+            batch_size: Rows per transaction
+
+        Returns:
+            Number of inserted events
+        """
+        total = 0
+        batch: List[Dict[str, Any]] = []
+        for event in events:
+            batch.append({"updated_at": utc_now(), **event})
+            if len(batch) >= batch_size:
+                total += self.upsert("events", batch)
+                batch = []
+        return total + self.upsert("events", batch)
+
+    def count(self, table: str = "events") -> int:
+        """Number of rows in ``table``."""
+        self._columns(table)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def events_from_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    """Read events from a CSV with id, subject, description and service_name columns."""
+    with open(path, "r", encoding="utf-8", newline="") as handle:
+        for row in csv.DictReader(handle):
+            yield {
+                "service_request_id": row["id"],
+                "title": row.get("subject") or row.get("title"),
+                "description": row.get("description") or None,
+                "service_name": row.get("service_name") or None,
+                "category": row.get("category") or row.get("service_name") or None,
+                "subcategory": row.get("subcategory") or None,
+                "subcategory2": row.get("subcategory2") or None,
+            }
+
+
+_SYNTHETIC_PHRASES = [
+    "Radweg voller Scherben",
+    "Schlagloch auf dem Radweg",
+    "Ampel für Radfahrer bleibt rot",
+    "Auto parkt auf dem Radweg",
+    "Hecke ragt in den Radweg",
+    "Markierung kaum noch sichtbar",
+    "Container voll, Müll daneben",
+    "Laterne brennt seit Tagen nicht",
+    "Gully verstopft, große Pfütze",
+    "Baustelle ohne Umleitung für Radfahrer",
+    "Parkscheinautomat nimmt kein Geld",
+    "Graffiti an der Hauswand",
+]
+
+
+def synthetic_events(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Generate ``count`` deterministic, realistic-looking events.
+
+    The category mix covers excluded, high- and medium-potential and unknown
+    services, and about 2% of events have no description, so prefilters and
+    pagination behave as on the real table.
+
+    Args:
+        count: Number of events (e.g. 1_000_000)
+        seed: Random seed
+
+    Yields:
+        Event dicts with IDs ``syn-0000000`` ... in key order
+    """
+    rng = random.Random(seed)
+    services = sorted(DEFINITELY_EXCLUDE) + sorted(HIGH_POTENTIAL) + sorted(MEDIUM_POTENTIAL) + ["Sonstiges"]
+    for i in range(count):
+        service = rng.choice(services)
+        phrases = rng.sample(_SYNTHETIC_PHRASES, k=rng.randint(1, 3))
+        description = None if rng.random() < 0.02 else f"{'. '.join(phrases)}. Meldung {i}."
+        yield {
+            "service_request_id": f"syn-{i:07d}",
+            "title": f"#{i}-2025 {service}",
+            "description": description,
+            "service_name": service,
+            "category": service,
+            "subcategory": None,
+            "subcategory2": None,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Translates HTTP requests into ``LocalPostgREST`` calls."""
+
+    store: LocalPostgREST
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    def _route(self) -> Tuple[str, Optional[str], List[Tuple[str, str]]]:
+        url = parse.urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if parts[:2] != ["rest", "v1"] or len(parts) not in (3, 4):
+            raise PostgRESTError(404, f"unknown path: {url.path}")
+        query = parse.parse_qsl(url.query, keep_blank_values=True)
+        if len(parts) == 4:
+            if parts[2] != "rpc":
+                raise PostgRESTError(404, f"unknown path: {url.path}")
+            return "rpc", parts[3], query
+        return "table", parts[2], query
+
+    def _body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw) if raw else None
+
+    def _prefer(self) -> set:
+        return {p.strip() for p in (self.headers.get("Prefer") or "").split(",") if p.strip()}
+
+    def _send(self, status: int, payload: Any = None, headers: Optional[Dict[str, str]] = None, head: bool = False) -> None:
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(0 if head else len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and not head:
+            self.wfile.write(body)
+
+    def _handle(self, method: str) -> None:
+        try:
+            kind, name, query = self._route()
+            body = self._body() if method in ("POST", "PATCH") else None
+            prefer = self._prefer()
+
+            if kind == "rpc":
+                if method != "POST":
+                    raise PostgRESTError(405, "RPC functions must be called with POST")
+                return self._send(200, self.store.rpc(name, body or {}))
+
+            if method in ("GET", "HEAD"):
+                rows, offset, total = self.store.select(name, query, count="count=exact" in prefer)
+                end = f"{offset}-{offset + len(rows) - 1}" if rows else "*"
+                content_range = f"{end}/{total if total is not None else '*'}"
+                return self._send(200, rows, {"Content-Range": content_range}, head=method == "HEAD")
+
+            if method == "PATCH":
+                if not isinstance(body, dict):
+                    raise PostgRESTError(400, "PATCH body must be a JSON object")
+                updated = self.store.update(name, query, body)
+                headers = {"Content-Range": f"0-{updated - 1}/{updated}" if updated else "*/0"}
+                return self._send(204, None, headers)
+
+            rows = body if isinstance(body, list) else [body]
+            self.store.upsert(
+                name,
+                rows,
+                on_conflict=dict(query).get("on_conflict"),
+                ignore_duplicates="resolution=ignore-duplicates" in prefer,
+            )
+            return self._send(201)
+        except PostgRESTError as exc:
+            self._send(exc.status, {"code": "PGRST", "message": exc.message})
+        except (ValueError, KeyError, sqlite3.Error) as exc:
+            self._send(400, {"code": "PGRST", "message": str(exc)})
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        self._handle("GET")
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self._handle("HEAD")
+
+    def do_PATCH(self) -> None:  # noqa: N802
+        self._handle("PATCH")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._handle("POST")
+
+
+def make_server(store: LocalPostgREST, host: str = "127.0.0.1", port: int = 54321) -> ThreadingHTTPServer:
+    """Create an HTTP server for ``store`` (port 0 picks a free port)."""
+    handler = type("LocalPostgRESTHandler", (_Handler,), {"store": store})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_background_server(store: LocalPostgREST, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve ``store`` from a daemon thread (for tests and benchmarks).
+
+    Returns:
+        Tuple of (server, base URL); call ``server.shutdown()`` when done
+    """
+    server = make_server(store, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -47,6 +47,9 @@ def discover_runs() -> List[Dict[str, Any]]:
                     "macro_f1": metrics.get("macro_f1", 0.0),
                     "total_predictions": config.get("successful_predictions", 0),
                     "failed_predictions": config.get("failed_predictions", 0),
+                    # Runs recorded before token accounting have no usage
+                    "cost_per_1k_events": (config.get("usage") or {}).get("cost_per_1k_events"),
+                    "tokens_per_event": (config.get("usage") or {}).get("tokens_per_event"),
                 }
             )
 
@@ -261,7 +264,9 @@ def main():
         (
             f"{r['name']} | {r['prompt_version']} | "
             f"{MODEL_DISPLAY_NAMES.get(r['model_id'], r['model_id'])} "
-            f"(Acc: {r['accuracy']:.3f}, F1: {r['macro_f1']:.3f})"
+            f"(Acc: {r['accuracy']:.3f}, F1: {r['macro_f1']:.3f}"
+            + (f", ${r['cost_per_1k_events']:.4f}/1k" if r["cost_per_1k_events"] is not None else "")
+            + ")"
         )
         for r in filtered_runs
     ]
@@ -285,6 +290,8 @@ def main():
         st.sidebar.markdown(
             f"**Failed Predictions:** {selected_run['failed_predictions']}"
         )
+    if selected_run["tokens_per_event"] is not None:
+        st.sidebar.markdown(f"**Tokens per Event:** {selected_run['tokens_per_event']:.0f}")
 
     # Load run data
     predictions, metrics, config, errors = load_run_data(selected_run["path"])
@@ -293,7 +300,7 @@ def main():
     st.header(f"📊 Run: {selected_run['name']}")
 
     # Metrics overview
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
 
     with col1:
         st.metric("Accuracy", f"{metrics['accuracy']:.3f}")
@@ -311,6 +318,10 @@ def main():
         total_misclassified = len(predictions) - total_correct
         st.metric("Misclassified", total_misclassified)
 
+    with col5:
+        cost = selected_run["cost_per_1k_events"]
+        st.metric("Cost / 1k Events", f"${cost:.4f}" if cost is not None else "n/a")
+
     # Per-class metrics
     st.subheader("📈 Per-Class Performance")
 
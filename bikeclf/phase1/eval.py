@@ -2,7 +2,7 @@
 import subprocess
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
 import typer
 from rich.console import Console
 from rich.table import Table
@@ -22,9 +22,25 @@ from bikeclf.io import (
     append_error_jsonl,
     read_predictions_jsonl,
 )
+from bikeclf.cache import open_cache
+from bikeclf.concurrency import map_concurrent
+from bikeclf.cascade import DEFAULT_CASCADE_THRESHOLD, escalate, summarize_cascade
+from bikeclf.context_cache import CONTEXT_CACHE_MODES
 from bikeclf.gemini_client import GeminiClient
 from bikeclf.metrics import compute_metrics
 from bikeclf.markdown_report import generate_misclassification_report
+from bikeclf.progress import eval_progress
+from bikeclf.timing import Timings, recording, span
+from bikeclf.usage import UsageMeter, format_cost, metering
+from bikeclf.sweep import (
+    SweepConfig,
+    expand_grid,
+    leaderboard_entry,
+    leaderboard_table,
+    parse_list,
+    run_sweep,
+    write_leaderboard,
+)
 from bikeclf.phase1.prompt_loader import (
     load_prompt,
     list_available_prompts,
@@ -83,12 +99,13 @@ def init_langfuse() -> Optional[any]:
         return None
 
 
-def create_run_directory(prompt_version: str, model_id: str) -> Path:
+def create_run_directory(prompt_version: str, model_id: str, suffix: str = "") -> Path:
     """Create run directory with timestamp, prompt version, and model name.
 
     Args:
         prompt_version: Prompt version identifier (e.g., 'v001')
         model_id: Model identifier (e.g., 'gemini-2.0-flash-001')
+        suffix: Optional extra name part (e.g., 't0.7' for sweep runs)
 
     Returns:
         Path to created run directory
@@ -98,10 +115,163 @@ def create_run_directory(prompt_version: str, model_id: str) -> Path:
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     model_short = get_model_short_name(model_id)
     run_dir = RUNS_DIR / f"{timestamp}_{prompt_version}_{model_short}"
+    if suffix:
+        run_dir = run_dir.with_name(f"{run_dir.name}_{suffix}")
     run_dir.mkdir(parents=True, exist_ok=True)
     return run_dir
 
 
+def classify_row(
+    client: GeminiClient,
+    row,
+    system_prompt: str,
+    prompt_version: str,
+    model: str,
+    temperature: float = 0.0,
+    max_tokens: int = 512,
+    langfuse=None,
+    cascade_model: Optional[str] = None,
+    cascade_threshold: float = DEFAULT_CASCADE_THRESHOLD,
+) -> Tuple[Optional[PredictionRecord], Optional[dict]]:
+    """Classify one dataset row (thread-safe, used by evaluate and sweep).
+
+    Args:
+        client: Gemini client
+        row: Dataset row with id, subject, description and gold_label
+        system_prompt: Prompt template from ``load_prompt``
+        prompt_version: Prompt version identifier (e.g., 'v001')
+        model: Model identifier
+        temperature: Sampling temperature
+        max_tokens: Maximum output tokens
+        langfuse: Optional Langfuse client; opens a generation span under
+            the caller's current span
+        cascade_model: Optional escalation model for uncertain results
+        cascade_threshold: Escalate results with confidence below this value
+
+    Returns:
+        Tuple of (prediction, None) on success or (None, error record)
+    """
+    # Format prompt with report details
+    with span("prompt_format"):
+        full_prompt = format_prompt(
+            system_prompt,
+            row["subject"],
+            row["description"],
+        )
+
+    # Create a nested generation span for this classification
+    generation_context = (
+        langfuse.start_as_current_generation(
+            name=f"classify_{row['id']}",
+            model=model,
+            input=full_prompt,
+            metadata={
+                "row_id": row["id"],
+                "prompt_version": prompt_version,
+                "gold_label": row["gold_label"],
+            },
+        )
+        if langfuse
+        else None
+    )
+
+    try:
+        if generation_context:
+            generation_context.__enter__()
+
+        # Tokens of every call made for this row (retries and escalation too)
+        with metering(UsageMeter()) as meter:
+            # Classify with retry logic
+            output, latency_ms, attempts, error = client.classify_with_retry(
+                prompt=full_prompt,
+                model_id=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+
+            # Escalate uncertain/low-confidence results (cascade mode)
+            cascade_meta = None
+            if cascade_model:
+                (output, latency_ms, attempts, error), cascade_meta = escalate(
+                    client,
+                    (output, latency_ms, attempts, error),
+                    full_prompt,
+                    primary_model_id=model,
+                    escalation_model_id=cascade_model,
+                    threshold=cascade_threshold,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+        usage = meter.total() if meter.by_model else None
+
+        timestamp_utc = datetime.now(timezone.utc).isoformat()
+
+        # Handle failure
+        if output is None:
+            error_record = {
+                "id": row["id"],
+                "subject": row["subject"],
+                "description": row["description"],
+                "gold_label": row["gold_label"],
+                "error": error,
+                "attempts": attempts,
+                "usage": usage.model_dump() if usage else None,
+                "timestamp_utc": timestamp_utc,
+            }
+            console.print(f"[red]✗ Failed: {row['id']} - {error}[/red]")
+
+            # Update generation with error
+            if generation_context:
+                langfuse.update_current_generation(
+                    output={"error": error},
+                    metadata={
+                        "latency_ms": latency_ms,
+                        "attempts": attempts,
+                        "status": "error",
+                    },
+                )
+            return None, error_record
+
+        # Create prediction record
+        meta = PredictionMeta(
+            model_id=cascade_meta.final_model_id if cascade_meta else model,
+            prompt_version=prompt_version,
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            timestamp_utc=timestamp_utc,
+            latency_ms=latency_ms,
+            attempts=attempts,
+            cascade=cascade_meta,
+            usage=usage,
+        )
+
+        record = PredictionRecord(
+            id=row["id"],
+            subject=row["subject"],
+            description=row["description"],
+            gold_label=row["gold_label"],
+            pred=output,
+            meta=meta,
+        )
+
+        # Update Langfuse generation with output
+        if generation_context:
+            langfuse.update_current_generation(
+                output=output.model_dump(),
+                metadata={
+                    "pred_label": output.label,
+                    "latency_ms": latency_ms,
+                    "attempts": attempts,
+                    "confidence": output.confidence,
+                },
+            )
+        return record, None
+
+    finally:
+        if generation_context:
+            generation_context.__exit__(None, None, None)
+
+
 @app.command()
 def evaluate(
     dataset: Path = typer.Option(
@@ -128,13 +298,54 @@ def evaluate(
         "--max-tokens",
         help="Maximum output tokens",
     ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Disable the persistent response cache",
+    ),
+    refresh_cache: bool = typer.Option(
+        False,
+        "--refresh-cache",
+        help="Re-query the model and overwrite cached responses",
+    ),
+    context_cache: str = typer.Option(
+        "off",
+        "--context-cache",
+        help="Send the system prompt once: off, cached, or instruction",
+    ),
+    cascade_model: Optional[str] = typer.Option(
+        None,
+        "--cascade-model",
+        help="Re-query uncertain/low-confidence results on this model (e.g. gemini-2.5-flash)",
+    ),
+    cascade_threshold: float = typer.Option(
+        DEFAULT_CASCADE_THRESHOLD,
+        "--cascade-threshold",
+        help="Escalate results with confidence below this value",
+    ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        "-w",
+        help="Number of rows to classify concurrently",
+    ),
+    prometheus_file: Optional[Path] = typer.Option(
+        None,
+        "--prometheus-file",
+        help="Also write stage timing histograms in Prometheus text format to this file",
+    ),
 ):
     """Run evaluation on dataset with specified prompt version."""
 
-    # Validate model
-    if model not in SUPPORTED_MODELS:
-        console.print(f"[red]✗ Unsupported model: {model}[/red]")
-        console.print(f"Supported models: {', '.join(SUPPORTED_MODELS)}")
+    # Validate models
+    for model_id in filter(None, [model, cascade_model]):
+        if model_id not in SUPPORTED_MODELS:
+            console.print(f"[red]✗ Unsupported model: {model_id}[/red]")
+            console.print(f"Supported models: {', '.join(SUPPORTED_MODELS)}")
+            raise typer.Exit(1)
+
+    if workers < 1:
+        console.print("[red]✗ --workers must be at least 1[/red]")
         raise typer.Exit(1)
 
     # Load and validate API configuration
@@ -147,7 +358,8 @@ def evaluate(
 
     # Initialize services
     console.print("[blue]Initializing services...[/blue]")
-    client = GeminiClient(api_config)
+    cache = open_cache(no_cache=no_cache, refresh=refresh_cache)
+    client = GeminiClient(api_config, cache=cache)
     langfuse = init_langfuse()
 
     # Load prompt
@@ -158,9 +370,20 @@ def evaluate(
         console.print(f"[red]✗ {e}[/red]")
         raise typer.Exit(1)
 
+    if context_cache not in CONTEXT_CACHE_MODES:
+        console.print(f"[red]✗ Unsupported context cache mode: {context_cache}[/red]")
+        console.print(f"Supported modes: {', '.join(CONTEXT_CACHE_MODES)}")
+        raise typer.Exit(1)
+    client.enable_context_cache(system_prompt, mode=context_cache)
+
+    # Per-stage wall time and token usage of this run (timings.json, config.json)
+    timings = Timings()
+    run_usage = UsageMeter()
+
     # Load dataset
     try:
-        df = load_dataset(dataset)
+        with timings.span("fetch"):
+            df = load_dataset(dataset)
         console.print(f"[green]✓ Loaded dataset: {len(df)} rows[/green]")
     except Exception as e:
         console.print(f"[red]✗ Failed to load dataset: {e}[/red]")
@@ -183,6 +406,7 @@ def evaluate(
                 "model_id": model,
                 "dataset_rows": len(df),
                 "temperature": temperature,
+                "workers": workers,
             },
         )
         if langfuse
@@ -193,125 +417,56 @@ def evaluate(
         if span_context:
             span_context.__enter__()
 
-        with console.status("[bold green]Processing reports...") as status:
-            for idx, row in df.iterrows():
-                status.update(f"Processing {row['id']} ({idx + 1}/{len(df)})")
-
-                # Format prompt with report details
-                full_prompt = format_prompt(
+        # Rows run on worker threads; map_concurrent copies the current
+        # context into each, so every generation nests under the eval span
+        rows = [row for _, row in df.iterrows()]
+        with eval_progress(console) as progress, recording(timings), metering(run_usage):
+            task = progress.add_task("Processing reports", total=len(rows))
+            results = map_concurrent(
+                lambda row: classify_row(
+                    client,
+                    row,
                     system_prompt,
-                    row["subject"],
-                    row["description"],
-                )
-
-                # Create a nested generation span for this classification
-                generation_context = (
-                    langfuse.start_as_current_generation(
-                        name=f"classify_{row['id']}",
-                        model=model,
-                        input=full_prompt,
-                        metadata={
-                            "row_id": row["id"],
-                            "gold_label": row["gold_label"],
-                        },
-                    )
-                    if langfuse
-                    else None
-                )
-
-                try:
-                    if generation_context:
-                        generation_context.__enter__()
-
-                    # Classify with retry logic
-                    output, latency_ms, attempts, error = client.classify_with_retry(
-                        prompt=full_prompt,
-                        model_id=model,
-                        temperature=temperature,
-                        max_tokens=max_tokens,
-                    )
-
-                    timestamp_utc = datetime.now(timezone.utc).isoformat()
-
-                    # Handle failure
-                    if output is None:
-                        error_record = {
-                            "id": row["id"],
-                            "subject": row["subject"],
-                            "description": row["description"],
-                            "gold_label": row["gold_label"],
-                            "error": error,
-                            "attempts": attempts,
-                            "timestamp_utc": timestamp_utc,
-                        }
-                        append_error_jsonl(error_record, errors_path)
-                        console.print(f"[red]✗ Failed: {row['id']} - {error}[/red]")
-
-                        # Update generation with error
-                        if generation_context:
-                            langfuse.update_current_generation(
-                                output={"error": error},
-                                metadata={
-                                    "latency_ms": latency_ms,
-                                    "attempts": attempts,
-                                    "status": "error",
-                                },
-                            )
-                        continue
-
-                    # Create prediction record
-                    meta = PredictionMeta(
-                        model_id=model,
-                        prompt_version=prompt,
-                        temperature=temperature,
-                        max_output_tokens=max_tokens,
-                        timestamp_utc=timestamp_utc,
-                        latency_ms=latency_ms,
-                        attempts=attempts,
-                    )
-
-                    record = PredictionRecord(
-                        id=row["id"],
-                        subject=row["subject"],
-                        description=row["description"],
-                        gold_label=row["gold_label"],
-                        pred=output,
-                        meta=meta,
-                    )
-
-                    predictions.append(record)
-
-                    # Update Langfuse generation with output
-                    if generation_context:
-                        langfuse.update_current_generation(
-                            output=output.model_dump(),
-                            metadata={
-                                "pred_label": output.label,
-                                "latency_ms": latency_ms,
-                                "attempts": attempts,
-                                "confidence": output.confidence,
-                            },
-                        )
-
-                finally:
-                    if generation_context:
-                        generation_context.__exit__(None, None, None)
+                    prompt,
+                    model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    langfuse=langfuse,
+                    cascade_model=cascade_model,
+                    cascade_threshold=cascade_threshold,
+                ),
+                rows,
+                concurrency=workers,
+                on_done=lambda done, total: progress.update(task, completed=done),
+            )
 
     finally:
         if span_context:
             span_context.__exit__(None, None, None)
 
-    # Save predictions
-    predictions_path = run_dir / "predictions.jsonl"
-    write_predictions_jsonl(predictions, predictions_path)
+    # Collect results in dataset order
+    with timings.span("write"):
+        for record, error_record in results:
+            if error_record is not None:
+                append_error_jsonl(error_record, errors_path)
+            else:
+                predictions.append(record)
+
+        # Save predictions
+        predictions_path = run_dir / "predictions.jsonl"
+        write_predictions_jsonl(predictions, predictions_path)
     console.print(f"\n[green]✓ Saved {len(predictions)} predictions to {predictions_path.name}[/green]")
 
+    usage_summary = run_usage.summary(events=len(df))
+
     # Compute and display metrics
     if predictions:
         gold_labels = [p.gold_label for p in predictions]
         pred_labels = [p.pred.label for p in predictions]
 
         metrics = compute_metrics(gold_labels, pred_labels)
+        metrics["tokens_per_event"] = usage_summary["tokens_per_event"]
+        metrics["cost_per_1k_events"] = usage_summary["cost_per_1k_events"]
 
         # Save metrics
         metrics_path = run_dir / "metrics.json"
@@ -320,7 +475,8 @@ def evaluate(
         # Display metrics
         console.print("\n[bold]Classification Metrics:[/bold]")
         console.print(f"Accuracy:  {metrics['accuracy']:.3f}")
-        console.print(f"Macro F1:  {metrics['macro_f1']:.3f}\n")
+        console.print(f"Macro F1:  {metrics['macro_f1']:.3f}")
+        console.print(f"Cost:      {format_cost(usage_summary)}\n")
 
         # Per-class metrics table
         table = Table(title="Per-Class Metrics")
@@ -341,6 +497,48 @@ def evaluate(
 
         console.print(table)
 
+        # Cascade trade-off: primary model alone vs. primary + escalation
+        if cascade_model:
+            report = summarize_cascade([p.meta.cascade for p in predictions])
+            primary_metrics = compute_metrics(
+                gold_labels,
+                [p.meta.cascade.primary_pred["label"] for p in predictions],
+            )
+            report["primary_only"] = {
+                "model_id": model,
+                "accuracy": primary_metrics["accuracy"],
+                "macro_f1": primary_metrics["macro_f1"],
+            }
+            report["cascade"] = {
+                "model_id": cascade_model,
+                "threshold": cascade_threshold,
+                "accuracy": metrics["accuracy"],
+                "macro_f1": metrics["macro_f1"],
+            }
+            write_json(report, run_dir / "cascade.json")
+
+            cascade_table = Table(title=f"Cascade ({report['escalated']} escalated, {report['escalation_rate']:.1%})")
+            cascade_table.add_column("Setup", style="cyan")
+            cascade_table.add_column("Accuracy", justify="right")
+            cascade_table.add_column("Macro F1", justify="right")
+            cascade_table.add_column("LLM calls", justify="right")
+            cascade_table.add_column("Latency (s)", justify="right")
+            cascade_table.add_row(
+                f"{model} only",
+                f"{primary_metrics['accuracy']:.3f}",
+                f"{primary_metrics['macro_f1']:.3f}",
+                str(report["predictions"]),
+                f"{report['primary_latency_ms'] / 1000:.1f}",
+            )
+            cascade_table.add_row(
+                f"{model} → {cascade_model}",
+                f"{metrics['accuracy']:.3f}",
+                f"{metrics['macro_f1']:.3f}",
+                str(report["predictions"] + report["escalated"]),
+                f"{(report['primary_latency_ms'] + report['escalation_latency_ms']) / 1000:.1f}",
+            )
+            console.print(cascade_table)
+
         # Generate misclassification report
         report_path = run_dir / "misclassifications.md"
         num_misclassified = generate_misclassification_report(predictions, report_path)
@@ -366,6 +564,12 @@ def evaluate(
         "dataset_rows": len(df),
         "successful_predictions": len(predictions),
         "failed_predictions": len(df) - len(predictions),
+        "response_cache": cache.stats() if cache else None,
+        "context_cache": context_cache,
+        "cascade_model": cascade_model,
+        "cascade_threshold": cascade_threshold if cascade_model else None,
+        "workers": workers,
+        "usage": usage_summary,
         "git_commit": get_git_commit(),
         "timestamp_utc": datetime.now(timezone.utc).isoformat(),
     }
@@ -373,6 +577,13 @@ def evaluate(
     config_path = run_dir / "config.json"
     write_json(config_data, config_path)
 
+    timings.write_json(run_dir / "timings.json")
+    if prometheus_file:
+        timings.write_prometheus(prometheus_file, labels={"pipeline": "phase1_eval", "run": run_dir.name})
+
+    if client.context_cache:
+        client.context_cache.close()
+
     # Flush Langfuse traces
     if langfuse:
         langfuse.flush()
@@ -381,6 +592,255 @@ def evaluate(
     console.print(f"\n[bold green]✓ Run complete: {run_dir}[/bold green]")
 
 
+@app.command()
+def sweep(
+    dataset: Path = typer.Option(
+        PROJECT_ROOT / "bike_related_gold_dataset_A_to_F.csv",
+        "--dataset",
+        "-d",
+        help="Path to gold standard CSV",
+    ),
+    prompts: List[str] = typer.Option(
+        ...,
+        "--prompt",
+        "-p",
+        help="Prompt versions (repeat or comma-separate, e.g. v001,v002)",
+    ),
+    models: List[str] = typer.Option(
+        ["gemini-2.0-flash-001"],
+        "--model",
+        "-m",
+        help="Model identifiers (repeat or comma-separate)",
+    ),
+    temperatures: List[str] = typer.Option(
+        ["0.0"],
+        "--temperature",
+        "-t",
+        help="Sampling temperatures (repeat or comma-separate)",
+    ),
+    max_tokens: int = typer.Option(
+        512,
+        "--max-tokens",
+        help="Maximum output tokens",
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Disable the persistent response cache",
+    ),
+    refresh_cache: bool = typer.Option(
+        False,
+        "--refresh-cache",
+        help="Re-query the model and overwrite cached responses",
+    ),
+    workers: int = typer.Option(
+        8,
+        "--workers",
+        "-w",
+        help="Requests in flight across all configurations",
+    ),
+):
+    """Evaluate every combination of prompts, models and temperatures.
+
+    Writes a standard run directory per configuration and a combined
+    leaderboard to runs/sweeps/.
+    """
+    prompts = parse_list(prompts)
+    models = parse_list(models)
+    try:
+        temps = [float(t) for t in parse_list(temperatures)]
+    except ValueError as e:
+        console.print(f"[red]✗ Invalid temperature: {e}[/red]")
+        raise typer.Exit(1)
+
+    # Validate models
+    for model_id in models:
+        if model_id not in SUPPORTED_MODELS:
+            console.print(f"[red]✗ Unsupported model: {model_id}[/red]")
+            console.print(f"Supported models: {', '.join(SUPPORTED_MODELS)}")
+            raise typer.Exit(1)
+
+    if workers < 1:
+        console.print("[red]✗ --workers must be at least 1[/red]")
+        raise typer.Exit(1)
+
+    # Load and validate API configuration
+    api_config = APIConfig()
+    try:
+        api_config.validate_required()
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        raise typer.Exit(1)
+
+    # One client, so every configuration shares its rate budget and cache
+    console.print("[blue]Initializing services...[/blue]")
+    cache = open_cache(no_cache=no_cache, refresh=refresh_cache)
+    client = GeminiClient(api_config, cache=cache)
+    langfuse = init_langfuse()
+
+    # Load prompts
+    loaded_prompts = {}
+    for version in prompts:
+        try:
+            loaded_prompts[version] = load_prompt(version)
+        except FileNotFoundError as e:
+            console.print(f"[red]✗ {e}[/red]")
+            raise typer.Exit(1)
+    console.print(f"[green]✓ Loaded prompts: {', '.join(prompts)}[/green]")
+
+    # Load dataset
+    try:
+        df = load_dataset(dataset)
+        console.print(f"[green]✓ Loaded dataset: {len(df)} rows[/green]")
+    except Exception as e:
+        console.print(f"[red]✗ Failed to load dataset: {e}[/red]")
+        raise typer.Exit(1)
+
+    rows = [row for _, row in df.iterrows()]
+    configs = expand_grid(prompts, models, temps)
+    total_requests = len(configs) * len(rows)
+    console.print(
+        f"[blue]Sweeping {len(configs)} configurations × {len(rows)} rows "
+        f"= {total_requests} requests ({workers} workers)[/blue]\n"
+    )
+
+    # Token usage per configuration (requests of all configurations interleave)
+    meters = {config: UsageMeter() for config in configs}
+
+    def classify(config: SweepConfig, row) -> Tuple[Optional[PredictionRecord], Optional[dict]]:
+        system_prompt, _ = loaded_prompts[config.prompt_version]
+        with metering(meters[config]):
+            return classify_row(
+                client,
+                row,
+                system_prompt,
+                config.prompt_version,
+                config.model_id,
+                temperature=config.temperature,
+                max_tokens=max_tokens,
+                langfuse=langfuse,
+            )
+
+    sweep_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    span_context = (
+        langfuse.start_as_current_span(
+            name=f"sweep_{sweep_id}",
+            metadata={
+                "prompt_versions": prompts,
+                "model_ids": models,
+                "temperatures": temps,
+                "dataset_rows": len(df),
+                "workers": workers,
+            },
+        )
+        if langfuse
+        else None
+    )
+
+    try:
+        if span_context:
+            span_context.__enter__()
+
+        with eval_progress(console) as progress:
+            task = progress.add_task("Sweeping", total=total_requests)
+            results = run_sweep(
+                classify,
+                configs,
+                rows,
+                concurrency=workers,
+                on_done=lambda done, total: progress.update(task, completed=done),
+            )
+
+    finally:
+        if span_context:
+            span_context.__exit__(None, None, None)
+
+    # Write one standard run directory per configuration
+    entries = []
+    for config in configs:
+        system_prompt, prompt_hash = loaded_prompts[config.prompt_version]
+        run_dir = create_run_directory(
+            config.prompt_version,
+            config.model_id,
+            suffix=f"t{config.temperature:g}" if len(temps) > 1 else "",
+        )
+        predictions = [record for record, _ in results[config] if record is not None]
+        errors_path = run_dir / "errors.jsonl"
+        for _, error_record in results[config]:
+            if error_record is not None:
+                append_error_jsonl(error_record, errors_path)
+
+        write_predictions_jsonl(predictions, run_dir / "predictions.jsonl")
+        usage_summary = meters[config].summary(events=len(df))
+        metrics = None
+        if predictions:
+            metrics = compute_metrics(
+                [p.gold_label for p in predictions],
+                [p.pred.label for p in predictions],
+            )
+            metrics["tokens_per_event"] = usage_summary["tokens_per_event"]
+            metrics["cost_per_1k_events"] = usage_summary["cost_per_1k_events"]
+            write_json(metrics, run_dir / "metrics.json")
+            generate_misclassification_report(predictions, run_dir / "misclassifications.md")
+
+        write_json(
+            {
+                "model_id": config.model_id,
+                "prompt_version": config.prompt_version,
+                "prompt_hash": prompt_hash,
+                "temperature": config.temperature,
+                "max_output_tokens": max_tokens,
+                "dataset_path": str(dataset),
+                "dataset_rows": len(df),
+                "successful_predictions": len(predictions),
+                "failed_predictions": len(df) - len(predictions),
+                "sweep_id": sweep_id,
+                "workers": workers,
+                "usage": usage_summary,
+                "git_commit": get_git_commit(),
+                "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+            },
+            run_dir / "config.json",
+        )
+        entries.append(
+            leaderboard_entry(
+                config,
+                metrics,
+                [p.meta.latency_ms for p in predictions],
+                len(df) - len(predictions),
+                run_dir,
+                cost_per_1k_events=usage_summary["cost_per_1k_events"],
+            )
+        )
+
+    leaderboard_path = RUNS_DIR / "sweeps" / f"{sweep_id}_leaderboard.json"
+    ranked = write_leaderboard(
+        leaderboard_path,
+        entries,
+        {
+            "sweep_id": sweep_id,
+            "dataset_path": str(dataset),
+            "dataset_rows": len(df),
+            "prompt_versions": prompts,
+            "model_ids": models,
+            "temperatures": temps,
+            "max_output_tokens": max_tokens,
+            "workers": workers,
+            "response_cache": cache.stats() if cache else None,
+            "git_commit": get_git_commit(),
+            "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+    console.print(leaderboard_table(ranked))
+
+    # Flush Langfuse traces
+    if langfuse:
+        langfuse.flush()
+        console.print("\n[green]✓ Langfuse traces flushed[/green]")
+
+    console.print(f"\n[bold green]✓ Sweep complete: {leaderboard_path}[/bold green]")
+
+
 @app.command("list-prompts")
 def list_prompts():
     """List all available prompt versions."""
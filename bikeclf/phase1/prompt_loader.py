@@ -1,7 +1,7 @@
 """Prompt versioning and loading for Phase 1."""
 import hashlib
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 from bikeclf.config import PROMPTS_DIR
 
 
@@ -70,3 +70,35 @@ def format_prompt(
     )
 
     return f"{system_prompt}\n\n{user_message}"
+
+
+def format_batch_prompt(
+    system_prompt: str,
+    reports: Sequence[Tuple[str, str, str]],
+) -> str:
+    """Format a single prompt that classifies several reports at once.
+
+    Args:
+        system_prompt: Base system prompt from version file
+        reports: Sequence of (id, subject, description) tuples
+
+    Returns:
+        Prompt with system instructions once, followed by every report
+        labelled with its ID. The model answers with ``{"results": [...]}``,
+        one entry per report carrying the report's ``id``.
+    """
+    blocks = [
+        f"### Meldung ID: {report_id}\n\n"
+        f"**Betreff:** {subject}\n\n"
+        f"**Beschreibung:** {description}"
+        for report_id, subject, description in reports
+    ]
+
+    batch_instructions = (
+        f"MEHRERE MELDUNGEN: Bewerte die folgenden {len(reports)} Meldungen "
+        "unabhängig voneinander nach den obigen Regeln. Antworte mit "
+        '{"results": [...]} und genau einem Ergebnis pro Meldung; '
+        'jedes Ergebnis enthält zusätzlich das Feld "id" mit der ID der Meldung.'
+    )
+
+    return f"{system_prompt}\n\n{batch_instructions}\n\n" + "\n\n".join(blocks)
@@ -0,0 +1,463 @@
+"""Phase 2 classification and Supabase write-back shared by the pipelines.
+
+Used by ``scripts/run_supabase_phase2_pipeline.py`` and, through
+``Phase2Handoff``, by the Phase 1 pipeline to categorize bike-related events
+as soon as Phase 1 labels them, without re-fetching them from Supabase.
+"""
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from bikeclf.cascade import DEFAULT_CASCADE_THRESHOLD, escalate
+from bikeclf.concurrency import AdaptiveConcurrency, map_concurrent
+from bikeclf.dedup import Deduplicator, text_hash
+from bikeclf.fingerprints import FingerprintStore
+from bikeclf.journal import Journal, replay
+from bikeclf.phase2.gemini_client import Phase2GeminiClient
+from bikeclf.phase2.prompt_loader import format_batch_prompt, format_prompt
+from bikeclf.pipeline import OrderedWriter
+from bikeclf.rate_limit import RateLimiter
+from bikeclf.schema import CascadeMeta
+from bikeclf.supabase import DEFAULT_WRITE_CHUNK_SIZE, SupabaseClient, bulk_write
+from bikeclf.timing import span
+
+# Columns Phase 2 needs from the events table
+PHASE2_EVENT_COLUMNS = "service_request_id,category,subcategory,subcategory2,description"
+
+# Phase name used in the fingerprint index
+PHASE2 = "phase2"
+
+
+def build_subject(event: dict) -> str:
+    """Build subject from category + subcategory + subcategory2.
+
+    Args:
+        event: Event dict with category, subcategory, subcategory2 fields
+
+    Returns:
+        Combined subject string (handles NULL values)
+    """
+    parts = [event.get("category")]
+
+    sub1 = event.get("subcategory")
+    if sub1 and sub1.upper() != "NULL":
+        parts.append(sub1)
+
+    sub2 = event.get("subcategory2")
+    if sub2 and sub2.upper() != "NULL":
+        parts.append(sub2)
+
+    return " - ".join(p for p in parts if p)
+
+
+def event_text_hash(event: dict) -> str:
+    """Text hash of an event row as Phase 2 sees it (for fingerprints)."""
+    return text_hash(build_subject(event), event.get("description"))
+
+
+def classify_batch(
+    client: Phase2GeminiClient,
+    system_prompt: str,
+    prompt_hash: str,
+    events: List[dict],
+    prompt_version: str,
+    model: str,
+    temperature: float,
+    concurrency: int = 1,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reports_per_request: int = 1,
+    cascade_model: Optional[str] = None,
+    cascade_threshold: float = DEFAULT_CASCADE_THRESHOLD,
+    dedup: Optional[Deduplicator] = None,
+    on_prediction: Optional[Callable[[dict], None]] = None,
+) -> Tuple[List[dict], List[dict]]:
+    """Classify a batch of events into Phase 2 categories.
+
+    With ``dedup``, duplicate reports share one LLM call. ``on_prediction``
+    is called (from worker threads) with each prediction as soon as its LLM
+    call returns, e.g. to journal it, and once more for every result shared
+    with a duplicate after the batch.
+
+    Returns:
+        Tuple of (predictions, errors)
+    """
+    to_classify = []
+    with span("prefilter"):
+        for event in events:
+            if not event.get("description"):
+                print(f"  Skipping {event['service_request_id']}: No description")
+                continue
+            # Build subject from category fields
+            to_classify.append(
+                {
+                    "id": str(event["service_request_id"]),
+                    "subject": build_subject(event),
+                    "description": event["description"],
+                }
+            )
+
+    plan = dedup.plan(to_classify) if dedup else None
+    if plan:
+        to_classify = plan.unique
+
+    def to_result(
+        event: dict,
+        group_size: int,
+        output,
+        latency_ms: int,
+        attempts: int,
+        error_msg,
+        cascade: Optional[CascadeMeta] = None,
+    ) -> Tuple[Optional[dict], Optional[dict]]:
+        if output:
+            print(f"  ✓ {event['id']}: {output.category} (conf={output.confidence:.2f})")
+            return (
+                {
+                    "id": event["id"],
+                    "subject": event["subject"],
+                    "description": event["description"],
+                    "pred": {
+                        "category": output.category,
+                        "evidence": output.evidence,
+                        "reasoning": output.reasoning,
+                        "confidence": output.confidence,
+                    },
+                    "meta": {
+                        "model_id": cascade.final_model_id if cascade else model,
+                        "prompt_version": prompt_version,
+                        "prompt_hash": prompt_hash,
+                        "temperature": temperature,
+                        "latency_ms": latency_ms,
+                        "attempts": attempts,
+                        "reports_per_request": group_size,
+                        **({"cascade": cascade.model_dump()} if cascade else {}),
+                        "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+                    },
+                },
+                None,
+            )
+
+        print(f"  ✗ {event['id']}: {error_msg}")
+        return (
+            None,
+            {
+                "id": event["id"],
+                "error": error_msg,
+                "error_kind": error_msg.kind.value,
+                "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+            },
+        )
+
+    def classify_group(group: List[dict]) -> List[Tuple[Optional[dict], Optional[dict]]]:
+        with span("prompt_format"):
+            prompts = {
+                event["id"]: format_prompt(
+                    system_prompt=system_prompt,
+                    subject=event["subject"],
+                    description=event["description"],
+                )
+                for event in group
+            }
+
+        if len(group) == 1:
+            # Classify with retry
+            results = {
+                event_id: client.classify_with_retry(
+                    prompt=prompt,
+                    model_id=model,
+                    temperature=temperature,
+                    max_tokens=512,
+                )
+                for event_id, prompt in prompts.items()
+            }
+        else:
+            with span("prompt_format"):
+                batch_prompt = format_batch_prompt(
+                    system_prompt,
+                    [(e["id"], e["subject"], e["description"]) for e in group],
+                )
+            results = client.classify_many(
+                batch_prompt, prompts, model_id=model, temperature=temperature
+            )
+
+        cascades = {}
+        if cascade_model:
+            for event_id, result in results.items():
+                results[event_id], cascades[event_id] = escalate(
+                    client,
+                    result,
+                    prompts[event_id],
+                    primary_model_id=model,
+                    escalation_model_id=cascade_model,
+                    threshold=cascade_threshold,
+                    temperature=temperature,
+                )
+
+        group_results = [
+            to_result(event, len(group), *results[event["id"]], cascade=cascades.get(event["id"]))
+            for event in group
+        ]
+        if on_prediction:
+            for pred, _ in group_results:
+                if pred is not None:
+                    on_prediction(pred)
+        return group_results
+
+    def report_progress(done: int, total: int) -> None:
+        if done % 10 == 0 or done == total:
+            print(f"  LLM progress: {done}/{total} requests")
+
+    groups = [
+        to_classify[i : i + reports_per_request]
+        for i in range(0, len(to_classify), max(reports_per_request, 1))
+    ]
+    grouped_results = map_concurrent(
+        classify_group,
+        groups,
+        concurrency=concurrency,
+        on_done=report_progress,
+        controller=controller,
+    )
+    results = [result for group in grouped_results for result in group]
+
+    predictions = [pred for pred, _ in results if pred is not None]
+    errors = [err for _, err in results if err is not None]
+    if plan:
+        predictions, errors = dedup.expand(plan, predictions, errors)
+        if on_prediction:
+            # Results fanned out to duplicates only exist from here on
+            classified = {str(event["id"]) for event in plan.unique}
+            for pred in predictions:
+                if str(pred["id"]) not in classified:
+                    on_prediction(pred)
+    return predictions, errors
+
+
+def write_predictions_to_supabase(
+    client: SupabaseClient,
+    predictions: List[dict],
+    rate_limiter: Optional[RateLimiter] = None,
+    chunk_size: int = DEFAULT_WRITE_CHUNK_SIZE,
+    rpc_function: Optional[str] = None,
+    upsert: bool = False,
+) -> List[str]:
+    """Write Phase 2 predictions back to Supabase.
+
+    Updates the bike_issue_* columns of existing events with chunked RPC
+    calls or per-row PATCH requests (or an opt-in upsert, see
+    ``bulk_write``); failing chunks are bisected to isolate bad rows.
+
+    Returns:
+        IDs of predictions that could not be written
+    """
+    rows = [
+        {
+            "service_request_id": pred["id"],
+            "bike_issue_category": pred["pred"]["category"],
+            "bike_issue_confidence": pred["pred"]["confidence"],
+            "bike_issue_evidence": pred["pred"]["evidence"],
+            "bike_issue_reasoning": pred["pred"]["reasoning"],
+        }
+        for pred in predictions
+    ]
+
+    return bulk_write(
+        client,
+        rows,
+        chunk_size=chunk_size,
+        rpc_function=rpc_function,
+        rate_limiter=rate_limiter,
+        upsert=upsert,
+    )
+
+
+def record_fingerprints(
+    store: FingerprintStore,
+    predictions: List[dict],
+    failed_ids: List[str],
+    prompt_hash: str,
+    model: str,
+) -> None:
+    """Store Phase 2 fingerprints for the predictions that were written."""
+    failed = set(failed_ids)
+    store.record(
+        PHASE2,
+        [
+            (pred["id"], text_hash(pred["subject"], pred["description"]))
+            for pred in predictions
+            if pred["id"] not in failed
+        ],
+        prompt_hash,
+        model,
+    )
+
+
+def append_jsonl(path: Path, rows: List[dict]) -> None:
+    """Append rows to a JSONL file."""
+    with path.open("a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+class Phase2Handoff:
+    """Categorize Phase 1 positives in a background Phase 2 worker.
+
+    The Phase 1 pipeline submits the raw event rows it labeled bike-related
+    (with ``PHASE2_EVENT_COLUMNS``); a worker thread classifies them with the
+    Phase 2 prompt and writes ``bike_issue_*`` columns, so both phases run
+    concurrently in one process. Submissions are processed in order and
+    ``submit`` blocks once ``max_pending`` batches are waiting.
+    """
+
+    def __init__(
+        self,
+        client: Phase2GeminiClient,
+        supabase_client: SupabaseClient,
+        system_prompt: str,
+        prompt_hash: str,
+        prompt_version: str,
+        model: str,
+        run_dir: Path,
+        temperature: float = 0.0,
+        concurrency: int = 1,
+        controller: Optional[AdaptiveConcurrency] = None,
+        dry_run: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        chunk_size: int = DEFAULT_WRITE_CHUNK_SIZE,
+        rpc_function: Optional[str] = None,
+        upsert: bool = False,
+        max_pending: int = 4,
+        dedup: Optional[Deduplicator] = None,
+        fingerprints: Optional[FingerprintStore] = None,
+        incremental: bool = False,
+    ):
+        """Initialize handoff and start its worker thread.
+
+        Args:
+            client: Phase 2 Gemini client
+            supabase_client: Client used for bike_issue_* write-back
+            system_prompt: Phase 2 system prompt
+            prompt_hash: Hash of the Phase 2 prompt
+            prompt_version: Phase 2 prompt version
+            model: Model identifier
+            run_dir: Directory for phase2_predictions.jsonl / phase2_errors.jsonl
+                and phase2_journal.jsonl, whose unwritten results are
+                written first when the run is resumed
+            temperature: Sampling temperature
+            concurrency: Max Phase 2 LLM requests in flight
+            controller: Optional AIMD controller shared with Phase 1
+            dry_run: Classify but skip Supabase writes
+            rate_limiter: Limiter for Supabase writes
+            chunk_size: Rows per bulk write request
+            rpc_function: Optional bulk-update RPC function for writes
+            upsert: Write with an INSERT-based upsert instead of updates
+            max_pending: Submitted batches that may wait before submit blocks
+            dedup: Optional deduplicator shared by all submitted batches
+            fingerprints: Optional index that written predictions are recorded in
+            incremental: Skip events whose Phase 2 fingerprint is current
+        """
+        self.client = client
+        self.supabase_client = supabase_client
+        self.system_prompt = system_prompt
+        self.prompt_hash = prompt_hash
+        self.prompt_version = prompt_version
+        self.model = model
+        self.temperature = temperature
+        self.concurrency = concurrency
+        self.controller = controller
+        self.dry_run = dry_run
+        self.rate_limiter = rate_limiter
+        self.chunk_size = chunk_size
+        self.rpc_function = rpc_function
+        self.upsert = upsert
+        self.dedup = dedup
+        self.fingerprints = fingerprints
+        self.incremental = incremental
+        self.predictions_path = run_dir / "phase2_predictions.jsonl"
+        self.errors_path = run_dir / "phase2_errors.jsonl"
+        self.stats = {
+            "submitted": 0,
+            "unchanged": 0,
+            "recovered": 0,
+            "classified": 0,
+            "written": 0,
+            "errors": 0,
+        }
+        # Separate from the Phase 1 journal, which is keyed by the same IDs
+        journal_path = run_dir / "phase2_journal.jsonl"
+        resumed = replay(journal_path)
+        self._written = resumed.written
+        self.journal = Journal(journal_path)
+        self._worker = OrderedWriter(self._process, max_pending=max_pending)
+        if resumed.results:
+            # Categorized by a previous attempt but never written
+            self._worker.submit(([], list(resumed.results.values())))
+
+    def submit(self, events: List[dict]) -> None:
+        """Queue bike-related event rows for Phase 2."""
+        if events:
+            self._worker.submit((list(events), []))
+
+    def _skip_unchanged(self, events: List[dict]) -> List[dict]:
+        if self.fingerprints is None or not self.incremental:
+            return events
+        stale = self.fingerprints.stale(
+            PHASE2,
+            [(str(e["service_request_id"]), event_text_hash(e)) for e in events],
+            self.prompt_hash,
+            self.model,
+        )
+        self.stats["unchanged"] += len(events) - len(stale)
+        return [e for e in events if str(e["service_request_id"]) in stale]
+
+    def _process(self, job: Tuple[List[dict], List[dict]]) -> None:
+        events, recovered = job
+        self.stats["submitted"] += len(events)
+        written = [e for e in events if str(e["service_request_id"]) in self._written]
+        events = self._skip_unchanged([e for e in events if str(e["service_request_id"]) not in self._written])
+        self.stats["recovered"] += len(written) + len(recovered)
+        predictions, errors = classify_batch(
+            self.client,
+            self.system_prompt,
+            self.prompt_hash,
+            events,
+            self.prompt_version,
+            self.model,
+            self.temperature,
+            concurrency=self.concurrency,
+            controller=self.controller,
+            dedup=self.dedup,
+            on_prediction=self.journal.record_result,
+        )
+        self.stats["classified"] += len(predictions)
+        predictions.extend(recovered)
+        failed: List[str] = []
+        if predictions and not self.dry_run:
+            failed = write_predictions_to_supabase(
+                self.supabase_client,
+                predictions,
+                rate_limiter=self.rate_limiter,
+                chunk_size=self.chunk_size,
+                rpc_function=self.rpc_function,
+                upsert=self.upsert,
+            )
+            failed_ids = set(failed)
+            self.journal.record_written(
+                pred["id"] for pred in predictions if pred["id"] not in failed_ids
+            )
+            if self.fingerprints is not None:
+                record_fingerprints(
+                    self.fingerprints, predictions, failed, self.prompt_hash, self.model
+                )
+        append_jsonl(self.predictions_path, predictions)
+        if errors:
+            append_jsonl(self.errors_path, errors)
+
+        self.stats["written"] += 0 if self.dry_run else len(predictions) - len(failed)
+        self.stats["errors"] += len(errors) + len(failed)
+
+    def close(self) -> dict:
+        """Wait for queued batches to finish; return Phase 2 stats."""
+        self._worker.close()
+        self.journal.close()
+        return self.stats
@@ -0,0 +1,165 @@
+"""Streaming stages for the Supabase pipelines: prefetch, classify, write.
+
+The pipelines run three stages that overlap in time:
+
+1. ``prefetch_pages`` reads the next keyset page in a background thread
+   while the current one is classified.
+2. Classification runs in the calling thread (fanned out with
+   ``map_concurrent``).
+3. ``OrderedWriter`` drains finished batches in a background thread, in
+   submission order, so the checkpoint only ever advances past batches that
+   are fully written.
+
+Stages are connected by bounded queues, so a slow stage applies
+backpressure instead of letting work pile up in memory. Background threads
+run in a copy of the starting thread's context, so context-local state
+(Langfuse spans, ``bikeclf.timing`` recorders) carries over.
+"""
+import contextvars
+import queue
+import threading
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+
+PageT = TypeVar("PageT")
+ItemT = TypeVar("ItemT")
+
+# How often blocked queue operations re-check for shutdown (seconds)
+_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put ``item`` on a bounded queue unless ``stop`` is set first."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def prefetch_pages(
+    fetch_page: Callable[[Optional[str]], List[PageT]],
+    next_cursor: Callable[[List[PageT]], str],
+    cursor: Optional[str] = None,
+    depth: int = 1,
+) -> Iterator[List[PageT]]:
+    """Yield keyset pages while the following pages are fetched in the background.
+
+    Args:
+        fetch_page: Fetches the page after ``cursor`` (None for the first
+            page); an empty page ends iteration
+        next_cursor: Returns the cursor following a page (e.g. its last ID)
+        cursor: Cursor to start after
+        depth: Pages buffered ahead of the consumer
+
+    Yields:
+        Non-empty pages in keyset order. Exceptions raised by ``fetch_page``
+        are re-raised in the consuming thread.
+    """
+    pages: queue.Queue = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def worker() -> None:
+        current = cursor
+        try:
+            while not stop.is_set():
+                page = fetch_page(current)
+                if not page:
+                    break
+                current = next_cursor(page)
+                if not _put(pages, page, stop):
+                    return
+        except BaseException as exc:
+            _put(pages, exc, stop)
+            return
+        _put(pages, _DONE, stop)
+
+    thread = threading.Thread(
+        target=contextvars.copy_context().run, args=(worker,), name="bikeclf-prefetch", daemon=True
+    )
+    thread.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class OrderedWriter:
+    """Background writer that handles submitted batches strictly in order.
+
+    ``write`` is called once per submitted item in a dedicated thread; since
+    items are processed FIFO, anything ``write`` does after persisting a batch
+    (such as saving a checkpoint) observes every earlier batch as written.
+    ``submit`` blocks while ``max_pending`` items are queued.
+
+    If ``write`` raises, later items are discarded and the error is re-raised
+    from the next ``submit`` or from ``close``.
+    """
+
+    def __init__(self, write: Callable[[ItemT], None], max_pending: int = 2):
+        """Initialize writer and start its thread.
+
+        Args:
+            write: Called with each submitted item, in submission order
+            max_pending: Items that may wait in the queue before ``submit`` blocks
+        """
+        self._write = write
+        self._queue: queue.Queue = queue.Queue(maxsize=max(max_pending, 1))
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._run,), name="bikeclf-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if self._error is not None:
+                continue  # Keep draining so submitters never block forever
+            try:
+                self._write(item)
+            except BaseException as exc:
+                self._error = exc
+
+    def submit(self, item: ItemT) -> None:
+        """Queue an item for writing, blocking while the queue is full."""
+        if self._closed:
+            raise RuntimeError("OrderedWriter is closed")
+        if self._error is not None:
+            raise self._error
+        self._queue.put(item)
+
+    def close(self) -> None:
+        """Wait for all queued items to be written; re-raise any write error."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_DONE)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "OrderedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Still flush what was already queued, but keep the original error
+            try:
+                self.close()
+            except BaseException:
+                pass
@@ -0,0 +1,46 @@
+"""Live progress display for evaluation runs."""
+from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    MofNCompleteColumn,
+    Progress,
+    ProgressColumn,
+    SpinnerColumn,
+    Task,
+    TextColumn,
+    TimeElapsedColumn,
+    TimeRemainingColumn,
+)
+from rich.text import Text
+
+
+class ThroughputColumn(ProgressColumn):
+    """Renders completed rows per second."""
+
+    def render(self, task: Task) -> Text:
+        speed = task.finished_speed or task.speed
+        if speed is None:
+            return Text("-- rows/s", style="progress.data.speed")
+        return Text(f"{speed:.1f} rows/s", style="progress.data.speed")
+
+
+def eval_progress(console: Console) -> Progress:
+    """Create a progress bar with throughput, elapsed time and ETA.
+
+    Args:
+        console: Console to render on (prints during the run appear above the bar)
+
+    Returns:
+        Progress instance to use as a context manager
+    """
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        ThroughputColumn(),
+        TimeElapsedColumn(),
+        TextColumn("ETA"),
+        TimeRemainingColumn(),
+        console=console,
+    )
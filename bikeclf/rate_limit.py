@@ -0,0 +1,152 @@
+"""Token-bucket rate limiting for Gemini API quotas (RPM and TPM)."""
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# Rough characters-per-token ratio used to estimate prompt size before a call
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str, max_output_tokens: int = 0) -> int:
+    """Estimate the quota cost of a request.
+
+    Args:
+        text: Prompt text sent to the model
+        max_output_tokens: Output token budget reserved for the response
+
+    Returns:
+        Estimated total tokens (input + reserved output)
+    """
+    return len(text) // CHARS_PER_TOKEN + max_output_tokens
+
+
+class _Bucket:
+    """Single token bucket refilled continuously at ``per_minute / 60`` per second."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        # One second of burst keeps us smooth while still filling idle gaps
+        self.capacity = max(1.0, self.rate)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until the bucket is out of debt (level > 0)."""
+        if self.level > 0:
+            return 0.0
+        return (1e-6 - self.level) / self.rate
+
+
+class RateLimiter:
+    """Thread-safe limiter enforcing requests-per-minute and tokens-per-minute budgets.
+
+    Callers ``acquire`` before every request. Costs are deducted immediately,
+    and a bucket may go into debt for a single oversized request, so the
+    long-run rate never exceeds the budget while idle time between calls is
+    eliminated.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        headroom: float = 0.9,
+    ):
+        """Initialize limiter.
+
+        Args:
+            rpm: Requests per minute quota (None or 0 = unlimited)
+            tpm: Tokens per minute quota (None or 0 = unlimited)
+            headroom: Fraction of the quota to actually use (stay just under it)
+        """
+        self.rpm = rpm or 0
+        self.tpm = tpm or 0
+        self._requests = _Bucket(self.rpm * headroom) if self.rpm else None
+        self._tokens = _Bucket(self.tpm * headroom) if self.tpm else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any budget is configured."""
+        return self._requests is not None or self._tokens is not None
+
+    def for_model(self, model_id: str) -> "RateLimiter":
+        """Limiter for requests to ``model_id``: this one, shared by all models."""
+        return self
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a request costing ``tokens`` fits the budget.
+
+        Args:
+            tokens: Estimated token cost of the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+
+        buckets = [b for b in (self._requests, self._tokens) if b is not None]
+        waited = 0.0
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                for bucket in buckets:
+                    bucket.refill(now)
+                delay = max(bucket.wait_time() for bucket in buckets)
+                if delay <= 0:
+                    break
+                time.sleep(delay)
+                waited += delay
+
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= tokens
+        return waited
+
+
+class ModelRateLimiters:
+    """One ``RateLimiter`` per model, since Gemini quotas are per model.
+
+    Limiters are created on first use from ``budget(model_id)``, normally
+    ``APIConfig.rate_budget``. Share one instance between clients calling
+    the same models so they draw from the same budgets.
+    """
+
+    def __init__(self, budget: Callable[[str], Tuple[int, int]], headroom: float = 0.9):
+        """Initialize limiters.
+
+        Args:
+            budget: Maps a model ID to its ``(rpm, tpm)`` (0 = unlimited)
+            headroom: Fraction of each quota to actually use
+        """
+        self.budget = budget
+        self.headroom = headroom
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model_id: str) -> RateLimiter:
+        """Limiter for requests to ``model_id``."""
+        with self._lock:
+            limiter = self._limiters.get(model_id)
+            if limiter is None:
+                rpm, tpm = self.budget(model_id)
+                limiter = self._limiters[model_id] = RateLimiter(rpm, tpm, headroom=self.headroom)
+            return limiter
+
+
+def rpm_from_sleep(seconds: float) -> int:
+    """RPM budget equivalent to the deprecated ``--sleep`` between requests.
+
+    Args:
+        seconds: Pause between requests (0 = no pause)
+
+    Returns:
+        Requests per minute (0 = unlimited)
+    """
+    return max(1, round(60 / seconds)) if seconds > 0 else 0
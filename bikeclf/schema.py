@@ -1,6 +1,6 @@
 """Pydantic schemas for classification output and predictions."""
-from typing import List, Literal
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class ClassificationOutput(BaseModel):
@@ -77,6 +77,113 @@ class Phase2ClassificationOutput(BaseModel):
         return v
 
 
+class BatchClassificationItem(ClassificationOutput):
+    """Phase 1 output for one report inside a multi-report response."""
+
+    id: str = Field(description="ID of the report this classification belongs to")
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def coerce_id(cls, v):
+        """Accept numeric IDs echoed back without quotes."""
+        return str(v)
+
+
+class BatchClassificationOutput(BaseModel):
+    """Structured output for a multi-report Phase 1 request."""
+
+    results: List[BatchClassificationItem] = Field(
+        description="One classification per report, identified by report ID"
+    )
+
+
+class Phase2BatchClassificationItem(Phase2ClassificationOutput):
+    """Phase 2 output for one report inside a multi-report response."""
+
+    id: str = Field(description="ID of the report this categorization belongs to")
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def coerce_id(cls, v):
+        """Accept numeric IDs echoed back without quotes."""
+        return str(v)
+
+
+class Phase2BatchClassificationOutput(BaseModel):
+    """Structured output for a multi-report Phase 2 request."""
+
+    results: List[Phase2BatchClassificationItem] = Field(
+        description="One categorization per report, identified by report ID"
+    )
+
+
+class FusedClassificationOutput(ClassificationOutput):
+    """Phase 1 output plus the Phase 2 category in a single response (fused mode)."""
+
+    issue: Optional[Phase2ClassificationOutput] = Field(
+        default=None,
+        description="Bike issue categorization; only when label is 'true', otherwise null",
+    )
+
+    @model_validator(mode="after")
+    def drop_issue_unless_bike_related(self) -> "FusedClassificationOutput":
+        """Only bike-related reports carry an issue category."""
+        if self.label != "true":
+            self.issue = None
+        return self
+
+
+class FusedBatchClassificationItem(FusedClassificationOutput):
+    """Fused output for one report inside a multi-report response."""
+
+    id: str = Field(description="ID of the report this classification belongs to")
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def coerce_id(cls, v):
+        """Accept numeric IDs echoed back without quotes."""
+        return str(v)
+
+
+class FusedBatchClassificationOutput(BaseModel):
+    """Structured output for a multi-report fused request."""
+
+    results: List[FusedBatchClassificationItem] = Field(
+        description="One classification per report, identified by report ID"
+    )
+
+
+class CascadeMeta(BaseModel):
+    """Both stages of a cascaded prediction (cheap model, then escalation)."""
+
+    escalated: bool
+    primary_model_id: str
+    primary_pred: Dict[str, Any]
+    primary_latency_ms: int
+    escalation_model_id: Optional[str] = None
+    escalation_pred: Optional[Dict[str, Any]] = None
+    escalation_latency_ms: Optional[int] = None
+    escalation_error: Optional[str] = None
+
+    @property
+    def final_model_id(self) -> str:
+        """Model whose prediction was kept."""
+        if self.escalation_pred is not None:
+            return self.escalation_model_id
+        return self.primary_model_id
+
+
+class TokenUsage(BaseModel):
+    """Gemini token counts (from ``usage_metadata``) summed over API calls."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0  # Part of prompt_tokens served from context cache
+    output_tokens: int = 0
+    thinking_tokens: int = 0
+    cost_usd: Optional[float] = None  # None if a model has no list price
+
+
 class PredictionMeta(BaseModel):
     """Metadata for a single prediction."""
 
@@ -87,6 +194,8 @@ class PredictionMeta(BaseModel):
     timestamp_utc: str
     latency_ms: int
     attempts: int = 1
+    cascade: Optional[CascadeMeta] = None
+    usage: Optional[TokenUsage] = None
 
 
 class PredictionRecord(BaseModel):
@@ -0,0 +1,426 @@
+"""Splitting a Supabase backfill across several worker processes.
+
+Two modes are supported:
+
+- Static shards (``--shard i/N``): the first worker of a job cuts the
+  ``service_request_id`` key space into N ranges (at row-count quantiles)
+  and stores them in a lease store; every worker then only fetches the
+  rows of its own range. The ranges cover the whole key space, so rows
+  added later still belong to exactly one shard.
+- Lease-based ID ranges: the ``service_request_id`` key space is cut into
+  ranges once (at row-count quantiles) and stored in a lease store. Workers
+  claim a free range, renew the lease while they work, record their keyset
+  cursor after every written batch and mark the range done at the end. A
+  range whose lease expires (crashed worker) is claimed by another worker
+  and resumed from its cursor.
+
+Lease stores: ``SQLiteLeaseStore`` for workers sharing a filesystem and
+``SupabaseLeaseStore`` (see migrations/add_backfill_leases.sql) for workers
+on different machines.
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from bikeclf.config import CACHE_DIR
+from bikeclf.supabase import EVENTS_KEY, EVENTS_TABLE, content_range_count
+
+DEFAULT_LEASE_PATH = CACHE_DIR / "leases.sqlite"
+DEFAULT_LEASE_TTL = 600.0
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse ``i/N`` into (index, count), with 0 <= index < count."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N (e.g. 0/4), got {value!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got {value!r}")
+    return index, count
+
+
+def default_owner() -> str:
+    """Lease owner name identifying this worker process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _quote(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def range_upper_params(hi: Optional[str], key: str = EVENTS_KEY) -> Dict[str, str]:
+    """PostgREST filter restricting a keyset scan to IDs <= ``hi``."""
+    if hi is None:
+        return {}
+    return {"and": f"({key}.lte.{_quote(hi)})"}
+
+
+def compute_boundaries(
+    client: Any,
+    count: int,
+    params: Optional[Dict[str, str]] = None,
+    table: str = EVENTS_TABLE,
+    key: str = EVENTS_KEY,
+) -> List[str]:
+    """Find ``count - 1`` IDs that split the matching rows into equal parts.
+
+    Args:
+        client: ``SupabaseClient``
+        count: Number of ranges
+        params: Filters applied to the scan (e.g. the prefilter)
+        table: Table to split
+        key: Keyset column
+
+    Returns:
+        Boundary IDs in the database's sort order, de-duplicated (fewer if
+        there are few rows)
+    """
+    base = dict(params or {})
+    response = client.request(
+        "GET",
+        f"/rest/v1/{table}",
+        params={**base, "select": key, "limit": "1"},
+        headers={"Prefer": "count=exact"},
+    )
+    total = content_range_count(response.headers.get("Content-Range"))
+    boundaries: List[str] = []
+    for part in range(1, count):
+        offset = part * total // count - 1
+        if offset < 0:
+            continue
+        rows = client.request_json(
+            "GET",
+            f"/rest/v1/{table}",
+            params={**base, "select": key, "order": key, "offset": str(offset), "limit": "1"},
+        )
+        # Offsets increase, so rows arrive in the database's collation order
+        # and repeats can only be equal; Python string order may differ
+        if rows and (not boundaries or rows[0][key] != boundaries[-1]):
+            boundaries.append(rows[0][key])
+    return boundaries
+
+
+def ranges_from_boundaries(boundaries: Sequence[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Turn boundaries into (exclusive lower, inclusive upper) ID ranges."""
+    edges: List[Optional[str]] = [None, *boundaries, None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def shard_range(
+    store: Any,
+    job: str,
+    shard: Tuple[int, int],
+    client: Any,
+    params: Optional[Dict[str, str]] = None,
+) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """ID range of static shard ``i/N`` of ``job``.
+
+    The first worker of the job cuts the rows matching ``params`` into N
+    ranges and stores them in ``store``; later workers reuse them, so all
+    shards of a job agree on their ranges.
+
+    Args:
+        store: ``SQLiteLeaseStore`` or ``SupabaseLeaseStore``
+        job: Job name (distinct from lease jobs using the same store)
+        shard: (index, count) from ``parse_shard``
+        client: ``SupabaseClient`` used to compute the boundaries
+        params: Filters applied to the boundary scan
+
+    Returns:
+        (exclusive lower, inclusive upper) IDs, or None if there are fewer
+        ranges than shards (too few rows to split)
+    """
+    index, count = shard
+    if not store.has_ranges(job):
+        store.create_ranges(job, ranges_from_boundaries(compute_boundaries(client, count, params=params)))
+    ranges = store.ranges(job)
+    return ranges[index] if index < len(ranges) else None
+
+
+@dataclass
+class Lease:
+    """A claimed ID range: IDs > ``lo`` (None = start) and <= ``hi`` (None = end)."""
+
+    job: str
+    range_id: int
+    lo: Optional[str]
+    hi: Optional[str]
+    cursor: Optional[str]  # Last ID whose batch was written
+    owner: str
+    lost: bool = False  # Set when a renewal finds the lease taken over
+
+
+class SQLiteLeaseStore:
+    """Lease store in a local SQLite file (workers on one host/shared disk)."""
+
+    def __init__(self, path: Path = DEFAULT_LEASE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS backfill_ranges ("
+            " job TEXT NOT NULL,"
+            " range_id INTEGER NOT NULL,"
+            " lo TEXT,"
+            " hi TEXT,"
+            " cursor TEXT,"
+            " owner TEXT,"
+            " expires_at REAL NOT NULL DEFAULT 0,"
+            " done INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (job, range_id))"
+        )
+
+    def has_ranges(self, job: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM backfill_ranges WHERE job = ? LIMIT 1", (job,)
+            ).fetchone()
+        return row is not None
+
+    def ranges(self, job: str) -> List[Tuple[Optional[str], Optional[str]]]:
+        """The job's (lo, hi) ranges in ``range_id`` order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lo, hi FROM backfill_ranges WHERE job = ? ORDER BY range_id", (job,)
+            ).fetchall()
+        return [(lo, hi) for lo, hi in rows]
+
+    def create_ranges(self, job: str, ranges: Sequence[Tuple[Optional[str], Optional[str]]]) -> None:
+        """Create the job's ranges unless another worker already did."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                exists = self._conn.execute(
+                    "SELECT 1 FROM backfill_ranges WHERE job = ? LIMIT 1", (job,)
+                ).fetchone()
+                if exists is None:
+                    self._conn.executemany(
+                        "INSERT INTO backfill_ranges (job, range_id, lo, hi, cursor)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        [(job, i, lo, hi, lo) for i, (lo, hi) in enumerate(ranges)],
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, job: str, owner: str, ttl: float) -> Optional[Lease]:
+        """Claim an unfinished range that is free or whose lease expired."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT range_id, lo, hi, cursor FROM backfill_ranges"
+                    " WHERE job = ? AND done = 0 AND (owner IS NULL OR expires_at < ?)"
+                    " ORDER BY range_id LIMIT 1",
+                    (job, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE backfill_ranges SET owner = ?, expires_at = ?"
+                        " WHERE job = ? AND range_id = ?",
+                        (owner, now + ttl, job, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return Lease(job=job, range_id=row[0], lo=row[1], hi=row[2], cursor=row[3], owner=owner)
+
+    def renew(self, lease: Lease, ttl: float, cursor: Optional[str] = None) -> bool:
+        """Extend the lease (and store progress); False if it was taken over."""
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE backfill_ranges SET expires_at = ?, cursor = COALESCE(?, cursor)"
+                " WHERE job = ? AND range_id = ? AND owner = ? AND done = 0",
+                (time.time() + ttl, cursor, lease.job, lease.range_id, lease.owner),
+            ).rowcount
+        return updated == 1
+
+    def release(self, lease: Lease, done: bool) -> None:
+        """Give the range up, marking it finished if ``done``."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE backfill_ranges SET owner = NULL, expires_at = 0, done = ?"
+                " WHERE job = ? AND range_id = ? AND owner = ?",
+                (int(done), lease.job, lease.range_id, lease.owner),
+            )
+
+    def all_done(self, job: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(done), 0) FROM backfill_ranges WHERE job = ?",
+                (job,),
+            ).fetchone()
+        return row[0] > 0 and row[0] == row[1]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SupabaseLeaseStore:
+    """Lease store in the ``backfill_ranges`` table (workers on any host)."""
+
+    def __init__(self, client: Any):
+        """Initialize store.
+
+        Args:
+            client: ``SupabaseClient``
+        """
+        self.client = client
+
+    def has_ranges(self, job: str) -> bool:
+        rows = self.client.request_json(
+            "GET",
+            "/rest/v1/backfill_ranges",
+            params={"job": f"eq.{job}", "select": "range_id", "limit": "1"},
+        )
+        return bool(rows)
+
+    def ranges(self, job: str) -> List[Tuple[Optional[str], Optional[str]]]:
+        rows = self.client.request_json(
+            "GET",
+            "/rest/v1/backfill_ranges",
+            params={"job": f"eq.{job}", "select": "lo,hi", "order": "range_id"},
+        )
+        return [(row["lo"], row["hi"]) for row in rows or []]
+
+    def create_ranges(self, job: str, ranges: Sequence[Tuple[Optional[str], Optional[str]]]) -> None:
+        self.client.request_json(
+            "POST",
+            "/rest/v1/backfill_ranges",
+            params={"on_conflict": "job,range_id"},
+            body=[
+                {"job": job, "range_id": i, "lo": lo, "hi": hi, "cursor": lo}
+                for i, (lo, hi) in enumerate(ranges)
+            ],
+            headers={"Prefer": "resolution=ignore-duplicates,return=minimal"},
+        )
+
+    def claim(self, job: str, owner: str, ttl: float) -> Optional[Lease]:
+        rows = self.client.request_json(
+            "POST",
+            "/rest/v1/rpc/claim_backfill_range",
+            body={"p_job": job, "p_owner": owner, "p_ttl_seconds": int(ttl)},
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return Lease(
+            job=job,
+            range_id=row["range_id"],
+            lo=row["lo"],
+            hi=row["hi"],
+            cursor=row["cursor"],
+            owner=owner,
+        )
+
+    def renew(self, lease: Lease, ttl: float, cursor: Optional[str] = None) -> bool:
+        return bool(
+            self.client.request_json(
+                "POST",
+                "/rest/v1/rpc/renew_backfill_range",
+                body={
+                    "p_job": lease.job,
+                    "p_range_id": lease.range_id,
+                    "p_owner": lease.owner,
+                    "p_ttl_seconds": int(ttl),
+                    "p_cursor": cursor,
+                },
+            )
+        )
+
+    def release(self, lease: Lease, done: bool) -> None:
+        self.client.request_json(
+            "PATCH",
+            "/rest/v1/backfill_ranges",
+            params={
+                "job": f"eq.{lease.job}",
+                "range_id": f"eq.{lease.range_id}",
+                "owner": f"eq.{lease.owner}",
+            },
+            body={"owner": None, "expires_at": None, "done": done},
+            headers={"Prefer": "return=minimal"},
+        )
+
+    def all_done(self, job: str) -> bool:
+        rows = self.client.request_json(
+            "GET",
+            "/rest/v1/backfill_ranges",
+            params={"job": f"eq.{job}", "select": "done"},
+        )
+        return bool(rows) and all(row["done"] for row in rows)
+
+    def close(self) -> None:
+        pass
+
+
+class LeaseKeeper:
+    """Renews held leases in the background and records cursor progress.
+
+    Leases are renewed every ``ttl / 3`` seconds. If a renewal fails (the
+    lease expired and another worker claimed the range), ``lease.lost`` is
+    set so the caller stops working on the range.
+    """
+
+    def __init__(self, store: Any, ttl: float = DEFAULT_LEASE_TTL):
+        self.store = store
+        self.ttl = ttl
+        self._leases: Dict[int, Lease] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bikeclf-lease", daemon=True)
+        self._thread.start()
+
+    def _renew(self, lease: Lease, cursor: Optional[str] = None) -> None:
+        try:
+            ok = self.store.renew(lease, self.ttl, cursor)
+        except Exception as exc:  # Transient store errors: retry on the next tick
+            print(f"  Lease renewal failed for range {lease.range_id}: {exc}")
+            return
+        if not ok:
+            print(f"  Lost lease on range {lease.range_id}")
+            lease.lost = True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            with self._lock:
+                leases = list(self._leases.values())
+            for lease in leases:
+                self._renew(lease)
+
+    def hold(self, lease: Lease) -> None:
+        """Start renewing a freshly claimed lease."""
+        with self._lock:
+            self._leases[lease.range_id] = lease
+
+    def progress(self, lease: Lease, cursor: str) -> None:
+        """Record that everything up to ``cursor`` in the range is written."""
+        lease.cursor = cursor
+        self._renew(lease, cursor)
+
+    def release(self, lease: Lease, done: bool) -> None:
+        """Stop renewing and give the range back (finished if ``done``)."""
+        with self._lock:
+            self._leases.pop(lease.range_id, None)
+        if not lease.lost:
+            self.store.release(lease, done)
+
+    def stop(self) -> None:
+        """Stop renewing; held leases expire after their TTL."""
+        self._stop.set()
+        self._thread.join()
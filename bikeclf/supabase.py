@@ -0,0 +1,306 @@
+"""Supabase (PostgREST) client and helpers shared by the pipeline scripts."""
+import gzip
+import json
+import time
+from typing import Any, Dict, List, Optional
+from urllib import parse
+
+import httpx
+
+from bikeclf.rate_limit import RateLimiter
+from bikeclf.timing import span
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # HTTP/2 needs the optional h2 package (httpx[http2])
+    HTTP2_AVAILABLE = False
+
+DEFAULT_WRITE_CHUNK_SIZE = 500
+EVENTS_TABLE = "events"
+EVENTS_KEY = "service_request_id"
+
+# Bulk-update functions from migrations/add_*_update_function(s).sql
+PHASE1_UPDATE_RPC = "update_bike_classifications"
+PHASE2_UPDATE_RPC = "update_bike_issue_classifications"
+FUSED_UPDATE_RPC = "update_bike_fused_classifications"
+
+# Request bodies smaller than this aren't worth compressing
+GZIP_MIN_BYTES = 1024
+
+
+class SupabaseError(RuntimeError):
+    """Error response from the Supabase API."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"Supabase API error: {status_code} {text}")
+        self.status_code = status_code
+
+
+class SupabaseClient:
+    """Supabase REST API client over a pooled keep-alive connection.
+
+    All requests share one ``httpx.Client``, so consecutive calls reuse open
+    sockets instead of paying a TCP+TLS handshake each time. Responses are
+    requested gzip-compressed; request bodies are gzip-compressed too when
+    ``compress_requests`` is set (the gateway must accept
+    ``Content-Encoding: gzip``). HTTP/2 is used when requested and the
+    ``h2`` package is installed. The client is thread-safe.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        max_connections: int = 10,
+        http2: bool = False,
+        compress_requests: bool = False,
+        retries: int = 3,
+        retry_delay: float = 2.0,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        """Initialize client.
+
+        Args:
+            base_url: Supabase project URL
+            api_key: Service role key
+            timeout: Read/write/pool timeout in seconds
+            connect_timeout: Connect timeout in seconds
+            max_connections: Size of the connection pool
+            http2: Use HTTP/2 if the ``h2`` package is available
+            compress_requests: Gzip request bodies of at least ``GZIP_MIN_BYTES``
+            retries: Attempts per request on connection errors and 5xx responses
+            retry_delay: Base delay between attempts (multiplied by attempt number)
+            transport: Optional custom httpx transport (used in tests)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.compress_requests = compress_requests
+        self.retries = max(retries, 1)
+        self.retry_delay = retry_delay
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            headers={
+                "apikey": api_key,
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+                "Accept-Encoding": "gzip",
+            },
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            http2=http2 and HTTP2_AVAILABLE,
+            transport=transport,
+        )
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, str]] = None,
+        body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """Send a request, retrying connection errors and 5xx responses.
+
+        Args:
+            method: HTTP method
+            path: Path below the project URL (e.g. '/rest/v1/events')
+            params: Query parameters (PostgREST filter syntax)
+            body: JSON-serializable request body
+            headers: Extra headers (e.g. ``Prefer``)
+
+        Returns:
+            Successful response (headers such as ``Content-Range`` included)
+
+        Raises:
+            SupabaseError: On 4xx responses or 5xx after the last attempt
+            RuntimeError: When all attempts fail to connect
+        """
+        url = path
+        if params:
+            url = f"{path}?{parse.urlencode(params, safe=',()')}"
+
+        request_headers = dict(headers or {})
+        content = None
+        if body is not None:
+            content = json.dumps(body).encode("utf-8")
+            if self.compress_requests and len(content) >= GZIP_MIN_BYTES:
+                content = gzip.compress(content)
+                request_headers["Content-Encoding"] = "gzip"
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                response = self._client.request(
+                    method, url, content=content, headers=request_headers
+                )
+            except httpx.TransportError as exc:
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay * attempt)
+                    continue
+                raise RuntimeError(f"Supabase request failed: {exc}") from exc
+
+            if response.status_code >= 500 and attempt < self.retries:
+                time.sleep(self.retry_delay * attempt)
+                continue
+            if response.is_error:
+                raise SupabaseError(response.status_code, response.text)
+            return response
+
+        raise RuntimeError(f"Supabase request failed after {self.retries} attempts")
+
+    def request_json(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, str]] = None,
+        body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
+        """Send a request and return the decoded JSON body (None if empty)."""
+        response = self.request(method, path, params=params, body=body, headers=headers)
+        return response.json() if response.content else None
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._client.close()
+
+    def __enter__(self) -> "SupabaseClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def content_range_count(content_range: Optional[str]) -> int:
+    """Extract the total from a PostgREST ``Content-Range`` header.
+
+    Args:
+        content_range: Header value such as ``0-24/3573`` or ``*/26``
+            (returned when the request has ``Prefer: count=exact``)
+
+    Returns:
+        Row count, or 0 if the header is missing or the total is unknown
+    """
+    if not content_range or "/" not in content_range:
+        return 0
+    total = content_range.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else 0
+
+
+def bulk_write(
+    client: Any,
+    rows: List[Dict[str, Any]],
+    chunk_size: int = DEFAULT_WRITE_CHUNK_SIZE,
+    rpc_function: Optional[str] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    table: str = EVENTS_TABLE,
+    key: str = EVENTS_KEY,
+    retries: int = 2,
+    upsert: bool = False,
+) -> List[str]:
+    """Write rows back to existing Supabase rows in chunked requests.
+
+    Writes only ever update rows that exist:
+
+    - with ``rpc_function``, each chunk is one
+      ``POST /rest/v1/rpc/<rpc_function>`` with body ``{"rows": [...]}``
+      (see migrations/add_bulk_update_functions.sql); if the function is
+      not installed (404) the remaining rows are PATCHed instead
+    - otherwise every row is sent as
+      ``PATCH /rest/v1/<table>?<key>=eq.<id>``
+
+    ``upsert`` opts into an INSERT-based PostgREST upsert
+    (``POST /rest/v1/<table>?on_conflict=<key>`` with merge-duplicates),
+    one request per chunk. It needs every NOT NULL column in each row and
+    inserts rows whose key does not exist, so only use it on tables where
+    that is acceptable.
+
+    A failing chunk is retried ``retries`` times and then bisected
+    recursively so that only the bad rows are dropped.
+
+    Args:
+        client: ``SupabaseClient`` (or any object exposing ``request_json``)
+        rows: Row dicts; all rows must have the same keys, including ``key``
+        chunk_size: Rows per request (RPC and upsert)
+        rpc_function: Optional bulk-update RPC function name
+        rate_limiter: Optional limiter acquired before every request
+        table: Target table for PATCH and upsert writes
+        key: Primary key column
+        retries: Attempts per chunk before bisecting
+        upsert: Use an INSERT-based upsert instead of updates
+
+    Returns:
+        IDs of rows that could not be written
+    """
+    failed: List[str] = []
+    retries = max(retries, 1)
+    use_rpc = bool(rpc_function) and not upsert
+
+    def call(method: str, path: str, **kwargs: Any) -> None:
+        if rate_limiter:
+            rate_limiter.acquire()
+        with span("write"):
+            client.request_json(method, path, **kwargs)
+
+    def send(chunk: List[Dict[str, Any]]) -> None:
+        nonlocal use_rpc
+        if use_rpc:
+            try:
+                call("POST", f"/rest/v1/rpc/{rpc_function}", body={"rows": chunk})
+            except SupabaseError as exc:
+                if exc.status_code != 404:
+                    raise
+                print(f"  RPC {rpc_function} not found; updating rows with PATCH")
+                use_rpc = False
+                write_chunk(chunk)
+            return
+        if upsert:
+            call(
+                "POST",
+                f"/rest/v1/{table}",
+                params={"on_conflict": key},
+                body=chunk,
+                headers={"Prefer": "resolution=merge-duplicates,return=minimal"},
+            )
+            return
+        for row in chunk:
+            call(
+                "PATCH",
+                f"/rest/v1/{table}",
+                params={key: f"eq.{row[key]}"},
+                body={column: value for column, value in row.items() if column != key},
+                headers={"Prefer": "return=minimal"},
+            )
+
+    def write_chunk(chunk: List[Dict[str, Any]]) -> None:
+        if not use_rpc and not upsert and len(chunk) > 1:
+            # PATCH sends one request per row; retry each row on its own
+            for row in chunk:
+                write_chunk([row])
+            return
+        for attempt in range(1, retries + 1):
+            try:
+                send(chunk)
+                return
+            except Exception as exc:
+                last_error = exc
+                if attempt < retries:
+                    time.sleep(0.5 * attempt)
+
+        if len(chunk) == 1:
+            failed.append(chunk[0][key])
+            print(f"  Write failed for {chunk[0][key]}: {last_error}")
+            return
+        # Bisect to isolate the offending rows
+        mid = len(chunk) // 2
+        write_chunk(chunk[:mid])
+        write_chunk(chunk[mid:])
+
+    for start in range(0, len(rows), max(chunk_size, 1)):
+        write_chunk(rows[start : start + chunk_size])
+
+    return failed
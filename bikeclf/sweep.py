@@ -0,0 +1,187 @@
+"""Grid sweeps over prompt versions, models and temperatures.
+
+A sweep schedules every (row, configuration) request through one
+``map_concurrent`` call, so all configurations share a single concurrency
+limit and the client's rate budget. Requests are interleaved row by row,
+which keeps every model busy for the whole sweep instead of one model at a
+time. Repeated configurations hit the persistent response cache.
+"""
+import statistics
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TypeVar
+from rich.table import Table
+
+from bikeclf.concurrency import map_concurrent
+from bikeclf.io import write_json
+
+RowT = TypeVar("RowT")
+R = TypeVar("R")
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    """One point of the sweep grid."""
+
+    prompt_version: str
+    model_id: str
+    temperature: float
+
+    @property
+    def label(self) -> str:
+        """Human-readable identifier, e.g. ``v003 / gemini-2.5-flash / t=0.0``."""
+        return f"{self.prompt_version} / {self.model_id} / t={self.temperature:g}"
+
+
+def parse_list(values: Iterable[str]) -> List[str]:
+    """Flatten repeated and comma-separated CLI values, dropping duplicates.
+
+    Args:
+        values: Option values, e.g. ``["v001,v002", "v003"]``
+
+    Returns:
+        Values in first-seen order, e.g. ``["v001", "v002", "v003"]``
+    """
+    items: List[str] = []
+    for value in values:
+        for item in value.split(","):
+            item = item.strip()
+            if item and item not in items:
+                items.append(item)
+    return items
+
+
+def expand_grid(
+    prompts: Sequence[str],
+    models: Sequence[str],
+    temperatures: Sequence[float],
+) -> List[SweepConfig]:
+    """Build the cartesian product of prompts, models and temperatures."""
+    return [
+        SweepConfig(prompt, model, temperature)
+        for prompt in prompts
+        for model in models
+        for temperature in temperatures
+    ]
+
+
+def run_sweep(
+    classify: Callable[[SweepConfig, RowT], R],
+    configs: Sequence[SweepConfig],
+    rows: Sequence[RowT],
+    concurrency: int = 1,
+    on_done: Optional[Callable[[int, int], None]] = None,
+) -> Dict[SweepConfig, List[R]]:
+    """Run every configuration on every row under one concurrency limit.
+
+    Args:
+        classify: Function classifying one row with one configuration
+            (must be thread-safe)
+        configs: Configurations to evaluate
+        rows: Dataset rows
+        concurrency: Maximum requests in flight across all configurations
+        on_done: Optional ``on_done(completed, total)`` progress callback
+
+    Returns:
+        Results per configuration, aligned with ``rows``
+    """
+    tasks = [(config, row) for row in rows for config in configs]
+    results = map_concurrent(
+        lambda task: classify(*task),
+        tasks,
+        concurrency=concurrency,
+        on_done=on_done,
+    )
+
+    grouped: Dict[SweepConfig, List[R]] = {config: [] for config in configs}
+    for (config, _), result in zip(tasks, results):
+        grouped[config].append(result)
+    return grouped
+
+
+def leaderboard_entry(
+    config: SweepConfig,
+    metrics: Optional[dict],
+    latencies_ms: Sequence[int],
+    failed: int,
+    run_dir: Path,
+    cost_per_1k_events: Optional[float] = None,
+) -> dict:
+    """Summarize one configuration for the leaderboard.
+
+    Args:
+        config: Evaluated configuration
+        metrics: Metrics dict (None if every request failed)
+        latencies_ms: Latency of every successful prediction
+        failed: Number of failed rows
+        run_dir: Run directory holding the full results
+        cost_per_1k_events: Estimated API cost per 1000 rows (see
+            ``bikeclf.usage``), None if unknown
+
+    Returns:
+        Leaderboard row
+    """
+    return {
+        **asdict(config),
+        "accuracy": metrics["accuracy"] if metrics else None,
+        "macro_f1": metrics["macro_f1"] if metrics else None,
+        "successful_predictions": len(latencies_ms),
+        "failed_predictions": failed,
+        "mean_latency_ms": statistics.fmean(latencies_ms) if latencies_ms else None,
+        "cost_per_1k_events": cost_per_1k_events,
+        "run_dir": str(run_dir),
+    }
+
+
+def rank_leaderboard(entries: List[dict]) -> List[dict]:
+    """Sort entries by macro F1, then accuracy (failed configurations last)."""
+    ranked = sorted(
+        entries,
+        key=lambda e: (e["macro_f1"] is not None, e["macro_f1"] or 0.0, e["accuracy"] or 0.0),
+        reverse=True,
+    )
+    return [{"rank": rank, **entry} for rank, entry in enumerate(ranked, start=1)]
+
+
+def write_leaderboard(path: Path, entries: List[dict], settings: dict) -> List[dict]:
+    """Rank entries and write the combined leaderboard JSON.
+
+    Args:
+        path: Output file
+        entries: One ``leaderboard_entry`` per configuration
+        settings: Sweep-wide settings (dataset, workers, cache stats, ...)
+
+    Returns:
+        Ranked entries
+    """
+    ranked = rank_leaderboard(entries)
+    write_json({**settings, "leaderboard": ranked}, path)
+    return ranked
+
+
+def leaderboard_table(ranked: List[dict]) -> Table:
+    """Render ranked entries as a rich table."""
+    table = Table(title="Sweep Leaderboard")
+    table.add_column("#", justify="right")
+    table.add_column("Prompt", style="cyan")
+    table.add_column("Model")
+    table.add_column("Temp", justify="right")
+    table.add_column("Macro F1", justify="right")
+    table.add_column("Accuracy", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Latency (ms)", justify="right")
+    table.add_column("$/1k events", justify="right")
+
+    for entry in ranked:
+        table.add_row(
+            str(entry["rank"]),
+            entry["prompt_version"],
+            entry["model_id"],
+            f"{entry['temperature']:g}",
+            f"{entry['macro_f1']:.3f}" if entry["macro_f1"] is not None else "-",
+            f"{entry['accuracy']:.3f}" if entry["accuracy"] is not None else "-",
+            str(entry["failed_predictions"]),
+            f"{entry['mean_latency_ms']:.0f}" if entry["mean_latency_ms"] is not None else "-",
+            f"{entry['cost_per_1k_events']:.4f}" if entry.get("cost_per_1k_events") is not None else "-",
+        )
+    return table
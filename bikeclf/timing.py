@@ -0,0 +1,216 @@
+"""Per-stage hot-path timing with latency histograms.
+
+Code on the hot path wraps each stage in ``span``::
+
+    with timing.span("llm_wait"):
+        response = client.models.generate_content(...)
+
+Spans are recorded into the ``Timings`` activated with ``recording`` (or
+``activate`` in a script's ``main``) and cost a single context variable
+lookup when nothing is recording. The active recorder follows the context
+into worker threads started by ``map_concurrent``, ``prefetch_pages`` and
+``OrderedWriter``, so a run captures stages from every thread. Since those threads overlap, stage totals
+can add up to more than the run's wall time.
+
+At the end of a run, ``Timings.write_json`` stores counts, totals and
+percentiles per stage (``timings.json``); ``Timings.write_prometheus``
+exports the same histograms in the Prometheus text format.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# Stages instrumented in the pipelines and eval CLIs
+STAGES = {
+    "fetch": "Reading a page of events (Supabase) or the dataset (eval)",
+    "prefilter": "Rule-based filtering before the LLM",
+    "prompt_format": "Formatting single- and multi-report prompts",
+    "rate_limit_wait": "Waiting for the Gemini RPM/TPM budget",
+    "llm_wait": "Waiting for a Gemini response (per attempt)",
+    "parse_validate": "JSON parsing and schema validation of a response",
+    "write": "Writing results back (Supabase or run files)",
+    "checkpoint": "Persisting the resume checkpoint",
+}
+
+# Histogram bucket upper bounds in seconds (Prometheus ``le`` labels)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+PERCENTILES = (50, 90, 95, 99)
+
+_ACTIVE: contextvars.ContextVar[Optional["Timings"]] = contextvars.ContextVar(
+    "bikeclf_timings", default=None
+)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile (``q`` in 0..100), None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Durations of one stage: bucket counts plus raw samples for percentiles."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.samples: List[float] = []
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.total += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def summary(self) -> Dict[str, Any]:
+        """Count, total seconds and millisecond statistics."""
+        data: Dict[str, Any] = {
+            "count": len(self.samples),
+            "total_seconds": round(self.total, 4),
+            "mean_ms": round(self.total / len(self.samples) * 1000, 3) if self.samples else None,
+        }
+        ordered = sorted(self.samples)
+        for q in PERCENTILES:
+            value = percentile(ordered, q)
+            data[f"p{q}_ms"] = round(value * 1000, 3) if value is not None else None
+        data["max_ms"] = round(ordered[-1] * 1000, 3) if ordered else None
+        return data
+
+
+class Timings:
+    """Thread-safe collection of per-stage histograms for one run."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[str, Histogram] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one duration for ``stage``."""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one ``stage`` observation (also on error)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Any]:
+        """Wall time and per-stage statistics, stages in ``STAGES`` order first."""
+        with self._lock:
+            order = list(STAGES)
+            names = sorted(
+                self.histograms,
+                key=lambda stage: (order.index(stage) if stage in STAGES else len(order), stage),
+            )
+            stages = {name: self.histograms[name].summary() for name in names}
+        return {
+            "wall_seconds": round(time.perf_counter() - self.started, 4),
+            "stages": stages,
+        }
+
+    def write_json(self, path: Path) -> None:
+        """Write ``summary()`` to ``path`` (e.g. ``run_dir / "timings.json"``)."""
+        # Imported here: bikeclf.io loads pandas, which the clients don't need
+        from bikeclf.io import write_json
+
+        write_json(self.summary(), Path(path))
+
+    def prometheus_text(self, labels: Optional[Dict[str, str]] = None) -> str:
+        """Render the histograms in the Prometheus text exposition format.
+
+        Args:
+            labels: Extra labels added to every series (e.g. run, pipeline)
+
+        Returns:
+            ``bikeclf_stage_duration_seconds`` histogram series per stage
+        """
+        name = "bikeclf_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of pipeline stages in seconds.",
+            f"# TYPE {name} histogram",
+        ]
+
+        def series(suffix: str, stage: str, value: Any, le: Optional[str] = None) -> str:
+            pairs = {**(labels or {}), "stage": stage, **({"le": le} if le is not None else {})}
+            rendered = ",".join(f'{key}="{_escape_label(val)}"' for key, val in pairs.items())
+            return f"{name}{suffix}{{{rendered}}} {value}"
+
+        with self._lock:
+            for stage, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(series("_bucket", stage, cumulative, le=repr(float(bound))))
+                lines.append(series("_bucket", stage, len(histogram.samples), le="+Inf"))
+                lines.append(series("_sum", stage, repr(histogram.total)))
+                lines.append(series("_count", stage, len(histogram.samples)))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path, labels: Optional[Dict[str, str]] = None) -> None:
+        """Write ``prometheus_text`` to ``path`` (node_exporter textfile format)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.prometheus_text(labels), encoding="utf-8")
+        tmp_path.replace(path)
+
+
+def activate(timings: Timings) -> None:
+    """Record ``span`` calls into ``timings`` for the rest of this context.
+
+    Meant for script entry points; use ``recording`` for a bounded block.
+    """
+    _ACTIVE.set(timings)
+
+
+@contextmanager
+def recording(timings: Timings) -> Iterator[Timings]:
+    """Make ``timings`` the recorder for ``span`` calls in this context."""
+    token = _ACTIVE.set(timings)
+    try:
+        yield timings
+    finally:
+        _ACTIVE.reset(token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block into the active ``Timings``, if any."""
+    timings = _ACTIVE.get()
+    if timings is None:
+        yield
+        return
+    with timings.span(stage):
+        yield
+
+
+def active() -> Optional[Timings]:
+    """The ``Timings`` recording in this context, or None."""
+    return _ACTIVE.get()
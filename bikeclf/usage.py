@@ -0,0 +1,176 @@
+"""Token usage and cost accounting for Gemini calls.
+
+Every response's ``usage_metadata`` is added to the ``UsageMeter`` objects
+active in the calling context::
+
+    meter = UsageMeter()
+    with metering(meter):
+        client.classify_with_retry(prompt, model_id)
+    meter.total()  # TokenUsage(calls=1, prompt_tokens=..., cost_usd=...)
+
+Meters nest: a call inside a per-row meter that is itself inside a run-wide
+meter counts towards both, so a run total includes retries, repair prompts,
+cascade escalations and calls whose result was discarded. Like
+``bikeclf.timing`` recorders, active meters follow the context into worker
+threads. Responses served from the persistent response cache cost nothing
+and are not counted.
+
+Costs use the list prices in ``bikeclf.config.MODEL_PRICES``; models
+without a price (e.g. the local gate) leave ``cost_usd`` unset.
+"""
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from bikeclf.config import MODEL_PRICES
+from bikeclf.schema import TokenUsage
+
+_COUNTS = ("calls", "prompt_tokens", "cached_tokens", "output_tokens", "thinking_tokens")
+
+_ACTIVE: contextvars.ContextVar[Tuple["UsageMeter", ...]] = contextvars.ContextVar(
+    "bikeclf_usage_meters", default=()
+)
+
+
+def usage_from_response(response: Any) -> Optional[Dict[str, int]]:
+    """Read token counts from a ``generate_content`` response.
+
+    Args:
+        response: SDK response (or any object with ``usage_metadata``)
+
+    Returns:
+        Counts keyed like ``TokenUsage`` fields, or None if the response
+        carries no usage metadata
+    """
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return None
+    return {
+        "calls": 1,
+        "prompt_tokens": getattr(metadata, "prompt_token_count", None) or 0,
+        "cached_tokens": getattr(metadata, "cached_content_token_count", None) or 0,
+        "output_tokens": getattr(metadata, "candidates_token_count", None) or 0,
+        "thinking_tokens": getattr(metadata, "thoughts_token_count", None) or 0,
+    }
+
+
+def estimate_cost(model_id: str, counts: Dict[str, int]) -> Optional[float]:
+    """Cost in USD of ``counts`` at the list price of ``model_id``.
+
+    Cached prompt tokens are billed at the context-cache rate, the rest of
+    the prompt at the input rate, and thinking tokens as output.
+
+    Returns:
+        Cost in USD, or None if the model has no entry in ``MODEL_PRICES``
+    """
+    prices = MODEL_PRICES.get(model_id)
+    if prices is None:
+        return None
+    cached = counts.get("cached_tokens", 0)
+    uncached = counts.get("prompt_tokens", 0) - cached
+    output = counts.get("output_tokens", 0) + counts.get("thinking_tokens", 0)
+    return (
+        uncached * prices["input"] + cached * prices["cached"] + output * prices["output"]
+    ) / 1_000_000
+
+
+class UsageMeter:
+    """Thread-safe token counts per model."""
+
+    def __init__(self):
+        self.by_model: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model_id: str, counts: Dict[str, int]) -> None:
+        """Add the counts of one (or more) calls to ``model_id``."""
+        with self._lock:
+            totals = self.by_model.setdefault(model_id, dict.fromkeys(_COUNTS, 0))
+            for key in _COUNTS:
+                totals[key] += counts.get(key, 0)
+
+    def _usage(self, by_model: Dict[str, Dict[str, int]]) -> TokenUsage:
+        totals = dict.fromkeys(_COUNTS, 0)
+        cost: Optional[float] = 0.0
+        for model_id, counts in by_model.items():
+            for key in _COUNTS:
+                totals[key] += counts[key]
+            model_cost = estimate_cost(model_id, counts)
+            cost = None if cost is None or model_cost is None else cost + model_cost
+        return TokenUsage(**totals, cost_usd=round(cost, 8) if by_model and cost is not None else None)
+
+    def total(self) -> TokenUsage:
+        """Counts and estimated cost summed over all models."""
+        with self._lock:
+            by_model = {model_id: dict(counts) for model_id, counts in self.by_model.items()}
+        return self._usage(by_model)
+
+    def summary(self, events: int) -> Dict[str, Any]:
+        """Run-level usage for ``config.json``.
+
+        Args:
+            events: Events the run classified (or tried to), used for the
+                per-event figures
+
+        Returns:
+            Totals, per-event tokens, ``cost_per_1k_events`` and a
+            ``by_model`` breakdown with each model's cost
+        """
+        with self._lock:
+            by_model = {model_id: dict(counts) for model_id, counts in self.by_model.items()}
+        total = self._usage(by_model)
+        tokens = total.prompt_tokens + total.output_tokens + total.thinking_tokens
+        return {
+            **total.model_dump(),
+            "events": events,
+            "tokens_per_event": round(tokens / events, 1) if events else None,
+            "cost_per_1k_events": (
+                round(total.cost_usd / events * 1000, 6)
+                if events and total.cost_usd is not None
+                else None
+            ),
+            "by_model": {
+                model_id: {**counts, "cost_usd": estimate_cost(model_id, counts)}
+                for model_id, counts in sorted(by_model.items())
+            },
+        }
+
+
+def format_cost(summary: Dict[str, Any]) -> str:
+    """One-line cost summary, e.g. ``$0.0412 per 1k events (372 tokens/event)``."""
+    if not summary["calls"] or not summary["events"]:
+        return "no API calls (all responses cached)"
+    tokens = f"{summary['tokens_per_event']:.0f} tokens/event"
+    if summary["cost_per_1k_events"] is None:
+        return f"unknown price ({tokens})"
+    return f"${summary['cost_per_1k_events']:.4f} per 1k events ({tokens})"
+
+
+@contextmanager
+def metering(meter: UsageMeter) -> Iterator[UsageMeter]:
+    """Count calls made in this context into ``meter`` (and any outer meters)."""
+    token = _ACTIVE.set(_ACTIVE.get() + (meter,))
+    try:
+        yield meter
+    finally:
+        _ACTIVE.reset(token)
+
+
+def activate(meter: UsageMeter) -> None:
+    """Count calls into ``meter`` for the rest of this context.
+
+    Meant for script entry points; use ``metering`` for a bounded block.
+    """
+    _ACTIVE.set(_ACTIVE.get() + (meter,))
+
+
+def record(model_id: str, response: Any) -> None:
+    """Add a response's usage metadata to every active meter."""
+    meters = _ACTIVE.get()
+    if not meters:
+        return
+    counts = usage_from_response(response)
+    if counts is None:
+        return
+    for meter in meters:
+        meter.add(model_id, counts)
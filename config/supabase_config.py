@@ -84,3 +84,51 @@ def should_check_with_llm(service_name: str, description: str | None) -> tuple[b
 
     # Unknown category → check with LLM to be safe
     return True, "unknown_category"
+
+
+def _postgrest_quote(value: str) -> str:
+    """Quote a value for use inside a PostgREST ``in.(...)`` list."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def postgrest_prefilter_params() -> dict[str, str]:
+    """
+    Compile the pre-filter into PostgREST query parameters.
+
+    Rows matching these filters are the ones should_check_with_llm() can
+    send to the LLM: a description is present and service_name is not in
+    DEFINITELY_EXCLUDE. NULL service names are kept explicitly, since
+    `not.in` alone would drop them. Whitespace-only descriptions still pass
+    and are caught by should_check_with_llm() locally.
+
+    Returns:
+        Query parameters to merge into a GET /rest/v1/events request
+    """
+    excluded = ",".join(_postgrest_quote(name) for name in sorted(DEFINITELY_EXCLUDE))
+    return {
+        "description": "not.is.null",
+        "or": f"(service_name.is.null,service_name.not.in.({excluded}))",
+    }
+
+
+def postgrest_excluded_category_params(service_name: str) -> dict[str, str]:
+    """
+    PostgREST filters selecting rows should_check_with_llm() rejects as
+    `excluded_category: <service_name>`.
+
+    should_check_with_llm() checks the description first, so rows whose
+    description is missing, empty or whitespace-only are not selected:
+    they are `no_description`, not excluded. `match.\\S` (regex: at
+    least one non-whitespace character) also rules out NULL.
+
+    Args:
+        service_name: One of DEFINITELY_EXCLUDE
+
+    Returns:
+        Query parameters for a PATCH/HEAD on /rest/v1/events
+    """
+    return {
+        "service_name": f"eq.{service_name}",
+        "description": r"match.\S",
+    }
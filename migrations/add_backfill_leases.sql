@@ -0,0 +1,60 @@
+-- Migration: Lease table for sharded backfills
+-- Date: 2026-10-17
+-- Description: Lets several pipeline workers (on any host) split a backfill
+--   into service_request_id ranges. Workers claim a free or expired range,
+--   renew the lease while working and store their keyset cursor, so a
+--   crashed worker's range is resumed by another one (see bikeclf/shards.py).
+
+CREATE TABLE IF NOT EXISTS backfill_ranges (
+    job TEXT NOT NULL,
+    range_id INTEGER NOT NULL,
+    lo TEXT,              -- exclusive lower bound (NULL = start of table)
+    hi TEXT,              -- inclusive upper bound (NULL = end of table)
+    cursor TEXT,          -- last service_request_id whose batch was written
+    owner TEXT,
+    expires_at TIMESTAMPTZ,
+    done BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (job, range_id)
+);
+
+-- Claim one unfinished range that is free or whose lease expired
+CREATE OR REPLACE FUNCTION claim_backfill_range(p_job TEXT, p_owner TEXT, p_ttl_seconds INTEGER)
+RETURNS SETOF backfill_ranges
+LANGUAGE sql
+AS $$
+    UPDATE backfill_ranges AS r SET
+        owner = p_owner,
+        expires_at = now() + make_interval(secs => p_ttl_seconds)
+    WHERE (r.job, r.range_id) = (
+        SELECT job, range_id FROM backfill_ranges
+        WHERE job = p_job
+          AND NOT done
+          AND (owner IS NULL OR expires_at < now())
+        ORDER BY range_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING r.*;
+$$;
+
+-- Extend a lease held by p_owner and optionally record progress;
+-- returns FALSE if the lease was taken over
+CREATE OR REPLACE FUNCTION renew_backfill_range(
+    p_job TEXT,
+    p_range_id INTEGER,
+    p_owner TEXT,
+    p_ttl_seconds INTEGER,
+    p_cursor TEXT DEFAULT NULL
+)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+    WITH renewed AS (
+        UPDATE backfill_ranges SET
+            expires_at = now() + make_interval(secs => p_ttl_seconds),
+            cursor = COALESCE(p_cursor, cursor)
+        WHERE job = p_job AND range_id = p_range_id AND owner = p_owner AND NOT done
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM renewed);
+$$;
@@ -0,0 +1,56 @@
+-- Migration: Add bulk update RPC functions for classification write-back
+-- Date: 2026-10-17
+-- Description: Lets the pipelines update many events in one request
+--   (POST /rest/v1/rpc/<function> with body {"rows": [...]}) without the
+--   NOT NULL requirements of an INSERT-based upsert.
+
+-- Phase 1: bike relevance columns
+CREATE OR REPLACE FUNCTION update_bike_classifications(rows JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE events AS e SET
+            bike_related = r.bike_related,
+            bike_confidence = r.bike_confidence,
+            bike_evidence = r.bike_evidence,
+            bike_reasoning = r.bike_reasoning
+        FROM jsonb_to_recordset(rows) AS r(
+            service_request_id TEXT,
+            bike_related BOOLEAN,
+            bike_confidence NUMERIC,
+            bike_evidence TEXT[],
+            bike_reasoning TEXT
+        )
+        WHERE e.service_request_id = r.service_request_id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
+
+-- Phase 2: bike issue category columns
+CREATE OR REPLACE FUNCTION update_bike_issue_classifications(rows JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE events AS e SET
+            bike_issue_category = r.bike_issue_category,
+            bike_issue_confidence = r.bike_issue_confidence,
+            bike_issue_evidence = r.bike_issue_evidence,
+            bike_issue_reasoning = r.bike_issue_reasoning
+        FROM jsonb_to_recordset(rows) AS r(
+            service_request_id TEXT,
+            bike_issue_category TEXT,
+            bike_issue_confidence NUMERIC,
+            bike_issue_evidence TEXT[],
+            bike_issue_reasoning TEXT
+        )
+        WHERE e.service_request_id = r.service_request_id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
+
+COMMENT ON FUNCTION update_bike_classifications(JSONB) IS 'Bulk write-back of Phase 1 bike_* columns (pipeline --write-rpc)';
+COMMENT ON FUNCTION update_bike_issue_classifications(JSONB) IS 'Bulk write-back of Phase 2 bike_issue_* columns (pipeline --write-rpc)';
@@ -0,0 +1,38 @@
+-- Migration: Add bulk update RPC function for fused Phase 1 + Phase 2 write-back
+-- Date: 2026-10-17
+-- Description: Used by run_supabase_pipeline.py --fused --write-rpc
+--   update_bike_fused_classifications to fill bike_* and bike_issue_*
+--   columns from a single LLM call.
+
+CREATE OR REPLACE FUNCTION update_bike_fused_classifications(rows JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE events AS e SET
+            bike_related = r.bike_related,
+            bike_confidence = r.bike_confidence,
+            bike_evidence = r.bike_evidence,
+            bike_reasoning = r.bike_reasoning,
+            bike_issue_category = r.bike_issue_category,
+            bike_issue_confidence = r.bike_issue_confidence,
+            bike_issue_evidence = r.bike_issue_evidence,
+            bike_issue_reasoning = r.bike_issue_reasoning
+        FROM jsonb_to_recordset(rows) AS r(
+            service_request_id TEXT,
+            bike_related BOOLEAN,
+            bike_confidence NUMERIC,
+            bike_evidence TEXT[],
+            bike_reasoning TEXT,
+            bike_issue_category TEXT,
+            bike_issue_confidence NUMERIC,
+            bike_issue_evidence TEXT[],
+            bike_issue_reasoning TEXT
+        )
+        WHERE e.service_request_id = r.service_request_id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
+
+COMMENT ON FUNCTION update_bike_fused_classifications(JSONB) IS 'Bulk write-back of bike_* and bike_issue_* columns (pipeline --fused --write-rpc)';
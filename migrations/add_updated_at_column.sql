@@ -0,0 +1,35 @@
+-- Migration: Track when an event's report text last changed
+-- Date: 2026-10-17
+-- Description: Adds events.updated_at for the pipelines' --changed-since
+--   watermark. The trigger only bumps it when the reported content changes,
+--   so writing classification results back does not mark events as edited.
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS idx_events_updated_at ON events(updated_at);
+
+CREATE OR REPLACE FUNCTION touch_event_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.title IS DISTINCT FROM OLD.title
+        OR NEW.description IS DISTINCT FROM OLD.description
+        OR NEW.service_name IS DISTINCT FROM OLD.service_name
+        OR NEW.category IS DISTINCT FROM OLD.category
+        OR NEW.subcategory IS DISTINCT FROM OLD.subcategory
+        OR NEW.subcategory2 IS DISTINCT FROM OLD.subcategory2
+    THEN
+        NEW.updated_at = now();
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS events_touch_updated_at ON events;
+CREATE TRIGGER events_touch_updated_at
+    BEFORE UPDATE ON events
+    FOR EACH ROW
+    EXECUTE FUNCTION touch_event_updated_at();
+
+COMMENT ON COLUMN events.updated_at IS 'Last change of the report content (not of classification columns)';
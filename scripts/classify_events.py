@@ -6,7 +6,6 @@ This script runs classification without requiring gold labels.
 
 import json
 import sys
-import time
 from pathlib import Path
 from datetime import datetime
 import csv
@@ -152,9 +151,6 @@ def classify_events(
             # Update progress
             progress.update(task, advance=1)
 
-            # Rate limiting (10 per second)
-            time.sleep(0.1)
-
     # Save predictions
     console.print(f"\n[bold blue]Saving results...[/bold blue]")
     # Save predictions as JSONL manually since write_predictions_jsonl expects Pydantic objects
@@ -0,0 +1,83 @@
+"""
+Run a local Supabase REST stand-in for benchmarks and resume tests.
+
+Serves the PostgREST subset the pipelines use from a SQLite file (see
+bikeclf/local_postgrest.py), so pagination, write-back throughput and
+checkpoint/lease resume can be exercised at realistic scale without
+touching production.
+
+Examples:
+    # Seed from the 200-event sample, or a synthetic table of 1M events
+    python scripts/local_supabase.py seed --csv data/supabase_test_200.csv
+    python scripts/local_supabase.py seed --synthetic 1000000
+
+    # Serve it and run a pipeline against it (offline with the fake LLM backend)
+    python scripts/local_supabase.py serve --port 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_SERVICE_ROLE_KEY=local BIKECLF_BACKEND=fake \\
+        python scripts/run_supabase_pipeline.py --batch-size 500
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bikeclf.local_postgrest import LocalPostgREST, events_from_csv, make_server, synthetic_events
+
+DEFAULT_DB_PATH = Path("data/local_supabase.sqlite")
+
+
+def seed(args: argparse.Namespace) -> None:
+    if args.reset and args.db.exists():
+        for path in (args.db, Path(f"{args.db}-wal"), Path(f"{args.db}-shm")):
+            path.unlink(missing_ok=True)
+    store = LocalPostgREST(args.db)
+    events = synthetic_events(args.synthetic, seed=args.seed) if args.synthetic else events_from_csv(args.csv)
+
+    start = time.perf_counter()
+    inserted = store.seed(events)
+    elapsed = time.perf_counter() - start
+    print(f"Seeded {inserted} events in {elapsed:.1f}s ({store.count()} total) into {args.db}")
+    store.close()
+
+
+def serve(args: argparse.Namespace) -> None:
+    store = LocalPostgREST(args.db)
+    server = make_server(store, args.host, args.port)
+    print(f"Serving {store.count()} events from {args.db} at http://{args.host}:{args.port}")
+    print(f"Use: SUPABASE_URL=http://{args.host}:{args.port} SUPABASE_SERVICE_ROLE_KEY=local")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local PostgREST stand-in backed by SQLite")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Load events into the database")
+    source = seed_parser.add_mutually_exclusive_group()
+    source.add_argument("--csv", type=Path, default=Path("data/supabase_test_200.csv"), help="CSV with id, subject, description, service_name")
+    source.add_argument("--synthetic", type=int, default=0, help="Generate this many synthetic events instead")
+    seed_parser.add_argument("--seed", type=int, default=0, help="Random seed for synthetic events")
+    seed_parser.add_argument("--reset", action="store_true", help="Delete the database first")
+    seed_parser.set_defaults(func=seed)
+
+    serve_parser = commands.add_parser("serve", help="Serve the database over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    serve_parser.add_argument("--port", type=int, default=54321, help="Port")
+    serve_parser.set_defaults(func=serve)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
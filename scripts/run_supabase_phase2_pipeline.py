@@ -9,93 +9,66 @@ This script:
 Supports:
 - Batch processing with configurable batch size
 - Row limit for testing (--limit flag)
-- Resume from last processed ID (checkpoint file)
+- Resume from last processed ID (per-run checkpoint) plus a per-event journal, so
+  classified-but-unwritten results survive a crash without new LLM calls
 - Only process unclassified events (bike_issue_category IS NULL)
+- Streaming stages: next page prefetched during classification, writes drained in the background
+
+New runs can skip this job by categorizing positives during Phase 1
+(run_supabase_pipeline.py --phase2-handoff); use --only-unclassified here to
+pick up anything the handoff missed.
 """
 import json
 import os
 import sys
-import time
 import argparse
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
-from urllib import request, parse, error
 
 from dotenv import load_dotenv
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from bikeclf.cache import open_cache
+from bikeclf.cascade import DEFAULT_CASCADE_MODEL, DEFAULT_CASCADE_THRESHOLD
+from bikeclf.concurrency import AdaptiveConcurrency
 from bikeclf.config import APIConfig, SUPPORTED_MODELS
+from bikeclf.context_cache import CONTEXT_CACHE_MODES
+from bikeclf.fingerprints import FingerprintStore, resolve_changed_since
+from bikeclf.dedup import DEFAULT_NEAR_THRESHOLD, Deduplicator, dedup_namespace
 from bikeclf.phase2.gemini_client import Phase2GeminiClient
-from bikeclf.phase2.prompt_loader import load_prompt, format_prompt
+from bikeclf.phase2.pipeline import (
+    PHASE2,
+    PHASE2_EVENT_COLUMNS,
+    classify_batch,
+    event_text_hash,
+    record_fingerprints,
+    write_predictions_to_supabase,
+)
+from bikeclf.phase2.prompt_loader import load_prompt
 from bikeclf.io import write_json
+from bikeclf.journal import JOURNAL_FILENAME, Journal, JournalState, replay
+from bikeclf.pipeline import OrderedWriter, prefetch_pages
+from bikeclf.rate_limit import RateLimiter, rpm_from_sleep
+from bikeclf.shards import (
+    DEFAULT_LEASE_PATH,
+    SQLiteLeaseStore,
+    SupabaseLeaseStore,
+    parse_shard,
+    range_upper_params,
+    shard_range,
+)
+from bikeclf.supabase import DEFAULT_WRITE_CHUNK_SIZE, PHASE2_UPDATE_RPC, SupabaseClient
+from bikeclf.timing import Timings, activate, span
+from bikeclf import usage
 
 
 DEFAULT_BATCH_SIZE = 100
-DEFAULT_SLEEP_SECONDS = 0.1
-CHECKPOINT_FILE = Path(__file__).parent.parent / "phase2" / "checkpoint_supabase.json"
-
-
-class SupabaseClient:
-    """Minimal Supabase REST API client."""
-
-    def __init__(self, base_url: str, api_key: str):
-        self.base_url = base_url.rstrip("/")
-        self.api_key = api_key
-
-    def request_json(
-        self,
-        method: str,
-        path: str,
-        params: dict[str, str] | None = None,
-        body: Any | None = None,
-        headers: dict[str, str] | None = None,
-        retries: int = 3,
-        retry_delay: float = 2.0,
-    ) -> Any:
-        """Make HTTP request with retries."""
-        url = f"{self.base_url}{path}"
-        if params:
-            query = parse.urlencode(params, safe=",()")
-            url = f"{url}?{query}"
-
-        data = None
-        if body is not None:
-            data = json.dumps(body).encode("utf-8")
-
-        req = request.Request(url, data=data, method=method)
-        req.add_header("apikey", self.api_key)
-        req.add_header("Authorization", f"Bearer {self.api_key}")
-        req.add_header("Content-Type", "application/json")
-        req.add_header("Prefer", "return=minimal")  # Don't return updated rows
-        if headers:
-            for key, value in headers.items():
-                req.add_header(key, value)
-
-        last_error = None
-        for attempt in range(retries):
-            try:
-                with request.urlopen(req, timeout=60) as resp:
-                    payload = resp.read().decode("utf-8")
-                    return json.loads(payload) if payload else None
-            except error.HTTPError as exc:
-                detail = exc.read().decode("utf-8")
-                last_error = f"HTTP {exc.code}: {detail}"
-                if exc.code >= 500 and attempt < retries - 1:
-                    # Retry on server errors
-                    time.sleep(retry_delay * (attempt + 1))
-                    continue
-                raise RuntimeError(f"Supabase API error: {last_error}") from exc
-            except Exception as exc:
-                last_error = str(exc)
-                if attempt < retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
-                    continue
-                raise
-
-        raise RuntimeError(f"Failed after {retries} attempts: {last_error}")
+DEFAULT_CONCURRENCY = 8
+RUNS_ROOT = Path(__file__).parent.parent / "phase2" / "runs"
+# Global checkpoint written by older versions (before per-run checkpoints)
+LEGACY_CHECKPOINT_FILE = Path(__file__).parent.parent / "phase2" / "checkpoint_supabase.json"
 
 
 def load_env(name: str) -> str:
@@ -106,33 +79,13 @@ def load_env(name: str) -> str:
     return value
 
 
-def build_subject(event: dict) -> str:
-    """Build subject from category + subcategory + subcategory2.
-
-    Args:
-        event: Event dict with category, subcategory, subcategory2 fields
-
-    Returns:
-        Combined subject string (handles NULL values)
-    """
-    parts = [event.get("category")]
-
-    sub1 = event.get("subcategory")
-    if sub1 and sub1.upper() != "NULL":
-        parts.append(sub1)
-
-    sub2 = event.get("subcategory2")
-    if sub2 and sub2.upper() != "NULL":
-        parts.append(sub2)
-
-    return " - ".join(p for p in parts if p)
-
-
 def fetch_events(
     client: SupabaseClient,
     batch_size: int,
     last_id: str | None,
     only_unclassified: bool,
+    changed_since: str | None = None,
+    upper_id: str | None = None,
 ) -> list[dict]:
     """Fetch a batch of bike_related=true events.
 
@@ -141,12 +94,14 @@ def fetch_events(
         batch_size: Number of rows to fetch
         last_id: Last processed service_request_id (for pagination)
         only_unclassified: If True, only fetch events where bike_issue_category IS NULL
+        changed_since: Only fetch events with updated_at after this timestamp
+        upper_id: Only fetch events with service_request_id <= this ID
 
     Returns:
         List of event dicts
     """
     params = {
-        "select": "service_request_id,category,subcategory,subcategory2,description",
+        "select": PHASE2_EVENT_COLUMNS,
         "bike_related": "eq.true",  # Only bike-related events
         "order": "service_request_id",
         "limit": str(batch_size),
@@ -158,161 +113,44 @@ def fetch_events(
     if only_unclassified:
         params["bike_issue_category"] = "is.null"
 
-    return client.request_json("GET", "/rest/v1/events", params=params)
-
-
-def classify_batch(
-    client: Phase2GeminiClient,
-    system_prompt: str,
-    prompt_hash: str,
-    events: list[dict],
-    prompt_version: str,
-    model: str,
-    temperature: float,
-    sleep_seconds: float,
-) -> tuple[list[dict], list[dict]]:
-    """Classify a batch of events into Phase 2 categories.
-
-    Returns:
-        Tuple of (predictions, errors)
-    """
-    predictions = []
-    errors = []
-    total = len(events)
-
-    for idx, event in enumerate(events, start=1):
-        # Build subject from category fields
-        subject = build_subject(event)
-        description = event.get("description", "")
-
-        if not description:
-            print(f"  [{idx}/{total}] Skipping {event['service_request_id']}: No description")
-            continue
-
-        # Format prompt
-        full_prompt = format_prompt(
-            system_prompt=system_prompt,
-            subject=subject,
-            description=description,
-        )
-
-        # Classify with retry
-        output, latency_ms, attempts, error_msg = client.classify_with_retry(
-            prompt=full_prompt,
-            model_id=model,
-            temperature=temperature,
-            max_tokens=512,
-        )
-
-        if output:
-            predictions.append(
-                {
-                    "id": event["service_request_id"],
-                    "subject": subject,
-                    "description": description,
-                    "pred": {
-                        "category": output.category,
-                        "evidence": output.evidence,
-                        "reasoning": output.reasoning,
-                        "confidence": output.confidence,
-                    },
-                    "meta": {
-                        "model_id": model,
-                        "prompt_version": prompt_version,
-                        "prompt_hash": prompt_hash,
-                        "temperature": temperature,
-                        "latency_ms": latency_ms,
-                        "attempts": attempts,
-                        "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                    },
-                }
-            )
-            print(f"  [{idx}/{total}] ✓ {event['service_request_id']}: {output.category} (conf={output.confidence:.2f})")
-        else:
-            errors.append(
-                {
-                    "id": event["service_request_id"],
-                    "error": error_msg,
-                    "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                }
-            )
-            print(f"  [{idx}/{total}] ✗ {event['service_request_id']}: {error_msg}")
-
-        # Rate limiting
-        if sleep_seconds > 0 and idx < total:
-            time.sleep(sleep_seconds)
-
-    return predictions, errors
-
-
-def write_predictions_to_supabase(
-    client: SupabaseClient,
-    predictions: list[dict],
-    sleep_seconds: float = 0.05,
-) -> int:
-    """Write Phase 2 predictions back to Supabase.
-
-    Uses PATCH per row to update bike_issue_* columns.
-
-    Returns:
-        Number of successfully written rows
-    """
-    success_count = 0
-    total = len(predictions)
-
-    for idx, pred in enumerate(predictions, start=1):
-        row_id = pred["id"]
+    if changed_since:
+        params["updated_at"] = f"gt.{changed_since}"
 
-        # Prepare update payload
-        payload = {
-            "bike_issue_category": pred["pred"]["category"],
-            "bike_issue_confidence": pred["pred"]["confidence"],
-            "bike_issue_evidence": pred["pred"]["evidence"],
-            "bike_issue_reasoning": pred["pred"]["reasoning"],
-        }
+    params.update(range_upper_params(upper_id))
 
-        try:
-            client.request_json(
-                "PATCH",
-                "/rest/v1/events",
-                params={"service_request_id": f"eq.{row_id}"},
-                body=payload,
-            )
-            success_count += 1
-            print(f"  [{idx}/{total}] ✓ Wrote {row_id}")
-        except Exception as e:
-            print(f"  [{idx}/{total}] ✗ Failed to write {row_id}: {e}")
-
-        # Rate limiting
-        if sleep_seconds > 0 and idx < total:
-            time.sleep(sleep_seconds)
+    with span("fetch"):
+        return client.request_json("GET", "/rest/v1/events", params=params)
 
-    return success_count
 
-
-def load_checkpoint() -> dict | None:
+def load_checkpoint(path: Path) -> dict | None:
     """Load checkpoint from file."""
-    if not CHECKPOINT_FILE.exists():
+    if not path.exists():
         return None
 
     try:
-        with CHECKPOINT_FILE.open("r") as f:
+        with path.open("r") as f:
             return json.load(f)
     except Exception as e:
         print(f"Warning: Failed to load checkpoint: {e}")
         return None
 
 
-def save_checkpoint(last_id: str, total_processed: int, total_classified: int):
-    """Save checkpoint to file."""
-    CHECKPOINT_FILE.parent.mkdir(parents=True, exist_ok=True)
+def save_checkpoint(path: Path, last_id: str, total_processed: int, total_classified: int):
+    """Save checkpoint to file (atomically)."""
     checkpoint = {
         "last_service_request_id": last_id,
         "total_processed": total_processed,
         "total_classified": total_classified,
         "timestamp_utc": datetime.now(timezone.utc).isoformat(),
     }
-    write_json(checkpoint, CHECKPOINT_FILE)
+    with span("checkpoint"):
+        write_json(checkpoint, path)
+
+
+def find_latest_run() -> Path | None:
+    """Return the most recent run directory that has a checkpoint."""
+    checkpoints = sorted(RUNS_ROOT.glob("*/checkpoint.json"), key=lambda p: p.stat().st_mtime)
+    return checkpoints[-1].parent if checkpoints else None
 
 
 def main():
@@ -321,22 +159,68 @@ def main():
     parser.add_argument("--model", "-m", default="gemini-2.5-flash-lite", help="Model ID")
     parser.add_argument("--temperature", "-t", type=float, default=0.0, help="Temperature")
     parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Batch size")
-    parser.add_argument("--sleep", type=float, default=DEFAULT_SLEEP_SECONDS, help="Sleep between classifications (seconds)")
+    parser.add_argument("--rpm", type=int, default=None, help="Gemini requests per minute budget per model (default: GEMINI_RPM or the model's GEMINI_TIER quota; 0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=None, help="Gemini tokens per minute budget per model (default: GEMINI_TPM or the model's GEMINI_TIER quota; 0 = unlimited)")
+    parser.add_argument("--sleep", type=float, default=None, help="Deprecated: use --rpm. Seconds between Gemini requests, applied as an RPM budget of 60/SLEEP")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Max LLM requests in flight")
+    parser.add_argument("--reports-per-request", type=int, default=1, help="Reports packed into one LLM request (batched mode when > 1)")
+    parser.add_argument("--cascade-model", nargs="?", const=DEFAULT_CASCADE_MODEL, default=None, help=f"Re-query uncertain/low-confidence results on this model (default: {DEFAULT_CASCADE_MODEL})")
+    parser.add_argument("--cascade-threshold", type=float, default=DEFAULT_CASCADE_THRESHOLD, help="Escalate results with confidence below this value")
+    parser.add_argument("--dedup", action="store_true", help="Classify identical reports (normalized subject + description) once and share the result")
+    parser.add_argument("--dedup-near", type=float, nargs="?", const=DEFAULT_NEAR_THRESHOLD, default=None, help=f"With --dedup, also share results between near-duplicates (MinHash Jaccard >= value, default: {DEFAULT_NEAR_THRESHOLD})")
+    parser.add_argument("--adaptive", action="store_true", help="Adapt concurrency (AIMD) to 429/503 responses, up to --concurrency")
+    parser.add_argument("--http-timeout", type=float, default=60.0, help="Supabase request timeout in seconds")
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2 for Supabase requests (requires httpx[http2])")
+    parser.add_argument("--gzip-requests", action="store_true", help="Gzip-compress Supabase request bodies")
+    parser.add_argument("--write-chunk-size", type=int, default=DEFAULT_WRITE_CHUNK_SIZE, help="Rows per bulk write request")
+    parser.add_argument("--write-rpc", default=PHASE2_UPDATE_RPC, help=f"Bulk-update RPC function for write-back (default: {PHASE2_UPDATE_RPC}); rows are PATCHed when the function is not installed")
+    parser.add_argument("--write-upsert", action="store_true", help="Write with an INSERT-based upsert (on_conflict merge) instead of updates; rows must satisfy every NOT NULL column and missing IDs are inserted")
+    parser.add_argument("--write-rpm", type=int, default=0, help="Supabase write requests per minute (0 = unlimited)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the persistent response cache")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-query the model and overwrite cached responses")
+    parser.add_argument("--context-cache", choices=CONTEXT_CACHE_MODES, default="off", help="Send the system prompt once as cached content or system instruction")
+    parser.add_argument("--context-cache-ttl", type=int, default=3600, help="TTL (seconds) for cached system prompt content")
+    parser.add_argument("--prefetch", type=int, default=1, help="Pages fetched ahead while the current page is classified")
+    parser.add_argument("--write-queue", type=int, default=2, help="Classified batches queued for the background writer")
     parser.add_argument("--only-unclassified", action="store_true", help="Only process events where bike_issue_category IS NULL")
+    parser.add_argument("--incremental", action="store_true", help="Skip events already classified with the same prompt, model and text (local fingerprint index)")
+    parser.add_argument("--changed-since", nargs="?", const="last", default=None, help="Only fetch events with updated_at after this ISO timestamp ('last' or no value: since the last complete run)")
+    parser.add_argument("--shard", default=None, help="Only process ID range i of N (e.g. 0/4), cut once per job and kept in --lease-store; run one worker per shard")
+    parser.add_argument("--lease-store", default=str(DEFAULT_LEASE_PATH), help="Store for shard ranges: SQLite file path, or 'supabase' for the backfill_ranges table")
     parser.add_argument("--limit", type=int, help="Max number of events to process (for testing)")
-    parser.add_argument("--resume", action="store_true", help="Resume from checkpoint")
+    parser.add_argument("--resume", action="store_true", help="Resume from the checkpoint and journal of --run-dir (default: latest run)")
+    parser.add_argument("--run-dir", default="", help="Run directory name under phase2/runs")
     parser.add_argument("--dry-run", action="store_true", help="Classify but don't write to Supabase")
+    parser.add_argument("--prometheus-file", type=Path, default=None, help="Also write stage timing histograms in Prometheus text format to this file")
 
     args = parser.parse_args()
+    if args.sleep is not None:
+        print("Warning: --sleep is deprecated; use --rpm", file=sys.stderr)
+        if args.rpm is None:
+            args.rpm = rpm_from_sleep(args.sleep)
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    # Per-stage wall time and token usage, recorded from every thread
+    # (see bikeclf/timing.py and bikeclf/usage.py)
+    timings = Timings()
+    activate(timings)
+    run_usage = usage.UsageMeter()
+    usage.activate(run_usage)
 
     # Load environment
     load_dotenv()
 
     # Validate model
-    if args.model not in SUPPORTED_MODELS:
-        print(f"Error: Unsupported model: {args.model}")
-        print(f"Supported models: {', '.join(SUPPORTED_MODELS)}")
-        return 1
+    for model_id in filter(None, [args.model, args.cascade_model]):
+        if model_id not in SUPPORTED_MODELS:
+            print(f"Error: Unsupported model: {model_id}")
+            print(f"Supported models: {', '.join(SUPPORTED_MODELS)}")
+            return 1
 
     # Initialize clients
     print("Initializing clients...")
@@ -347,11 +231,42 @@ def main():
         print(f"Error: {e}")
         return 1
 
-    gemini_client = Phase2GeminiClient(api_config)
+    if args.rpm is not None:
+        api_config.requests_per_minute = args.rpm
+    if args.tpm is not None:
+        api_config.tokens_per_minute = args.tpm
+    try:
+        for model_id in filter(None, [args.model, args.cascade_model]):
+            rpm, tpm = api_config.rate_budget(model_id)
+            print(f"Gemini budget for {model_id}: {rpm or 'unlimited'} RPM, {tpm or 'unlimited'} TPM")
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    controller = None
+    if args.adaptive:
+        controller = AdaptiveConcurrency(
+            initial=min(4, args.concurrency),
+            maximum=args.concurrency,
+        )
+
+    cache = open_cache(no_cache=args.no_cache, refresh=args.refresh_cache)
+    gemini_client = Phase2GeminiClient(
+        api_config,
+        concurrency_controller=controller,
+        cache=cache,
+    )
 
     supabase_url = load_env("SUPABASE_URL")
     supabase_key = load_env("SUPABASE_SERVICE_ROLE_KEY")
-    supabase_client = SupabaseClient(supabase_url, supabase_key)
+    supabase_client = SupabaseClient(
+        supabase_url,
+        supabase_key,
+        timeout=args.http_timeout,
+        http2=args.http2,
+        compress_requests=args.gzip_requests,
+    )
+    write_limiter = RateLimiter(rpm=args.write_rpm)
 
     # Load prompt
     print(f"Loading prompt: {args.prompt}")
@@ -362,13 +277,64 @@ def main():
         print(f"Error: {e}")
         return 1
 
-    # Load checkpoint if resuming
+    gemini_client.enable_context_cache(
+        system_prompt,
+        mode=args.context_cache,
+        ttl_seconds=args.context_cache_ttl,
+    )
+
+    dedup = None
+    if args.dedup:
+        dedup = Deduplicator(
+            namespace=dedup_namespace(
+                "phase2",
+                prompt_hash,
+                args.model,
+                args.temperature,
+                args.cascade_model,
+                args.cascade_threshold,
+            ),
+            cache=cache,
+            near_threshold=args.dedup_near,
+        )
+
+    fingerprints = FingerprintStore()
+    run_started = datetime.now(timezone.utc).isoformat()
+    changed_since = resolve_changed_since(fingerprints, PHASE2, args.changed_since)
+    if args.changed_since:
+        print(f"Fetching events changed since: {changed_since or 'beginning (no watermark yet)'}")
+
+    # Pick the run directory; resuming continues an existing one
+    run_dir = None
+    if args.run_dir:
+        run_dir = RUNS_ROOT / args.run_dir
+    elif args.resume:
+        run_dir = find_latest_run()
+    if run_dir is None:
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        run_dir = RUNS_ROOT / f"supabase_pipeline_{timestamp}_{args.prompt}"
+        if shard:
+            run_dir = run_dir.with_name(f"{run_dir.name}_shard{shard[0]}of{shard[1]}")
+    run_dir.mkdir(parents=True, exist_ok=True)
+
+    predictions_file = run_dir / "predictions.jsonl"
+    errors_file = run_dir / "errors.jsonl"
+    checkpoint_file = run_dir / "checkpoint.json"
+    journal_file = run_dir / JOURNAL_FILENAME
+
+    print(f"Run directory: {run_dir}\n")
+
+    # Load checkpoint and journal if resuming
     last_id = None
     total_processed = 0
     total_classified = 0
+    resumed = JournalState()
 
     if args.resume:
-        checkpoint = load_checkpoint()
+        checkpoint = load_checkpoint(checkpoint_file)
+        if checkpoint is None and LEGACY_CHECKPOINT_FILE.exists():
+            print(f"Using legacy checkpoint: {LEGACY_CHECKPOINT_FILE}")
+            checkpoint = load_checkpoint(LEGACY_CHECKPOINT_FILE)
         if checkpoint:
             last_id = checkpoint.get("last_service_request_id")
             total_processed = checkpoint.get("total_processed", 0)
@@ -376,25 +342,27 @@ def main():
             print(f"✓ Resuming from checkpoint: last_id={last_id}, processed={total_processed}")
         else:
             print("No checkpoint found, starting from beginning")
+        resumed = replay(journal_file)
+        if resumed.results or resumed.written:
+            print(
+                f"✓ Journal: {len(resumed.results)} classified but unwritten, "
+                f"{len(resumed.written)} written events will not be re-sent"
+            )
 
-    # Create run directory
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    run_dir = Path(__file__).parent.parent / "phase2" / "runs" / f"supabase_pipeline_{timestamp}_{args.prompt}"
-    run_dir.mkdir(parents=True, exist_ok=True)
-
-    predictions_file = run_dir / "predictions.jsonl"
-    errors_file = run_dir / "errors.jsonl"
-
-    print(f"Run directory: {run_dir}\n")
+    journal = Journal(journal_file)
 
     # Save config
     config = {
         "prompt_version": args.prompt,
         "prompt_hash": prompt_hash,
         "model_id": args.model,
+        "cascade_model": args.cascade_model,
+        "cascade_threshold": args.cascade_threshold if args.cascade_model else None,
         "temperature": args.temperature,
         "batch_size": args.batch_size,
         "only_unclassified": args.only_unclassified,
+        "incremental": args.incremental,
+        "changed_since": changed_since,
         "limit": args.limit,
         "dry_run": args.dry_run,
         "timestamp_utc": datetime.now(timezone.utc).isoformat(),
@@ -405,74 +373,154 @@ def main():
     all_predictions = []
     all_errors = []
     events_processed = 0
-
-    try:
-        while True:
-            # Check limit
-            if args.limit and events_processed >= args.limit:
+    events_fetched = 0
+    events_unchanged = 0
+    reached_limit = False
+
+    def fetch_page(cursor: str | None, upper_id: str | None = None) -> list[dict]:
+        # Runs in the prefetch thread
+        nonlocal events_fetched, reached_limit
+        fetch_size = args.batch_size
+        if args.limit:
+            remaining = args.limit - events_fetched
+            if remaining <= 0:
                 print(f"\n✓ Reached limit of {args.limit} events")
-                break
-
-            # Fetch batch
-            fetch_size = args.batch_size
-            if args.limit:
-                remaining = args.limit - events_processed
-                fetch_size = min(fetch_size, remaining)
-
-            print(f"\nFetching batch (size={fetch_size}, last_id={last_id})...")
-            events = fetch_events(supabase_client, fetch_size, last_id, args.only_unclassified)
+                reached_limit = True
+                return []
+            fetch_size = min(fetch_size, remaining)
 
-            if not events:
-                print("✓ No more events to process")
-                break
-
-            print(f"✓ Fetched {len(events)} events")
-
-            # Classify batch
-            print(f"Classifying batch...")
-            predictions, errors = classify_batch(
-                gemini_client,
-                system_prompt,
-                prompt_hash,
-                events,
-                args.prompt,
-                args.model,
-                args.temperature,
-                args.sleep,
+        print(f"\nFetching batch (size={fetch_size}, last_id={cursor})...")
+        events = fetch_events(
+            supabase_client, fetch_size, cursor, args.only_unclassified, changed_since, upper_id
+        )
+        if not events:
+            print("✓ No more events to process")
+        events_fetched += len(events)
+        return events
+
+    def write_batch(job: dict) -> None:
+        # Runs in the writer thread; batches arrive in fetch order, so the
+        # checkpoint only moves past events whose predictions are written.
+        nonlocal last_id, events_processed, total_processed, total_classified
+        events = job["events"]
+        predictions = job["predictions"]
+        errors = job["errors"]
+
+        # Write to Supabase
+        if predictions and not args.dry_run:
+            print(f"Writing {len(predictions)} predictions to Supabase...")
+            failed = write_predictions_to_supabase(
+                supabase_client,
+                predictions,
+                rate_limiter=write_limiter,
+                chunk_size=args.write_chunk_size,
+                rpc_function=None if args.write_upsert else args.write_rpc,
+                upsert=args.write_upsert,
             )
+            record_fingerprints(fingerprints, predictions, failed, prompt_hash, args.model)
+            failed_ids = set(failed)
+            journal.record_written(pred["id"] for pred in predictions if pred["id"] not in failed_ids)
+            print(f"✓ Wrote {len(predictions) - len(failed)}/{len(predictions)} predictions")
+        elif predictions and args.dry_run:
+            print(f"[DRY RUN] Would write {len(predictions)} predictions")
+
+        # Save predictions to JSONL (for audit trail)
+        with predictions_file.open("a", encoding="utf-8") as f:
+            for pred in predictions:
+                f.write(json.dumps(pred, ensure_ascii=False) + "\n")
+
+        # Save errors
+        if errors:
+            with errors_file.open("a", encoding="utf-8") as f:
+                for err in errors:
+                    f.write(json.dumps(err, ensure_ascii=False) + "\n")
+
+        all_predictions.extend(predictions)
+        all_errors.extend(errors)
+
+        # Update counters
+        events_processed += len(events)
+        total_processed += len(events)
+        total_classified += len(predictions)
+
+        # Save checkpoint
+        last_id = events[-1]["service_request_id"]
+        save_checkpoint(checkpoint_file, last_id, total_processed, total_classified)
+
+        print(f"\nProgress: {events_processed} events processed, {len(all_predictions)} classified, {len(all_errors)} errors")
+
+    # Each shard fetches only its own ID range instead of every row
+    lower_id = upper_id = None
+    shard_empty = False
+    if shard:
+        if args.lease_store == "supabase":
+            range_store = SupabaseLeaseStore(supabase_client)
+        else:
+            range_store = SQLiteLeaseStore(Path(args.lease_store))
+        scan_params = {"bike_related": "eq.true"}
+        if args.only_unclassified:
+            scan_params["bike_issue_category"] = "is.null"
+        shard_job = f"phase2:{args.prompt}:{args.model}:shards{shard[1]}"
+        bounds = shard_range(range_store, shard_job, shard, supabase_client, params=scan_params)
+        range_store.close()
+        if bounds:
+            lower_id, upper_id = bounds
+            print(f"Shard {shard[0]}/{shard[1]}: IDs ({lower_id}, {upper_id}]")
+        else:
+            shard_empty = True
+            print(f"Shard {shard[0]}/{shard[1]}: no rows to process")
 
-            all_predictions.extend(predictions)
-            all_errors.extend(errors)
-
-            # Write to Supabase
-            if predictions and not args.dry_run:
-                print(f"Writing {len(predictions)} predictions to Supabase...")
-                written = write_predictions_to_supabase(supabase_client, predictions, sleep_seconds=0.05)
-                print(f"✓ Wrote {written}/{len(predictions)} predictions")
-            elif predictions and args.dry_run:
-                print(f"[DRY RUN] Would write {len(predictions)} predictions")
-
-            # Save predictions to JSONL (for audit trail)
-            with predictions_file.open("a", encoding="utf-8") as f:
-                for pred in predictions:
-                    f.write(json.dumps(pred, ensure_ascii=False) + "\n")
-
-            # Save errors
-            if errors:
-                with errors_file.open("a", encoding="utf-8") as f:
-                    for err in errors:
-                        f.write(json.dumps(err, ensure_ascii=False) + "\n")
-
-            # Update counters
-            events_processed += len(events)
-            total_processed += len(events)
-            total_classified += len(predictions)
-
-            # Save checkpoint
-            last_id = events[-1]["service_request_id"]
-            save_checkpoint(last_id, total_processed, total_classified)
-
-            print(f"\nProgress: {events_processed} events processed, {len(all_predictions)} classified, {len(all_errors)} errors")
+    try:
+        pages = prefetch_pages(
+            lambda cursor: [] if shard_empty else fetch_page(cursor, upper_id=upper_id),
+            next_cursor=lambda page: page[-1]["service_request_id"],
+            cursor=last_id or lower_id,
+            depth=args.prefetch,
+        )
+        with OrderedWriter(write_batch, max_pending=args.write_queue) as writer:
+            for events in pages:
+                print(f"✓ Fetched {len(events)} events")
+
+                to_classify = events
+                if args.incremental:
+                    stale = fingerprints.stale(
+                        PHASE2,
+                        [(str(e["service_request_id"]), event_text_hash(e)) for e in to_classify],
+                        prompt_hash,
+                        args.model,
+                    )
+                    unchanged = len(to_classify) - len(stale)
+                    to_classify = [e for e in to_classify if str(e["service_request_id"]) in stale]
+                    events_unchanged += unchanged
+                    print(f"  {unchanged} unchanged since last classification")
+
+                to_classify, recovered, already_written = resumed.split(
+                    to_classify, lambda e: e["service_request_id"]
+                )
+                if recovered or already_written:
+                    print(f"  {len(recovered)} recovered from journal, {already_written} already written")
+
+                # Classify batch
+                print(f"Classifying batch...")
+                predictions, errors = classify_batch(
+                    gemini_client,
+                    system_prompt,
+                    prompt_hash,
+                    to_classify,
+                    args.prompt,
+                    args.model,
+                    args.temperature,
+                    concurrency=args.concurrency,
+                    controller=controller,
+                    reports_per_request=args.reports_per_request,
+                    cascade_model=args.cascade_model,
+                    cascade_threshold=args.cascade_threshold,
+                    dedup=dedup,
+                    on_prediction=journal.record_result,
+                )
+                predictions.extend(recovered)
+
+                writer.submit({"events": events, "predictions": predictions, "errors": errors})
 
     except KeyboardInterrupt:
         print("\n\n⚠ Interrupted by user")
@@ -483,6 +531,22 @@ def main():
         import traceback
         traceback.print_exc()
         return 1
+    else:
+        if not reached_limit and not args.dry_run and not shard:
+            # Every event updated before this run started has been seen
+            fingerprints.set_watermark(PHASE2, run_started)
+    finally:
+        timings.write_json(run_dir / "timings.json")
+        if args.prometheus_file:
+            timings.write_prometheus(args.prometheus_file, labels={"pipeline": "phase2", "run": run_dir.name})
+        usage_summary = run_usage.summary(events=events_processed)
+        write_json(usage_summary, run_dir / "usage.json")
+
+    if gemini_client.context_cache:
+        gemini_client.context_cache.close()
+    supabase_client.close()
+    fingerprints.close()
+    journal.close()
 
     # Final summary
     print("\n" + "=" * 60)
@@ -491,10 +555,21 @@ def main():
     print(f"Total events processed: {events_processed}")
     print(f"Successfully classified: {len(all_predictions)}")
     print(f"Errors: {len(all_errors)}")
+    print(f"Cost: {usage.format_cost(usage_summary)}")
+    if args.incremental:
+        print(f"Unchanged (skipped): {events_unchanged}")
     print(f"Success rate: {len(all_predictions) / max(events_processed, 1) * 100:.1f}%")
+    if dedup:
+        dedup_stats = dedup.summary()
+        print(f"Duplicates: {dedup_stats['hits']} ({dedup_stats['hit_rate']:.1%}) answered without an LLM call")
+    if cache:
+        cache_stats = cache.stats()
+        print(f"Cache hits: {cache_stats['hits']} ({cache_stats['hit_rate']:.1%})")
     print(f"\nArtifacts saved to: {run_dir}")
     print(f"  - predictions.jsonl: {len(all_predictions)} records")
     print(f"  - errors.jsonl: {len(all_errors)} records")
+    print("  - timings.json: per-stage latency percentiles")
+    print("  - usage.json: token counts and estimated cost")
 
     # Category distribution
     if all_predictions:
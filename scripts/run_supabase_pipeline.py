@@ -1,69 +1,81 @@
 """
 Run end-to-end Supabase pipeline: fetch -> prefilter -> LLM -> write-back.
 
-Supports prefilter-only mode for marking excluded categories as FALSE without LLM calls.
+Supports prefilter-only mode for marking excluded categories as FALSE without LLM calls,
+a fused mode (--fused) that also fills the Phase 2 bike_issue_* columns from the same
+LLM call, and a handoff mode (--phase2-handoff) that streams Phase 1 positives to an
+in-process Phase 2 worker.
 """
 import json
 import os
 import sys
-import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable
-from urllib import request, parse, error
+from typing import Callable, Iterable
 
 from dotenv import load_dotenv
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from bikeclf.cache import open_cache
+from bikeclf.cascade import DEFAULT_CASCADE_MODEL, DEFAULT_CASCADE_THRESHOLD, escalate
+from bikeclf.concurrency import AdaptiveConcurrency, map_concurrent
 from bikeclf.config import APIConfig
-from bikeclf.gemini_client import GeminiClient
-from bikeclf.phase1.prompt_loader import load_prompt, format_prompt
-from config.supabase_config import should_check_with_llm
+from bikeclf.context_cache import CONTEXT_CACHE_MODES
+from bikeclf.dedup import DEFAULT_NEAR_THRESHOLD, Deduplicator, dedup_namespace, text_hash
+from bikeclf.fingerprints import FingerprintStore, resolve_changed_since
+from bikeclf.gate import DEFAULT_GATE_PATH, GATE_MODEL_ID, LocalGate, gate_summary
+from bikeclf.fused import load_fused_prompt
+from bikeclf.gemini_client import FusedGeminiClient, GeminiClient
+from bikeclf.io import write_json
+from bikeclf.journal import JOURNAL_FILENAME, Journal, replay
+from bikeclf.phase1.prompt_loader import load_prompt, format_prompt, format_batch_prompt
+from bikeclf.phase2.gemini_client import Phase2GeminiClient
+from bikeclf.phase2.pipeline import PHASE2_EVENT_COLUMNS, Phase2Handoff
+from bikeclf.phase2.prompt_loader import load_prompt as load_phase2_prompt
+from bikeclf.pipeline import OrderedWriter, prefetch_pages
+from bikeclf.rate_limit import RateLimiter, rpm_from_sleep
+from bikeclf.schema import CascadeMeta, FusedClassificationOutput
+from bikeclf.shards import (
+    DEFAULT_LEASE_PATH,
+    DEFAULT_LEASE_TTL,
+    LeaseKeeper,
+    SQLiteLeaseStore,
+    SupabaseLeaseStore,
+    compute_boundaries,
+    default_owner,
+    parse_shard,
+    range_upper_params,
+    ranges_from_boundaries,
+    shard_range,
+)
+from bikeclf.supabase import (
+    DEFAULT_WRITE_CHUNK_SIZE,
+    FUSED_UPDATE_RPC,
+    PHASE1_UPDATE_RPC,
+    PHASE2_UPDATE_RPC,
+    SupabaseClient,
+    bulk_write,
+    content_range_count,
+)
+from bikeclf.timing import Timings, activate, span
+from bikeclf import usage
+from config.supabase_config import (
+    DEFINITELY_EXCLUDE,
+    postgrest_excluded_category_params,
+    postgrest_prefilter_params,
+    should_check_with_llm,
+)
 
 
 DEFAULT_BATCH_SIZE = 500
-DEFAULT_SLEEP_SECONDS = 0.1
-
-
-class SupabaseClient:
-    def __init__(self, base_url: str, api_key: str):
-        self.base_url = base_url.rstrip("/")
-        self.api_key = api_key
-
-    def request_json(
-        self,
-        method: str,
-        path: str,
-        params: dict[str, str] | None = None,
-        body: Any | None = None,
-        headers: dict[str, str] | None = None,
-    ) -> Any:
-        url = f"{self.base_url}{path}"
-        if params:
-            query = parse.urlencode(params, safe=",()")
-            url = f"{url}?{query}"
-
-        data = None
-        if body is not None:
-            data = json.dumps(body).encode("utf-8")
-
-        req = request.Request(url, data=data, method=method)
-        req.add_header("apikey", self.api_key)
-        req.add_header("Authorization", f"Bearer {self.api_key}")
-        req.add_header("Content-Type", "application/json")
-        if headers:
-            for key, value in headers.items():
-                req.add_header(key, value)
-
-        try:
-            with request.urlopen(req, timeout=60) as resp:
-                payload = resp.read().decode("utf-8")
-                return json.loads(payload) if payload else None
-        except error.HTTPError as exc:
-            detail = exc.read().decode("utf-8")
-            raise RuntimeError(f"Supabase API error: {exc.code} {detail}") from exc
+DEFAULT_CONCURRENCY = 8
+EVENT_COLUMNS = "service_request_id,title,description,service_name"
+# Phase name used in the fingerprint index
+PHASE1 = "phase1"
+# --phase2-handoff also needs the category fields Phase 2 builds its subject from
+HANDOFF_EVENT_COLUMNS = ",".join(dict.fromkeys(f"{EVENT_COLUMNS},{PHASE2_EVENT_COLUMNS}".split(",")))
 
 
 def load_env(name: str) -> str:
@@ -78,9 +90,12 @@ def fetch_events(
     batch_size: int,
     last_id: str | None,
     only_unclassified: bool,
+    columns: str = EVENT_COLUMNS,
+    changed_since: str | None = None,
+    upper_id: str | None = None,
 ) -> list[dict]:
     params = {
-        "select": "service_request_id,title,description,service_name",
+        "select": columns,
         "order": "service_request_id",
         "limit": str(batch_size),
     }
@@ -88,39 +103,47 @@ def fetch_events(
         params["service_request_id"] = f"gt.{last_id}"
     if only_unclassified:
         params["bike_related"] = "is.null"
+    if changed_since:
+        params["updated_at"] = f"gt.{changed_since}"
+    params.update(range_upper_params(upper_id))
+    # Excluded categories and empty descriptions never leave the database
+    params.update(postgrest_prefilter_params())
 
-    return client.request_json("GET", "/rest/v1/events", params=params)
+    with span("fetch"):
+        return client.request_json("GET", "/rest/v1/events", params=params)
 
 
 def classify_batch(
-    client: GeminiClient,
+    client: GeminiClient | FusedGeminiClient,
     system_prompt: str,
     prompt_hash: str,
     events: list[dict],
     prompt_version: str,
     model: str,
     temperature: float,
-    sleep_seconds: float,
+    concurrency: int = 1,
+    controller: AdaptiveConcurrency | None = None,
+    reports_per_request: int = 1,
+    cascade_model: str | None = None,
+    cascade_threshold: float = DEFAULT_CASCADE_THRESHOLD,
+    dedup: Deduplicator | None = None,
+    on_prediction: Callable[[dict], None] | None = None,
 ) -> tuple[list[dict], list[dict]]:
-    predictions = []
-    errors = []
-    total = len(events)
-
-    for idx, event in enumerate(events, start=1):
-        messages = format_prompt(
-            system_prompt=system_prompt,
-            subject=event["subject"],
-            description=event["description"],
-        )
-
-        output, latency_ms, attempts, error_msg = client.classify_with_retry(
-            prompt=messages,
-            model_id=model,
-            temperature=temperature,
-        )
+    plan = dedup.plan(events) if dedup else None
+    if plan:
+        events = plan.unique
 
+    def to_result(
+        event: dict,
+        group_size: int,
+        output,
+        latency_ms: int,
+        attempts: int,
+        error_msg,
+        cascade: CascadeMeta | None = None,
+    ) -> tuple[dict | None, dict | None]:
         if output:
-            predictions.append(
+            return (
                 {
                     "id": event["id"],
                     "subject": event["subject"],
@@ -130,36 +153,171 @@ def classify_batch(
                         "evidence": output.evidence,
                         "reasoning": output.reasoning,
                         "confidence": output.confidence,
+                        **(
+                            {"issue": output.issue.model_dump() if output.issue else None}
+                            if isinstance(output, FusedClassificationOutput)
+                            else {}
+                        ),
                     },
                     "meta": {
-                        "model_id": model,
+                        "model_id": cascade.final_model_id if cascade else model,
                         "prompt_version": prompt_version,
                         "prompt_hash": prompt_hash,
                         "temperature": temperature,
                         "latency_ms": latency_ms,
                         "attempts": attempts,
+                        "reports_per_request": group_size,
+                        **({"cascade": cascade.model_dump()} if cascade else {}),
                         "timestamp": datetime.now().isoformat(),
                     },
-                }
+                },
+                None,
             )
+        return (
+            None,
+            {
+                "id": event["id"],
+                "error": error_msg,
+                "error_kind": error_msg.kind.value,
+                "timestamp": datetime.now().isoformat(),
+            },
+        )
+
+    def classify_group(group: list[dict]) -> list[tuple[dict | None, dict | None]]:
+        with span("prompt_format"):
+            prompts = {
+                str(event["id"]): format_prompt(
+                    system_prompt=system_prompt,
+                    subject=event["subject"],
+                    description=event["description"],
+                )
+                for event in group
+            }
+
+        if len(group) == 1:
+            results = {
+                event_id: client.classify_with_retry(
+                    prompt=prompt,
+                    model_id=model,
+                    temperature=temperature,
+                )
+                for event_id, prompt in prompts.items()
+            }
         else:
-            errors.append(
-                {
-                    "id": event["id"],
-                    "error": error_msg,
-                    "timestamp": datetime.now().isoformat(),
-                }
+            with span("prompt_format"):
+                batch_prompt = format_batch_prompt(
+                    system_prompt,
+                    [(str(e["id"]), e["subject"], e["description"]) for e in group],
+                )
+            results = client.classify_many(
+                batch_prompt, prompts, model_id=model, temperature=temperature
             )
 
-        if idx == 1 or idx % 10 == 0 or idx == total:
-            print(f"  LLM progress: {idx}/{total}")
+        cascades = {}
+        if cascade_model:
+            for event_id, result in results.items():
+                results[event_id], cascades[event_id] = escalate(
+                    client,
+                    result,
+                    prompts[event_id],
+                    primary_model_id=model,
+                    escalation_model_id=cascade_model,
+                    threshold=cascade_threshold,
+                    temperature=temperature,
+                )
 
-        time.sleep(sleep_seconds)
+        group_results = [
+            to_result(
+                event,
+                len(group),
+                *results[str(event["id"])],
+                cascade=cascades.get(str(event["id"])),
+            )
+            for event in group
+        ]
+        if on_prediction:
+            for pred, _ in group_results:
+                if pred is not None:
+                    on_prediction(pred)
+        return group_results
+
+    def report_progress(done: int, total: int) -> None:
+        if done == 1 or done % 10 == 0 or done == total:
+            print(f"  LLM progress: {done}/{total} requests")
 
+    groups = [
+        events[i : i + reports_per_request]
+        for i in range(0, len(events), max(reports_per_request, 1))
+    ]
+    grouped_results = map_concurrent(
+        classify_group,
+        groups,
+        concurrency=concurrency,
+        on_done=report_progress,
+        controller=controller,
+    )
+    results = [result for group in grouped_results for result in group]
+
+    predictions = [pred for pred, _ in results if pred is not None]
+    errors = [err for _, err in results if err is not None]
+    if plan:
+        predictions, errors = dedup.expand(plan, predictions, errors)
+        if on_prediction:
+            # Results fanned out to duplicates only exist from here on
+            classified = {str(event["id"]) for event in plan.unique}
+            for pred in predictions:
+                if str(pred["id"]) not in classified:
+                    on_prediction(pred)
     return predictions, errors
 
 
-def prediction_to_update(pred: dict) -> dict:
+def apply_gate(
+    gate: LocalGate,
+    events: list[dict],
+    prompt_version: str,
+) -> tuple[list[dict], list[dict], dict[str, str]]:
+    """Label confident events locally and route the rest to the LLM.
+
+    Returns:
+        Tuple of (gate_predictions, llm_events, audits) where audits maps
+        the IDs of confident events also sent to the LLM to the gate's label
+    """
+    decisions = gate.decide(
+        [(str(e["id"]), e["subject"], e["description"]) for e in events]
+    )
+    gate_predictions = []
+    llm_events = []
+    audits = {}
+    for event, decision in zip(events, decisions):
+        if decision.label is None or decision.audit:
+            llm_events.append(event)
+            if decision.audit:
+                audits[str(event["id"])] = decision.label
+            continue
+
+        probability = decision.probability
+        gate_predictions.append(
+            {
+                "id": event["id"],
+                "subject": event["subject"],
+                "description": event["description"],
+                "pred": {
+                    "label": decision.label,
+                    "evidence": [],
+                    "reasoning": f"gate: p(bike)={probability:.3f}",
+                    "confidence": round(max(probability, 1 - probability), 3),
+                },
+                "meta": {
+                    "model_id": GATE_MODEL_ID,
+                    "prompt_version": prompt_version,
+                    "timestamp": datetime.now().isoformat(),
+                },
+            }
+        )
+    return gate_predictions, llm_events, audits
+
+
+def prediction_to_update(pred: dict, fused: bool = False) -> dict:
     label = pred["pred"]["label"]
     if label == "true":
         bike_related = True
@@ -168,18 +326,30 @@ def prediction_to_update(pred: dict) -> dict:
     else:
         bike_related = None
 
-    return {
+    update = {
         "service_request_id": pred["id"],
         "bike_related": bike_related,
         "bike_confidence": pred["pred"]["confidence"],
         "bike_evidence": pred["pred"]["evidence"],
         "bike_reasoning": pred["pred"]["reasoning"],
     }
+    issue = pred["pred"].get("issue") if fused else None
+    if issue:
+        # Rows without an issue (not bike-related, or gate-labeled) leave the
+        # bike_issue_* columns alone instead of wiping Phase 2 results
+        update.update(
+            {
+                "bike_issue_category": issue.get("category"),
+                "bike_issue_confidence": issue.get("confidence"),
+                "bike_issue_evidence": issue.get("evidence"),
+                "bike_issue_reasoning": issue.get("reasoning"),
+            }
+        )
+    return update
 
 
-def prefilter_update(event: dict, reason: str) -> dict:
+def prefilter_update(reason: str) -> dict:
     return {
-        "service_request_id": event["id"],
         "bike_related": False,
         "bike_confidence": 1.0,
         "bike_evidence": [],
@@ -187,6 +357,47 @@ def prefilter_update(event: dict, reason: str) -> dict:
     }
 
 
+def write_prefiltered(
+    client: SupabaseClient,
+    dry_run: bool = False,
+    rate_limiter: RateLimiter | None = None,
+) -> int:
+    """Mark unclassified excluded-category rows FALSE with one server-side PATCH per category.
+
+    Rows that already have a label are left alone, so repeated runs don't
+    re-PATCH every excluded row. In dry-run mode only the matching rows are
+    counted (HEAD request). Returns the number of rows updated (or that
+    would be updated).
+    """
+    total = 0
+    for service_name in sorted(DEFINITELY_EXCLUDE):
+        params = {**postgrest_excluded_category_params(service_name), "bike_related": "is.null"}
+
+        if rate_limiter:
+            rate_limiter.acquire()
+        if dry_run:
+            response = client.request(
+                "HEAD",
+                "/rest/v1/events",
+                params=params,
+                headers={"Prefer": "count=exact"},
+            )
+        else:
+            response = client.request(
+                "PATCH",
+                "/rest/v1/events",
+                params=params,
+                body=prefilter_update(f"excluded_category: {service_name}"),
+                headers={"Prefer": "return=minimal,count=exact"},
+            )
+
+        count = content_range_count(response.headers.get("Content-Range"))
+        if count:
+            print(f"  Prefiltered {service_name}: {count}")
+        total += count
+    return total
+
+
 def write_jsonl(path: Path, rows: Iterable[dict]) -> None:
     with open(path, "a", encoding="utf-8") as handle:
         for row in rows:
@@ -194,8 +405,8 @@ def write_jsonl(path: Path, rows: Iterable[dict]) -> None:
 
 
 def save_checkpoint(path: Path, data: dict) -> None:
-    with open(path, "w", encoding="utf-8") as handle:
-        json.dump(data, handle, ensure_ascii=False, indent=2)
+    with span("checkpoint"):
+        write_json(data, path)
 
 
 def load_checkpoint(path: Path) -> dict:
@@ -205,31 +416,31 @@ def load_checkpoint(path: Path) -> dict:
         return json.load(handle)
 
 
-def patch_updates(client: SupabaseClient, rows: list[dict], sleep_seconds: float) -> int:
-    if not rows:
-        return 0
-    failures = 0
-    for row in rows:
-        event_id = row["service_request_id"]
-        payload = {k: v for k, v in row.items() if k != "service_request_id"}
-        for attempt in range(1, 4):
-            try:
-                client.request_json(
-                    "PATCH",
-                    "/rest/v1/events",
-                    params={"service_request_id": f"eq.{event_id}"},
-                    body=payload,
-                    headers={"Prefer": "return=minimal"},
-                )
-                break
-            except RuntimeError as exc:
-                if attempt == 3:
-                    failures += 1
-                    print(f"  PATCH failed for {event_id}: {exc}")
-                else:
-                    time.sleep(0.5 * attempt)
-        time.sleep(max(0.02, sleep_seconds / 5))
-    return failures
+def write_updates(
+    client: SupabaseClient,
+    rows: list[dict],
+    chunk_size: int = DEFAULT_WRITE_CHUNK_SIZE,
+    rpc_function: str | None = None,
+    rate_limiter: RateLimiter | None = None,
+    upsert: bool = False,
+    issue_rpc_function: str | None = None,
+) -> list[str]:
+    # Bulk requests need uniform columns, so fused rows with an issue and
+    # rows with bike_* columns only are written separately
+    with_issue = [row for row in rows if "bike_issue_category" in row]
+    without_issue = [row for row in rows if "bike_issue_category" not in row]
+    failed: list[str] = []
+    for group, rpc in ((without_issue, rpc_function), (with_issue, issue_rpc_function)):
+        if group:
+            failed += bulk_write(
+                client,
+                group,
+                chunk_size=chunk_size,
+                rpc_function=rpc,
+                rate_limiter=rate_limiter,
+                upsert=upsert,
+            )
+    return failed
 
 
 def main() -> None:
@@ -237,36 +448,170 @@ def main() -> None:
 
     parser = argparse.ArgumentParser(description="Run Supabase bike classification pipeline")
     parser.add_argument("--prompt", default="v006", help="Prompt version (default: v006)")
+    parser.add_argument("--fused", action="store_true", help="Also classify the Phase 2 issue category in the same call and write bike_issue_* columns")
+    parser.add_argument("--phase2-handoff", action="store_true", help="Categorize TRUE events with Phase 2 in a concurrent in-process worker")
+    parser.add_argument("--phase2-prompt", default="v001", help="Phase 2 prompt version used with --fused or --phase2-handoff (default: v001)")
+    parser.add_argument("--phase2-model", default=None, help="Model ID for --phase2-handoff (default: --model)")
     parser.add_argument("--model", default="gemini-2.5-flash-lite", help="Model ID")
     parser.add_argument("--temperature", type=float, default=0.0, help="Sampling temperature")
     parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per fetch")
-    parser.add_argument("--sleep", type=float, default=DEFAULT_SLEEP_SECONDS, help="Sleep between LLM calls")
+    parser.add_argument("--rpm", type=int, default=None, help="Gemini requests per minute budget per model (default: GEMINI_RPM or the model's GEMINI_TIER quota; 0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=None, help="Gemini tokens per minute budget per model (default: GEMINI_TPM or the model's GEMINI_TIER quota; 0 = unlimited)")
+    parser.add_argument("--sleep", type=float, default=None, help="Deprecated: use --rpm. Seconds between Gemini requests, applied as an RPM budget of 60/SLEEP")
+    parser.add_argument("--http-timeout", type=float, default=60.0, help="Supabase request timeout in seconds")
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2 for Supabase requests (requires httpx[http2])")
+    parser.add_argument("--gzip-requests", action="store_true", help="Gzip-compress Supabase request bodies")
+    parser.add_argument("--write-chunk-size", type=int, default=DEFAULT_WRITE_CHUNK_SIZE, help="Rows per bulk write request")
+    parser.add_argument("--write-rpc", default=None, help=f"Bulk-update RPC function for write-back (default: {PHASE1_UPDATE_RPC}; with --fused, for rows with an issue category, default: {FUSED_UPDATE_RPC}); rows are PATCHed when the function is not installed")
+    parser.add_argument("--write-upsert", action="store_true", help="Write with an INSERT-based upsert (on_conflict merge) instead of updates; rows must satisfy every NOT NULL column and missing IDs are inserted")
+    parser.add_argument("--write-rpm", type=int, default=0, help="Supabase write requests per minute (0 = unlimited)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Max LLM requests in flight")
+    parser.add_argument("--reports-per-request", type=int, default=1, help="Reports packed into one LLM request (batched mode when > 1)")
+    parser.add_argument("--cascade-model", nargs="?", const=DEFAULT_CASCADE_MODEL, default=None, help=f"Re-query uncertain/low-confidence results on this model (default: {DEFAULT_CASCADE_MODEL})")
+    parser.add_argument("--cascade-threshold", type=float, default=DEFAULT_CASCADE_THRESHOLD, help="Escalate results with confidence below this value")
+    parser.add_argument("--dedup", action="store_true", help="Classify identical reports (normalized subject + description) once and share the result")
+    parser.add_argument("--dedup-near", type=float, nargs="?", const=DEFAULT_NEAR_THRESHOLD, default=None, help=f"With --dedup, also share results between near-duplicates (MinHash Jaccard >= value, default: {DEFAULT_NEAR_THRESHOLD})")
+    parser.add_argument("--adaptive", action="store_true", help="Adapt concurrency (AIMD) to 429/503 responses, up to --concurrency")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the persistent response cache")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-query the model and overwrite cached responses")
+    parser.add_argument("--context-cache", choices=CONTEXT_CACHE_MODES, default="off", help="Send the system prompt once as cached content or system instruction")
+    parser.add_argument("--context-cache-ttl", type=int, default=3600, help="TTL (seconds) for cached system prompt content")
+    parser.add_argument("--prefetch", type=int, default=1, help="Pages fetched ahead while the current page is classified")
+    parser.add_argument("--write-queue", type=int, default=2, help="Classified batches queued for the background writer")
+    parser.add_argument("--gate", nargs="?", const=str(DEFAULT_GATE_PATH), default=None, help="Label confident events with the local gate model (see scripts/train_gate.py)")
+    parser.add_argument("--gate-negative-threshold", type=float, default=0.05, help="Gate labels FALSE at or below this P(bike)")
+    parser.add_argument("--gate-positive-threshold", type=float, default=0.95, help="Gate labels TRUE at or above this P(bike)")
+    parser.add_argument("--gate-audit-rate", type=float, default=0.05, help="Share of gate-labeled events also sent to the LLM to measure agreement")
+    parser.add_argument("--incremental", action="store_true", help="Skip events already classified with the same prompt, model and text (local fingerprint index)")
+    parser.add_argument("--changed-since", nargs="?", const="last", default=None, help="Only fetch events with updated_at after this ISO timestamp ('last' or no value: since the last complete run)")
     parser.add_argument("--only-unclassified", action="store_true", help="Only process rows with bike_related IS NULL")
-    parser.add_argument("--write-prefiltered", action="store_true", help="Write excluded categories as FALSE")
-    parser.add_argument("--prefilter-only", action="store_true", help="Only write excluded categories as FALSE (no LLM)")
+    parser.add_argument("--write-prefiltered", action="store_true", help="Write unclassified excluded-category rows as FALSE (server-side, one PATCH per category)")
+    parser.add_argument("--prefilter-only", action="store_true", help="Only write unclassified excluded-category rows as FALSE (no LLM)")
+    parser.add_argument("--shard", default=None, help="Only process ID range i of N (e.g. 0/4), cut once per job and kept in --lease-store; run one worker per shard")
+    parser.add_argument("--lease-ranges", type=int, default=0, help="Split the backfill into N ID ranges that workers claim via leases (0 = off)")
+    parser.add_argument("--lease-store", default=str(DEFAULT_LEASE_PATH), help="Store for leased and shard ranges: SQLite file path, or 'supabase' for the backfill_ranges table")
+    parser.add_argument("--lease-job", default=None, help="Name of the leased or sharded backfill (default: derived from prompt and model)")
+    parser.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL, help="Seconds before an unrenewed lease can be claimed by another worker")
     parser.add_argument("--dry-run", action="store_true", help="Skip Supabase updates")
     parser.add_argument("--run-dir", default="", help="Optional run directory name")
     parser.add_argument("--max-batches", type=int, default=0, help="Stop after N batches (0 = no limit)")
+    parser.add_argument("--prometheus-file", type=Path, default=None, help="Also write stage timing histograms in Prometheus text format to this file")
 
     args = parser.parse_args()
+    if args.sleep is not None:
+        print("Warning: --sleep is deprecated; use --rpm", file=sys.stderr)
+        if args.rpm is None:
+            args.rpm = rpm_from_sleep(args.sleep)
+    if args.fused and args.phase2_handoff:
+        parser.error("--fused and --phase2-handoff are mutually exclusive")
+    if args.write_rpc and args.write_upsert:
+        parser.error("--write-rpc and --write-upsert are mutually exclusive")
+    write_rpc = issue_write_rpc = None
+    if not args.write_upsert:
+        # With --fused, rows without an issue only carry the Phase 1 columns
+        write_rpc = PHASE1_UPDATE_RPC if args.fused else args.write_rpc or PHASE1_UPDATE_RPC
+        issue_write_rpc = args.write_rpc or FUSED_UPDATE_RPC
+    if args.shard and args.lease_ranges:
+        parser.error("--shard and --lease-ranges are mutually exclusive")
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    # Per-stage wall time and token usage, recorded from every thread
+    # (see bikeclf/timing.py and bikeclf/usage.py)
+    timings = Timings()
+    activate(timings)
+    run_usage = usage.UsageMeter()
+    usage.activate(run_usage)
 
     load_dotenv(Path(__file__).resolve().parent.parent / ".env")
     supabase_url = load_env("SUPABASE_URL")
     supabase_key = load_env("SUPABASE_SERVICE_ROLE_KEY")
 
-    client = SupabaseClient(supabase_url, supabase_key)
+    client = SupabaseClient(
+        supabase_url,
+        supabase_key,
+        timeout=args.http_timeout,
+        http2=args.http2,
+        compress_requests=args.gzip_requests,
+    )
+    write_limiter = RateLimiter(rpm=args.write_rpm)
 
     gemini_client = None
+    gate = None
+    phase2_client = None
+    phase2_system_prompt = ""
+    phase2_prompt_hash = ""
+    prompt_version = f"{args.prompt}+{args.phase2_prompt}" if args.fused else args.prompt
+    controller = None
+    cache = None
     system_prompt = ""
     prompt_hash = ""
     if not args.prefilter_only:
         api_config = APIConfig()
         api_config.validate_required()
-        gemini_client = GeminiClient(config=api_config)
-        system_prompt, prompt_hash = load_prompt(args.prompt)
+        if args.rpm is not None:
+            api_config.requests_per_minute = args.rpm
+        if args.tpm is not None:
+            api_config.tokens_per_minute = args.tpm
+        for model_id in filter(None, [args.model, args.phase2_model if args.phase2_handoff else None]):
+            try:
+                rpm, tpm = api_config.rate_budget(model_id)
+            except ValueError as exc:
+                parser.error(str(exc))
+            print(f"Gemini budget for {model_id}: {rpm or 'unlimited'} RPM, {tpm or 'unlimited'} TPM")
+        if args.adaptive:
+            controller = AdaptiveConcurrency(
+                initial=min(4, args.concurrency),
+                maximum=args.concurrency,
+            )
+        cache = open_cache(no_cache=args.no_cache, refresh=args.refresh_cache)
+        client_class = FusedGeminiClient if args.fused else GeminiClient
+        gemini_client = client_class(
+            config=api_config,
+            concurrency_controller=controller,
+            cache=cache,
+        )
+        if args.fused:
+            system_prompt, prompt_hash = load_fused_prompt(args.prompt, args.phase2_prompt)
+        else:
+            system_prompt, prompt_hash = load_prompt(args.prompt)
+        if args.gate:
+            gate = LocalGate.load(
+                Path(args.gate),
+                negative_threshold=args.gate_negative_threshold,
+                positive_threshold=args.gate_positive_threshold,
+                audit_rate=args.gate_audit_rate,
+            )
+        gemini_client.enable_context_cache(
+            system_prompt,
+            mode=args.context_cache,
+            ttl_seconds=args.context_cache_ttl,
+        )
+        if args.phase2_handoff:
+            # Shares the Gemini rate budget and AIMD controller with Phase 1
+            phase2_client = Phase2GeminiClient(
+                config=api_config,
+                rate_limiter=gemini_client.rate_limiter,
+                concurrency_controller=controller,
+                cache=cache,
+            )
+            phase2_system_prompt, phase2_prompt_hash = load_phase2_prompt(args.phase2_prompt)
+            phase2_client.enable_context_cache(
+                phase2_system_prompt,
+                mode=args.context_cache,
+                ttl_seconds=args.context_cache_ttl,
+            )
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     run_name = args.run_dir or f"supabase_pipeline_{timestamp}_{args.prompt}"
+    if shard and not args.run_dir:
+        run_name += f"_shard{shard[0]}of{shard[1]}"
+    elif args.lease_ranges and not args.run_dir:
+        run_name += f"_worker{os.getpid()}"
     run_dir = Path("runs") / run_name
     run_dir.mkdir(parents=True, exist_ok=True)
 
@@ -274,8 +619,70 @@ def main() -> None:
     errors_path = run_dir / "errors.jsonl"
     checkpoint_path = run_dir / "checkpoint.json"
 
+    dedup = None
+    if args.dedup and gemini_client:
+        dedup = Deduplicator(
+            namespace=dedup_namespace(
+                "phase1",
+                prompt_hash,
+                args.model,
+                args.temperature,
+                args.cascade_model,
+                args.cascade_threshold,
+            ),
+            cache=cache,
+            near_threshold=args.dedup_near,
+        )
+
+    fingerprints = FingerprintStore()
+    run_started = datetime.now().astimezone().isoformat()
+    changed_since = resolve_changed_since(fingerprints, PHASE1, args.changed_since)
+    if args.changed_since:
+        print(f"Fetching events changed since: {changed_since or 'beginning (no watermark yet)'}")
+
+    handoff = None
+    if phase2_client:
+        phase2_model = args.phase2_model or args.model
+        handoff = Phase2Handoff(
+            client=phase2_client,
+            supabase_client=client,
+            system_prompt=phase2_system_prompt,
+            prompt_hash=phase2_prompt_hash,
+            prompt_version=args.phase2_prompt,
+            model=phase2_model,
+            run_dir=run_dir,
+            temperature=args.temperature,
+            concurrency=args.concurrency,
+            controller=controller,
+            dry_run=args.dry_run,
+            rate_limiter=write_limiter,
+            chunk_size=args.write_chunk_size,
+            rpc_function=None if args.write_upsert else PHASE2_UPDATE_RPC,
+            upsert=args.write_upsert,
+            dedup=Deduplicator(
+                namespace=dedup_namespace("phase2", phase2_prompt_hash, phase2_model, args.temperature),
+                cache=cache,
+                near_threshold=args.dedup_near,
+            )
+            if args.dedup
+            else None,
+            fingerprints=fingerprints,
+            incremental=args.incremental,
+        )
+
     checkpoint = load_checkpoint(checkpoint_path)
     last_id = checkpoint.get("last_id")
+
+    # Results classified or written after the last checkpoint survive in the
+    # journal; resuming reuses them instead of calling the LLM again
+    journal_path = run_dir / JOURNAL_FILENAME
+    resumed = replay(journal_path)
+    if resumed.results or resumed.written:
+        print(
+            f"Journal: {len(resumed.results)} classified but unwritten, "
+            f"{len(resumed.written)} written events will not be re-sent"
+        )
+    journal = Journal(journal_path)
     stats = checkpoint.get(
         "stats",
         {
@@ -285,73 +692,26 @@ def main() -> None:
             "classified": 0,
             "updated": 0,
             "errors": 0,
+            "unchanged": 0,
+            "gate_seen": 0,
+            "gate_skipped": 0,
+            "gate_audited": 0,
+            "gate_agreed": 0,
         },
     )
 
-    while True:
-        if args.max_batches and stats.get("batches", 0) >= args.max_batches:
-            print(f"Reached max batches limit: {args.max_batches}")
-            break
-
-        batch = fetch_events(
-            client=client,
-            batch_size=args.batch_size,
-            last_id=last_id,
-            only_unclassified=args.only_unclassified,
-        )
-        if not batch:
-            break
-
-        print(f"\nFetched batch: {len(batch)} rows (last_id={batch[-1]['service_request_id']})")
-
-        last_id = batch[-1]["service_request_id"]
-        stats["fetched"] += len(batch)
-
-        to_check = []
-        prefilter_rows = []
-        for row in batch:
-            should_check, reason = should_check_with_llm(
-                row.get("service_name", ""),
-                row.get("description", ""),
-            )
-            if should_check:
-                if not args.prefilter_only:
-                    to_check.append(
-                        {
-                            "id": row["service_request_id"],
-                            "subject": row.get("title", ""),
-                            "description": row.get("description", ""),
-                            "service_name": row.get("service_name", ""),
-                        }
-                    )
-            else:
-                if args.write_prefiltered and reason.startswith("excluded_category"):
-                    prefilter_rows.append(prefilter_update(
-                        {
-                            "id": row["service_request_id"],
-                        },
-                        reason,
-                    ))
-                    stats["prefiltered"] += 1
-
-        if args.prefilter_only:
-            predictions = []
-            errors = []
-        else:
-            predictions, errors = classify_batch(
-                client=gemini_client,
-                system_prompt=system_prompt,
-                prompt_hash=prompt_hash,
-                events=to_check,
-                prompt_version=args.prompt,
-                model=args.model,
-                temperature=args.temperature,
-                sleep_seconds=args.sleep,
-            )
-        print(
-            f"Batch done: to_check={len(to_check)} predictions={len(predictions)} "
-            f"errors={len(errors)} prefiltered={len(prefilter_rows)}"
-        )
+    def write_batch(job: dict) -> None:
+        # Runs in the writer thread; batches arrive in fetch order, so the
+        # checkpoint only moves past rows that are fully written.
+        nonlocal last_id
+        if "release" in job:
+            # All batches of the leased range before this marker are written
+            keeper.release(job["release"], done=job["done"])
+            print(f"Released range {job['release'].range_id}" + (" (done)" if job["done"] else ""))
+            return
+        predictions = job["predictions"]
+        errors = job["errors"]
+        updates = job["updates"]
 
         if predictions:
             write_jsonl(predictions_path, predictions)
@@ -359,16 +719,44 @@ def main() -> None:
             write_jsonl(errors_path, errors)
             stats["errors"] += len(errors)
 
-        updates = [prediction_to_update(pred) for pred in predictions]
-        updates.extend(prefilter_rows)
-
         if not args.dry_run:
-            update_failures = patch_updates(client, updates, args.sleep)
-            stats["errors"] += update_failures
+            failed = set(
+                write_updates(
+                    client,
+                    updates,
+                    chunk_size=args.write_chunk_size,
+                    rpc_function=write_rpc,
+                    rate_limiter=write_limiter,
+                    upsert=args.write_upsert,
+                    issue_rpc_function=issue_write_rpc,
+                )
+            )
+            stats["errors"] += len(failed)
+            journal.record_written(
+                update["service_request_id"] for update in updates if update["service_request_id"] not in failed
+            )
+            fingerprints.record(
+                PHASE1,
+                [
+                    (pred["id"], text_hash(pred["subject"], pred["description"]))
+                    for pred in predictions
+                    if pred["id"] not in failed
+                    # Gate labels are not LLM output; keep them eligible for the model
+                    and pred.get("meta", {}).get("model_id") != GATE_MODEL_ID
+                ],
+                prompt_hash,
+                args.model,
+            )
 
+        stats["fetched"] += job["fetched"]
+        stats["unchanged"] = stats.get("unchanged", 0) + job["unchanged"]
+        stats["recovered"] = stats.get("recovered", 0) + job["recovered"]
+        for key, value in job["gate"].items():
+            stats[f"gate_{key}"] = stats.get(f"gate_{key}", 0) + value
         stats["classified"] += len(predictions)
         stats["updated"] += len(updates)
         stats["batches"] = stats.get("batches", 0) + 1
+        last_id = job["last_id"]
 
         save_checkpoint(
             checkpoint_path,
@@ -377,24 +765,283 @@ def main() -> None:
                 "stats": stats,
             },
         )
+        if job["lease"] is not None:
+            keeper.progress(job["lease"], last_id)
+
+    # The prefilter PATCHes the whole table, so only one shard runs it
+    if (args.write_prefiltered or args.prefilter_only) and not (shard and shard[0] != 0):
+        print("Prefilter pass: marking excluded categories as FALSE" + (" (dry run)" if args.dry_run else ""))
+        with span("prefilter"):
+            stats["prefiltered"] += write_prefiltered(
+                client,
+                dry_run=args.dry_run,
+                rate_limiter=write_limiter,
+            )
+
+    lease_store = None
+    keeper = None
+    shard_bounds = None
+    lease_job = args.lease_job or f"phase1:{prompt_version}:{args.model}"
+    if (args.lease_ranges or shard) and not args.prefilter_only:
+        if args.lease_store == "supabase":
+            range_store = SupabaseLeaseStore(client)
+        else:
+            range_store = SQLiteLeaseStore(Path(args.lease_store))
+        scan_params = postgrest_prefilter_params()
+        if args.only_unclassified:
+            scan_params["bike_related"] = "is.null"
+        if shard:
+            # Each shard fetches only its own ID range instead of every row
+            shard_job = f"{lease_job}:shards{shard[1]}"
+            shard_bounds = shard_range(range_store, shard_job, shard, client, params=scan_params)
+            range_store.close()
+            if shard_bounds:
+                print(f"Shard {shard[0]}/{shard[1]}: IDs ({shard_bounds[0]}, {shard_bounds[1]}]")
+            else:
+                print(f"Shard {shard[0]}/{shard[1]}: no rows to process")
+        else:
+            lease_store = range_store
+            if not lease_store.has_ranges(lease_job):
+                boundaries = compute_boundaries(client, args.lease_ranges, params=scan_params)
+                lease_store.create_ranges(lease_job, ranges_from_boundaries(boundaries))
+            keeper = LeaseKeeper(lease_store, ttl=args.lease_ttl)
+            print(f"Lease job: {lease_job}")
+
+    reached_limit = False
+    remaining_batches = None
+    if args.max_batches:
+        remaining_batches = max(args.max_batches - stats.get("batches", 0), 0)
+
+    def fetch_page(cursor: str | None, upper_id: str | None = None) -> list[dict]:
+        nonlocal remaining_batches, reached_limit
+        if args.prefilter_only:
+            return []
+        if remaining_batches is not None:
+            if remaining_batches == 0:
+                print(f"Reached max batches limit: {args.max_batches}")
+                reached_limit = True
+                return []
+            remaining_batches -= 1
+        return fetch_events(
+            client=client,
+            batch_size=args.batch_size,
+            last_id=cursor,
+            only_unclassified=args.only_unclassified,
+            columns=HANDOFF_EVENT_COLUMNS if handoff else EVENT_COLUMNS,
+            changed_since=changed_since,
+            upper_id=upper_id,
+        )
+
+    def leased_pages():
+        # Claims ranges until none are left; yields (lease, page) for every
+        # page of a range and (lease, None) once the range is exhausted
+        owner = default_owner()
+        while not reached_limit:
+            lease = lease_store.claim(lease_job, owner, args.lease_ttl)
+            if lease is None:
+                print("No unclaimed ranges left")
+                return
+            keeper.hold(lease)
+            print(f"\nClaimed range {lease.range_id}: ({lease.lo}, {lease.hi}] from {lease.cursor}")
+            for page in prefetch_pages(
+                lambda cursor: [] if lease.lost else fetch_page(cursor, upper_id=lease.hi),
+                next_cursor=lambda page: page[-1]["service_request_id"],
+                cursor=lease.cursor,
+                depth=args.prefetch,
+            ):
+                yield lease, page
+            yield lease, None
+
+    if lease_store:
+        pages = leased_pages()
+    elif shard and shard_bounds is None:
+        pages = iter(())
+    else:
+        lower_id, upper_id = shard_bounds or (None, None)
+        pages = (
+            (None, page)
+            for page in prefetch_pages(
+                lambda cursor: fetch_page(cursor, upper_id=upper_id),
+                next_cursor=lambda page: page[-1]["service_request_id"],
+                cursor=last_id or lower_id,
+                depth=args.prefetch,
+            )
+        )
+
+    with OrderedWriter(write_batch, max_pending=args.write_queue) as writer:
+        for lease, batch in pages:
+            if batch is None:
+                writer.submit({"release": lease, "done": not (reached_limit or lease.lost)})
+                continue
+            print(f"\nFetched batch: {len(batch)} rows (last_id={batch[-1]['service_request_id']})")
+
+            # The server already dropped excluded categories; this only
+            # catches rows PostgREST can't filter (whitespace-only text)
+            to_check = []
+            with span("prefilter"):
+                for row in batch:
+                    should_check, _ = should_check_with_llm(
+                        row.get("service_name", ""),
+                        row.get("description", ""),
+                    )
+                    if should_check:
+                        to_check.append(
+                            {
+                                "id": row["service_request_id"],
+                                "subject": row.get("title", ""),
+                                "description": row.get("description", ""),
+                                "service_name": row.get("service_name", ""),
+                            }
+                        )
+
+            unchanged = 0
+            if args.incremental:
+                stale = fingerprints.stale(
+                    PHASE1,
+                    [(str(e["id"]), text_hash(e["subject"], e["description"])) for e in to_check],
+                    prompt_hash,
+                    args.model,
+                )
+                unchanged = len(to_check) - len(stale)
+                to_check = [e for e in to_check if str(e["id"]) in stale]
+
+            to_check, recovered, already_written = resumed.split(to_check, lambda e: e["id"])
+            if recovered or already_written:
+                print(f"  {len(recovered)} recovered from journal, {already_written} already written")
+
+            gate_predictions = []
+            llm_events = to_check
+            audits = {}
+            if gate:
+                gate_predictions, llm_events, audits = apply_gate(gate, to_check, prompt_version)
+
+            predictions, errors = classify_batch(
+                client=gemini_client,
+                system_prompt=system_prompt,
+                prompt_hash=prompt_hash,
+                events=llm_events,
+                prompt_version=prompt_version,
+                model=args.model,
+                temperature=args.temperature,
+                concurrency=args.concurrency,
+                controller=controller,
+                reports_per_request=args.reports_per_request,
+                cascade_model=args.cascade_model,
+                cascade_threshold=args.cascade_threshold,
+                dedup=dedup,
+                on_prediction=journal.record_result,
+            )
+            predictions.extend(recovered)
+            agreed = sum(
+                1
+                for pred in predictions
+                if audits.get(str(pred["id"])) == pred["pred"]["label"]
+            )
+            predictions.extend(gate_predictions)
+            if handoff:
+                positives = {str(pred["id"]) for pred in predictions if pred["pred"]["label"] == "true"}
+                handoff.submit([row for row in batch if str(row["service_request_id"]) in positives])
+            print(
+                f"Batch done: to_check={len(to_check)} predictions={len(predictions)} "
+                f"errors={len(errors)}"
+                + (f" gate_skipped={len(gate_predictions)}" if gate else "")
+                + (f" concurrency={controller.limit}" if controller else "")
+            )
+
+            updates = [prediction_to_update(pred, fused=args.fused) for pred in predictions]
+
+            writer.submit(
+                {
+                    "last_id": batch[-1]["service_request_id"],
+                    "lease": lease,
+                    "fetched": len(batch),
+                    "unchanged": unchanged,
+                    "recovered": len(recovered),
+                    "gate": {
+                        "seen": len(to_check) if gate else 0,
+                        "skipped": len(gate_predictions),
+                        "audited": len(audits),
+                        "agreed": agreed,
+                    },
+                    "predictions": predictions,
+                    "errors": errors,
+                    "updates": updates,
+                }
+            )
+
+    phase2_stats = handoff.close() if handoff else None
+    if keeper:
+        keeper.stop()
+    if lease_store and lease_store.all_done(lease_job):
+        print(f"All ranges of {lease_job} are done")
+    # A sharded worker only sees part of the table, so only single-worker
+    # runs advance the --changed-since watermark
+    complete = not reached_limit and not shard and lease_store is None
+    if not args.prefilter_only and not args.dry_run and complete:
+        # Every event updated before this run started has been seen
+        fingerprints.set_watermark(PHASE1, run_started)
 
     save_checkpoint(
         checkpoint_path,
         {
             "last_id": last_id,
             "stats": stats,
+            **({"phase2_stats": phase2_stats} if phase2_stats else {}),
+            **({"dedup_stats": dedup.summary()} if dedup else {}),
             "completed_at": datetime.now().isoformat(),
         },
     )
+    timings.write_json(run_dir / "timings.json")
+    if args.prometheus_file:
+        timings.write_prometheus(args.prometheus_file, labels={"pipeline": "phase1", "run": run_name})
+    usage_summary = run_usage.summary(events=stats["fetched"])
+    write_json(usage_summary, run_dir / "usage.json")
+
+    if gemini_client and gemini_client.context_cache:
+        gemini_client.context_cache.close()
+    if phase2_client and phase2_client.context_cache:
+        phase2_client.context_cache.close()
+    client.close()
+    fingerprints.close()
+    journal.close()
+    if lease_store:
+        lease_store.close()
 
     print("\nPipeline complete")
-    print(f"Run directory: {run_dir}")
+    print(f"Run directory: {run_dir} (stage timings in timings.json, token usage in usage.json)")
     print(f"Batches: {stats.get('batches', 0)}")
     print(f"Fetched: {stats['fetched']}")
     print(f"Prefiltered updates: {stats['prefiltered']}")
     print(f"Classified: {stats['classified']}")
     print(f"Updated: {stats['updated']}")
     print(f"Errors: {stats['errors']}")
+    print(f"Cost: {usage.format_cost(usage_summary)}")
+    if args.incremental:
+        print(f"Unchanged (skipped): {stats.get('unchanged', 0)}")
+    if dedup:
+        dedup_stats = dedup.summary()
+        print(
+            f"Duplicates: {dedup_stats['hits']}/{dedup_stats['seen']} ({dedup_stats['hit_rate']:.1%}) "
+            f"answered without an LLM call (exact={dedup_stats['exact']} near={dedup_stats['near']} "
+            f"cross_run={dedup_stats['cross_run']})"
+        )
+    if phase2_stats:
+        print(
+            f"Phase 2 handoff: {phase2_stats['classified']}/{phase2_stats['submitted']} categorized, "
+            f"{phase2_stats['written']} written, {phase2_stats['errors']} errors"
+        )
+    if gate:
+        counts = {key: stats.get(f"gate_{key}", 0) for key in ("seen", "skipped", "audited", "agreed")}
+        summary = gate_summary(**counts)
+        agreement = summary["agreement"]
+        print(
+            f"Gate: skipped {counts['skipped']}/{counts['seen']} "
+            f"({summary['skip_rate']:.1%}), LLM agreement "
+            + (f"{agreement:.1%} on {counts['audited']} audits" if agreement is not None else "n/a (no audits)")
+        )
+    if cache:
+        cache_stats = cache.stats()
+        print(f"Cache hits: {cache_stats['hits']} ({cache_stats['hit_rate']:.1%})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+"""
+Train the local first-stage gate from accumulated LLM predictions.
+
+This script:
+1. Collects true/false labels from runs/**/predictions.jsonl
+2. Reports held-out skip rate and accuracy at the chosen thresholds
+3. Fits the TF-IDF + logistic regression gate on all labels and saves it
+
+Use the saved model with: run_supabase_pipeline.py --gate [path]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from sklearn.model_selection import train_test_split
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bikeclf.config import RUNS_DIR
+from bikeclf.gate import DEFAULT_GATE_PATH, LocalGate, load_training_examples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Train the local classifier gate")
+    parser.add_argument("predictions", nargs="*", help="predictions.jsonl files (default: runs/**/predictions.jsonl)")
+    parser.add_argument("--out", default=str(DEFAULT_GATE_PATH), help="Where to save the model")
+    parser.add_argument("--negative-threshold", type=float, default=0.05, help="Evaluate FALSE labels at or below this P(bike)")
+    parser.add_argument("--positive-threshold", type=float, default=0.95, help="Evaluate TRUE labels at or above this P(bike)")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Held-out share for the evaluation")
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.predictions] or sorted(RUNS_DIR.glob("**/predictions.jsonl"))
+    texts, labels = load_training_examples(paths)
+    print(f"Loaded {len(texts)} labeled events from {len(paths)} files")
+    if len(set(labels)) < 2:
+        print("Error: need both true and false labels to train the gate")
+        return 1
+
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=args.test_size, random_state=42, stratify=labels
+    )
+    gate = LocalGate(
+        negative_threshold=args.negative_threshold,
+        positive_threshold=args.positive_threshold,
+    ).fit(train_texts, train_labels)
+
+    gated = [
+        (gate.label_for(p), label)
+        for p, label in zip(gate.predict_proba(test_texts), test_labels)
+    ]
+    confident = [(pred, label) for pred, label in gated if pred is not None]
+    correct = sum(1 for pred, label in confident if (pred == "true") == label)
+    print(f"Held-out skip rate: {len(confident)}/{len(gated)} ({len(confident) / max(len(gated), 1):.1%})")
+    if confident:
+        print(f"Held-out accuracy on skipped events: {correct / len(confident):.1%}")
+
+    gate.fit(texts, labels).save(Path(args.out))
+    print(f"Saved gate model to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
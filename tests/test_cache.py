@@ -0,0 +1,94 @@
+"""Tests for the persistent response cache."""
+import hashlib
+import json
+
+from bikeclf.cache import ResponseCache, canonical_json, make_cache_key
+from bikeclf.schema import FusedBatchClassificationOutput
+
+
+def test_cache_key_depends_on_every_request_field():
+    """Test key changes when any part of the request changes."""
+    base = ("gemini-2.5-flash-lite", "prompt", 0.0, 512, {"type": "object"})
+    key = make_cache_key(*base)
+
+    assert key == make_cache_key(*base)
+    assert key != make_cache_key("gemini-2.5-flash", *base[1:])
+    assert key != make_cache_key(base[0], "prompt!", *base[2:])
+    assert key != make_cache_key(*base[:2], 0.2, *base[3:])
+    assert key != make_cache_key(*base[:3], 256, base[4])
+    assert key != make_cache_key(*base[:4], {"type": "array"})
+
+
+def test_cache_key_with_preserialized_schema_matches_existing_keys():
+    """Test splicing a precomputed schema keeps keys of existing cache files."""
+    schema = FusedBatchClassificationOutput.model_json_schema()
+    request = {
+        "model_id": "gemini-2.5-flash",
+        "prompt": "Glasscherben auf dem Radweg \"Höhe\" Brücke\n",
+        "temperature": 0.7,
+        "max_tokens": 5120,
+        "response_schema": schema,
+    }
+    expected = hashlib.sha256(
+        json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+    args = ("gemini-2.5-flash", request["prompt"], 0.7, 5120, schema)
+    assert make_cache_key(*args) == expected
+    assert make_cache_key(*args, schema_json=canonical_json(schema)) == expected
+
+
+def test_cache_roundtrip_and_persistence(tmp_path):
+    """Test entries survive reopening the cache file."""
+    path = tmp_path / "responses.sqlite"
+    cache = ResponseCache(path)
+    assert cache.get("k") is None
+    cache.put("k", '{"label": "true"}')
+    assert cache.get("k") == '{"label": "true"}'
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert reopened.get("k") == '{"label": "true"}'
+
+
+def test_refresh_ignores_existing_entries(tmp_path):
+    """Test refresh mode misses on reads but still writes."""
+    path = tmp_path / "responses.sqlite"
+    ResponseCache(path).put("k", "old")
+
+    refreshing = ResponseCache(path, refresh=True)
+    assert refreshing.get("k") is None
+    refreshing.put("k", "new")
+    assert ResponseCache(path).get("k") == "new"
+
+
+def test_lru_eviction(tmp_path):
+    """Test least recently used entries are evicted past the size cap."""
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_entries=10)
+    for i in range(10):
+        cache.put(f"k{i}", str(i))
+    cache.get("k0")  # Touch oldest entry so it survives eviction
+
+    cache.put("k10", "10")
+
+    assert len(cache) == 9
+    assert cache.get("k0") == "0"
+    assert cache.get("k1") is None
+
+
+def test_running_count_tracks_replacements_and_reopen(tmp_path):
+    """Test the entry count ignores replaced keys and is seeded on reopen."""
+    path = tmp_path / "responses.sqlite"
+    cache = ResponseCache(path, max_entries=10)
+    for i in range(5):
+        cache.put(f"k{i}", str(i))
+    cache.put("k0", "again")
+
+    assert len(cache) == 5
+
+    for i in range(5, 12):
+        cache.put(f"k{i}", str(i))
+    count = cache._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    assert len(cache) == count <= 10
+    assert len(ResponseCache(path, max_entries=10)) == count
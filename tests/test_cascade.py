@@ -0,0 +1,73 @@
+"""Tests for the flash-lite -> flash model cascade."""
+from bikeclf.cascade import escalate, needs_escalation, summarize_cascade
+from bikeclf.schema import ClassificationOutput
+from tests.test_gemini_client import make_client, output_json
+
+PRIMARY = "gemini-2.5-flash-lite"
+ESCALATION = "gemini-2.5-flash"
+
+
+def make_output(label="true", confidence=0.9):
+    return ClassificationOutput(label=label, evidence=[], reasoning="Test.", confidence=confidence)
+
+
+def test_needs_escalation_for_uncertain_or_low_confidence():
+    """Test escalation triggers on the uncertain label or low confidence."""
+    assert needs_escalation(make_output("uncertain", 0.95), threshold=0.7)
+    assert needs_escalation(make_output("true", 0.5), threshold=0.7)
+    assert not needs_escalation(make_output("false", 0.8), threshold=0.7)
+
+
+def test_confident_result_is_not_escalated():
+    """Test confident primary results skip the second model."""
+    client = make_client([])
+    result, meta = escalate(client, (make_output(), 100, 1, None), "prompt", PRIMARY, ESCALATION)
+
+    assert result[0].label == "true"
+    assert not meta.escalated
+    assert meta.final_model_id == PRIMARY
+    assert client.client.models.calls == []
+
+
+def test_uncertain_result_is_requeried_on_escalation_model():
+    """Test escalated results come from the larger model with both stages recorded."""
+    client = make_client([output_json("false")])
+    (output, latency, attempts, error), meta = escalate(
+        client, (make_output("uncertain"), 100, 1, None), "prompt", PRIMARY, ESCALATION
+    )
+
+    assert output.label == "false"
+    assert attempts == 2
+    assert error is None
+    assert client.client.models.calls[0]["model"] == ESCALATION
+    assert meta.escalated
+    assert meta.primary_pred["label"] == "uncertain"
+    assert meta.escalation_pred["label"] == "false"
+    assert meta.final_model_id == ESCALATION
+
+
+def test_failed_escalation_keeps_primary_result():
+    """Test the primary output survives when the escalation call fails."""
+    client = make_client(['{"label": "maybe"}', '{"label": "maybe"}'])
+    (output, _, _, error), meta = escalate(
+        client, (make_output("uncertain"), 100, 1, None), "prompt", PRIMARY, ESCALATION
+    )
+
+    assert output.label == "uncertain"
+    assert error is None
+    assert meta.escalation_error.startswith("Validation error")
+    assert meta.final_model_id == PRIMARY
+
+
+def test_summarize_cascade_counts_calls_per_model():
+    """Test summary reports escalation rate and calls per model."""
+    client = make_client([output_json("false")])
+    _, kept = escalate(client, (make_output(), 100, 1, None), "p", PRIMARY, ESCALATION)
+    _, escalated = escalate(client, (make_output("uncertain"), 100, 1, None), "p", PRIMARY, ESCALATION)
+
+    summary = summarize_cascade([kept, escalated])
+
+    assert summary["escalated"] == 1
+    assert summary["escalation_rate"] == 0.5
+    assert summary["calls_per_model"] == {PRIMARY: 2, ESCALATION: 1}
+    assert summary["primary_latency_ms"] == 200
@@ -0,0 +1,113 @@
+"""Tests for bounded-concurrency helpers."""
+import contextvars
+import threading
+import time
+from bikeclf.concurrency import AdaptiveConcurrency, backoff_delay, map_concurrent
+
+
+def test_results_preserve_input_order():
+    """Test results align with inputs even when later items finish first."""
+    items = [0.05, 0.0, 0.03, 0.01]
+
+    def work(delay):
+        time.sleep(delay)
+        return delay
+
+    assert map_concurrent(work, items, concurrency=4) == items
+
+
+def test_concurrency_is_bounded():
+    """Test no more than `concurrency` calls run at once."""
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def work(item):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+        return item
+
+    map_concurrent(work, list(range(20)), concurrency=3)
+    assert 1 < state["peak"] <= 3
+
+
+def test_progress_callback_and_empty_input():
+    """Test progress callback sees every completion and empty input is a no-op."""
+    seen = []
+    map_concurrent(lambda x: x, [1, 2, 3], concurrency=2, on_done=lambda d, t: seen.append((d, t)))
+    assert seen == [(1, 3), (2, 3), (3, 3)]
+    assert map_concurrent(lambda x: x, [], concurrency=4) == []
+
+
+def test_workers_inherit_caller_context():
+    """Test worker threads see context variables set by the caller (tracing spans)."""
+    current_span = contextvars.ContextVar("current_span", default=None)
+
+    def work(item):
+        parent = current_span.get()
+        current_span.set(f"child-{item}")  # Must not leak into other items
+        return parent
+
+    token = current_span.set("eval")
+    try:
+        assert map_concurrent(work, list(range(6)), concurrency=3) == ["eval"] * 6
+    finally:
+        current_span.reset(token)
+
+
+def test_adaptive_concurrency_aimd():
+    """Test additive increase on success and multiplicative decrease on throttle."""
+    controller = AdaptiveConcurrency(initial=4, maximum=8, cooldown=0.0)
+
+    # ~+1 per round of `limit` successes
+    for _ in range(6):
+        controller.record_success()
+    assert controller.limit == 5
+
+    controller.record_throttle()
+    assert controller.limit == 2
+
+    for _ in range(100):
+        controller.record_throttle()
+    assert controller.limit == 1
+
+
+def test_adaptive_concurrency_cooldown_and_cap():
+    """Test throttles within the cooldown only halve once and limit is capped."""
+    controller = AdaptiveConcurrency(initial=8, maximum=8, cooldown=60.0)
+    controller.record_throttle()
+    controller.record_throttle()
+    assert controller.limit == 4
+
+    for _ in range(200):
+        controller.record_success()
+    assert controller.limit == 8
+
+
+def test_map_concurrent_respects_controller_limit():
+    """Test the live controller limit bounds in-flight calls."""
+    controller = AdaptiveConcurrency(initial=2, maximum=2)
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def work(item):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+        return item
+
+    assert map_concurrent(work, list(range(10)), concurrency=8, controller=controller) == list(range(10))
+    assert state["peak"] <= 2
+
+
+def test_backoff_delay_is_bounded():
+    """Test jittered backoff stays within the exponential envelope."""
+    for attempt in range(1, 8):
+        delay = backoff_delay(attempt, base=0.5, cap=4.0)
+        assert 0.0 <= delay <= min(4.0, 0.5 * 2 ** (attempt - 1))
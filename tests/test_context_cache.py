@@ -0,0 +1,108 @@
+"""Tests for system prompt context caching against a fake Gemini backend."""
+import json
+from types import SimpleNamespace
+from bikeclf.config import APIConfig
+from bikeclf.gemini_client import GeminiClient
+from bikeclf.phase1.prompt_loader import format_prompt
+
+SYSTEM_PROMPT = "Du bist ein Klassifikator für Radverkehrsmeldungen."
+RESPONSE = json.dumps({"label": "false", "evidence": [], "reasoning": "Test.", "confidence": 0.8})
+
+
+class FakeCaches:
+    """Fake ``client.caches`` recording create/update/delete calls."""
+
+    def __init__(self, fail_create=False):
+        self.fail_create = fail_create
+        self.created = []
+        self.updated = []
+        self.deleted = []
+
+    def create(self, model, config):
+        if self.fail_create:
+            raise RuntimeError("400 INVALID_ARGUMENT: content too small for caching")
+        self.created.append({"model": model, "config": config})
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    def update(self, name, config):
+        self.updated.append({"name": name, "config": config})
+        return SimpleNamespace(name=name)
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+class FakeModels:
+    """Fake ``client.models`` recording generate_content requests."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, model, contents, config):
+        self.calls.append({"model": model, "contents": contents, "config": config})
+        return SimpleNamespace(text=RESPONSE)
+
+
+def make_client(mode, fail_create=False):
+    client = GeminiClient(APIConfig(api_key="test-key", requests_per_minute=0, tokens_per_minute=0))
+    client.client = SimpleNamespace(caches=FakeCaches(fail_create), models=FakeModels())
+    client.enable_context_cache(SYSTEM_PROMPT, mode=mode, ttl_seconds=600)
+    return client
+
+
+def test_cached_content_handle_is_created_once_and_reused():
+    """Test every request references the same cached content handle."""
+    client = make_client("cached")
+
+    for i in range(3):
+        prompt = format_prompt(SYSTEM_PROMPT, f"Betreff {i}", f"Beschreibung {i}")
+        output, _, _, error = client.classify_with_retry(prompt, "gemini-2.5-flash")
+        assert error is None and output.label == "false"
+
+    fake = client.client
+    assert len(fake.caches.created) == 1
+    assert fake.caches.created[0]["config"]["system_instruction"] == SYSTEM_PROMPT
+    for call in fake.models.calls:
+        assert call["config"]["cached_content"] == "cachedContents/1"
+        assert SYSTEM_PROMPT not in call["contents"]
+        assert call["contents"].startswith("**Betreff:**")
+
+
+def test_cached_content_ttl_is_refreshed_before_expiry():
+    """Test the TTL is extended once the handle is close to expiring."""
+    client = make_client("cached")
+    prompt = format_prompt(SYSTEM_PROMPT, "Betreff", "Beschreibung")
+    client.classify(prompt, "gemini-2.5-flash")
+
+    handle = client.context_cache._handles["gemini-2.5-flash"]
+    handle.expires_at -= 500  # Only 100s of 600s left
+    client.classify(prompt + " ", "gemini-2.5-flash")
+
+    assert len(client.client.caches.created) == 1
+    assert client.client.caches.updated == [{"name": "cachedContents/1", "config": {"ttl": "600s"}}]
+
+    client.context_cache.close()
+    assert client.client.caches.deleted == ["cachedContents/1"]
+
+
+def test_falls_back_to_system_instruction():
+    """Test instruction mode, and cached mode when creation fails."""
+    for client in (make_client("instruction"), make_client("cached", fail_create=True)):
+        prompt = format_prompt(SYSTEM_PROMPT, "Betreff", "Beschreibung")
+        client.classify(prompt, "gemini-2.5-flash")
+        client.classify(prompt + " ", "gemini-2.5-flash")
+
+        for call in client.client.models.calls:
+            assert call["config"]["system_instruction"] == SYSTEM_PROMPT
+            assert "cached_content" not in call["config"]
+        assert client.client.caches.created == []
+
+
+def test_prompts_without_system_prefix_are_sent_unchanged():
+    """Test prompts not built from the registered system prompt pass through."""
+    client = make_client("cached")
+    client.classify("Some other prompt", "gemini-2.5-flash")
+
+    call = client.client.models.calls[0]
+    assert call["contents"] == "Some other prompt"
+    assert "cached_content" not in call["config"]
@@ -0,0 +1,117 @@
+"""Tests for report deduplication."""
+from bikeclf.cache import ResponseCache
+from bikeclf.dedup import Deduplicator, MinHashLSH, normalize_text, text_hash
+
+
+def make_event(event_id, subject, description):
+    return {"id": event_id, "subject": subject, "description": description}
+
+
+def fake_classify(events):
+    """Stand-in for classify_batch: one prediction per event, 'e' fails."""
+    predictions = [
+        {
+            "id": e["id"],
+            "subject": e["subject"],
+            "description": e["description"],
+            "pred": {"label": "true", "confidence": 0.9},
+            "meta": {"model_id": "test", "latency_ms": 100, "attempts": 1},
+        }
+        for e in events
+        if e["id"] != "e"
+    ]
+    errors = [{"id": e["id"], "error": "boom"} for e in events if e["id"] == "e"]
+    return predictions, errors
+
+
+def test_normalize_text_strips_id_prefix_case_and_whitespace():
+    """Test ticket prefixes, case and whitespace don't affect the hash."""
+    assert normalize_text("#1-2025 Defekte  Oberfläche", " Loch\tim Radweg ") == (
+        "defekte oberfläche\nloch im radweg"
+    )
+    assert text_hash("#1-2025 Ampel", "Kaputt") == text_hash("#99-2026 ampel", "kaputt ")
+
+
+def test_exact_duplicates_share_one_llm_result():
+    """Test duplicates in a batch are classified once and fanned out."""
+    dedup = Deduplicator(namespace="test")
+    events = [
+        make_event("a", "#1-2025 Ampel", "Ampel defekt"),
+        make_event("b", "#2-2025 Ampel", "ampel  defekt"),
+        make_event("c", "Laterne", "Licht aus"),
+    ]
+
+    plan = dedup.plan(events)
+    assert [e["id"] for e in plan.unique] == ["a", "c"]
+
+    predictions, errors = dedup.expand(plan, *fake_classify(plan.unique))
+    assert [p["id"] for p in predictions] == ["a", "b", "c"]
+    assert errors == []
+    assert predictions[1]["subject"] == "#2-2025 Ampel"
+    assert predictions[1]["meta"]["dedup"] == {"kind": "exact", "source_id": "a"}
+    assert predictions[1]["meta"]["latency_ms"] == 0
+    assert dedup.summary()["hit_rate"] == 1 / 3
+
+
+def test_results_are_reused_across_batches_and_runs(tmp_path):
+    """Test later batches and later runs reuse stored results via the cache."""
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    first = Deduplicator(namespace="test", cache=cache)
+    plan = first.plan([make_event("a", "Ampel", "Ampel defekt")])
+    first.expand(plan, *fake_classify(plan.unique))
+
+    plan = first.plan([make_event("b", "Ampel", "Ampel defekt")])
+    assert plan.unique == []
+    assert first.stats["exact"] == 1
+
+    second = Deduplicator(namespace="test", cache=cache)
+    plan = second.plan([make_event("c", "#5-2026 Ampel", "Ampel defekt")])
+    predictions, _ = second.expand(plan, [], [])
+    assert plan.unique == []
+    assert predictions[0]["id"] == "c"
+    assert predictions[0]["meta"]["dedup"] == {"kind": "cross_run", "source_id": "a"}
+    assert cache.stats()["hits"] == 0  # Dedup lookups don't count as LLM cache hits
+
+    other = Deduplicator(namespace="other-prompt", cache=cache)
+    assert len(other.plan([make_event("d", "Ampel", "Ampel defekt")]).unique) == 1
+
+
+def test_errors_are_copied_to_duplicates():
+    """Test duplicates of a failed event fail too (and are not remembered)."""
+    dedup = Deduplicator(namespace="test")
+    plan = dedup.plan([make_event("e", "Ampel", "defekt"), make_event("f", "Ampel", "defekt")])
+
+    predictions, errors = dedup.expand(plan, *fake_classify(plan.unique))
+
+    assert predictions == []
+    assert [e["id"] for e in errors] == ["e", "f"]
+    assert len(dedup.plan([make_event("g", "Ampel", "defekt")]).unique) == 1
+
+
+def test_near_duplicates_match_above_threshold():
+    """Test MinHash matching finds reworded copies but not unrelated text."""
+    lsh = MinHashLSH(threshold=0.7)
+    base = normalize_text("Defekte Oberfläche", "Radweg sehr verengt Unfall gefahr Bitte stadt grün beauftragen")
+    lsh.insert("base", lsh.signature(base))
+
+    similar = normalize_text("Defekte Oberfläche", "Radweg sehr verengt, Unfall gefahr. Bitte Stadt grün beauftragen")
+    unrelated = normalize_text("Leuchtmittel defekt", "Straße schon seit Wochen im Dunklen")
+    assert lsh.query(lsh.signature(similar)) == "base"
+    assert lsh.query(lsh.signature(unrelated)) is None
+
+
+def test_near_duplicate_mode_fans_out_results():
+    """Test near-duplicates in one batch share the representative's result."""
+    dedup = Deduplicator(namespace="test", near_threshold=0.7)
+    plan = dedup.plan(
+        [
+            make_event("a", "Defekte Oberfläche", "Radweg sehr verengt Unfall gefahr Bitte stadt grün beauftragen"),
+            make_event("b", "Defekte Oberfläche", "Radweg sehr verengt, Unfall gefahr! Bitte stadt grün beauftragen"),
+        ]
+    )
+
+    predictions, _ = dedup.expand(plan, *fake_classify(plan.unique))
+
+    assert [e["id"] for e in plan.unique] == ["a"]
+    assert predictions[1]["meta"]["dedup"] == {"kind": "near", "source_id": "a"}
+    assert dedup.stats["near"] == 1
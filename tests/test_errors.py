@@ -0,0 +1,34 @@
+"""Tests for Gemini error classification."""
+import json
+from google.genai import errors as genai_errors
+from bikeclf.errors import ErrorKind, LLMError, classify_exception
+
+
+def _api_error(cls, code, status):
+    return cls(code, {"error": {"code": code, "status": status, "message": status}})
+
+
+def test_classify_exception_by_status_code():
+    """Test SDK errors map to quota/server/timeout/api kinds."""
+    assert classify_exception(_api_error(genai_errors.ClientError, 429, "RESOURCE_EXHAUSTED")) == ErrorKind.QUOTA
+    assert classify_exception(_api_error(genai_errors.ServerError, 503, "UNAVAILABLE")) == ErrorKind.SERVER
+    assert classify_exception(_api_error(genai_errors.ServerError, 504, "DEADLINE_EXCEEDED")) == ErrorKind.TIMEOUT
+    assert classify_exception(_api_error(genai_errors.ClientError, 400, "INVALID_ARGUMENT")) == ErrorKind.API
+
+
+def test_classify_exception_timeouts_and_unknown():
+    """Test socket timeouts and arbitrary exceptions."""
+    assert classify_exception(TimeoutError("read timed out")) == ErrorKind.TIMEOUT
+    assert classify_exception(RuntimeError("boom")) == ErrorKind.API
+
+
+def test_llm_error_behaves_like_str():
+    """Test LLMError keeps legacy message format and serializes as a string."""
+    err = LLMError(ErrorKind.QUOTA, "429 RESOURCE_EXHAUSTED")
+    assert err == "Rate limit error: 429 RESOURCE_EXHAUSTED"
+    assert err.kind == ErrorKind.QUOTA
+    assert err.is_transient
+    assert json.loads(json.dumps({"error": err}))["error"] == str(err)
+
+    assert LLMError(ErrorKind.VALIDATION, "bad").startswith("Validation error")
+    assert not LLMError(ErrorKind.VALIDATION, "bad").is_transient
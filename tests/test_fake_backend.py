@@ -0,0 +1,86 @@
+"""Tests for the simulated Gemini backend."""
+import pytest
+
+from bikeclf.backends import create_backend
+from bikeclf.config import APIConfig
+from bikeclf.errors import ErrorKind
+from bikeclf.fake_backend import FakeBackend, FakeBackendConfig, LatencyModel
+from bikeclf.gemini_client import GeminiClient
+from bikeclf.phase1.prompt_loader import format_batch_prompt
+from bikeclf.phase2.gemini_client import Phase2GeminiClient
+
+MODEL = "gemini-2.5-flash-lite"
+
+
+def make_client(spec="", client_class=GeminiClient):
+    backend = FakeBackend(FakeBackendConfig.parse(f"latency=fixed:0,{spec}"))
+    config = APIConfig(api_key="", backend="fake", backoff_base_seconds=0.0)
+    return client_class(config, backend=backend), backend
+
+
+def test_config_parsing_and_validation():
+    """Test settings parse into typed values and unknown keys are rejected."""
+    config = FakeBackendConfig.parse("latency=uniform:10:20,throttle_every=50,malformed_rate=0.1,seed=3")
+    assert config.latency == LatencyModel("uniform", (10.0, 20.0))
+    assert (config.throttle_every, config.malformed_rate, config.seed) == (50, 0.1, 3)
+    with pytest.raises(ValueError):
+        FakeBackendConfig.parse("latency=gauss:1")
+    with pytest.raises(ValueError):
+        FakeBackendConfig.parse("speed=fast")
+
+
+def test_answers_are_valid_and_deterministic():
+    """Test the same prompt gets the same schema-valid answer on a fresh backend."""
+    first, _ = make_client(client_class=Phase2GeminiClient)
+    second, _ = make_client(client_class=Phase2GeminiClient)
+
+    a = first.classify_with_retry("Schlagloch im Radweg", MODEL)
+    b = second.classify_with_retry("Schlagloch im Radweg", MODEL)
+
+    assert a[0] is not None and a[2] == 1
+    assert a[0] == b[0]
+
+
+def test_throttle_bursts_are_retried():
+    """Test simulated 429 bursts surface as quota errors the client retries."""
+    client, backend = make_client("throttle_every=3,throttle_burst=1")
+
+    results = [client.classify_with_retry(f"prompt {i}", MODEL) for i in range(3)]
+
+    # Requests 0 and 1 succeed, request 2 is throttled and retried as request 3
+    assert [attempts for _, _, attempts, _ in results] == [1, 1, 2]
+    assert all(output is not None for output, *_ in results)
+    assert backend.stats == {"requests": 4, "throttled": 1, "malformed": 0, "invalid": 0}
+
+
+def test_malformed_and_invalid_responses_fail_validation():
+    """Test injected faults are reported as validation errors after the repair retry."""
+    for spec in ("malformed_rate=1.0", "invalid_rate=1.0"):
+        client, backend = make_client(spec)
+        output, _, attempts, error = client.classify_with_retry("prompt", MODEL)
+        assert output is None
+        assert error.kind == ErrorKind.VALIDATION
+        assert attempts == 2
+        assert backend.stats["malformed"] + backend.stats["invalid"] == 2
+
+
+def test_batch_requests_answer_every_report():
+    """Test multi-report prompts get one result per report ID."""
+    client, backend = make_client()
+    prompts = {"a": "prompt a", "b": "prompt b"}
+    batch_prompt = format_batch_prompt("System", [("a", "S", "D"), ("b", "S", "D")])
+
+    results = client.classify_many(batch_prompt, prompts, MODEL)
+
+    assert all(output is not None for output, *_ in results.values())
+    assert backend.stats["requests"] == 1
+
+
+def test_config_selects_fake_backend_without_api_key():
+    """Test BIKECLF_BACKEND=fake needs no credentials."""
+    config = APIConfig(api_key="", backend="fake", fake_backend="seed=7")
+    config.validate_required()
+    backend = create_backend(config)
+    assert isinstance(backend, FakeBackend) and backend.config.seed == 7
+    with pytest.raises(ValueError):
+        create_backend(APIConfig(api_key="", backend="other"))
@@ -0,0 +1,45 @@
+"""Tests for the incremental-classification fingerprint index."""
+from bikeclf.fingerprints import FingerprintStore, resolve_changed_since
+
+
+def test_stale_detects_new_edited_and_reprompted_events(tmp_path):
+    """Test only events with a different fingerprint are reclassified."""
+    store = FingerprintStore(tmp_path / "fp.sqlite")
+    store.record("phase1", [("1", "h1"), ("2", "h2")], "prompt-a", "model-x")
+
+    events = [("1", "h1"), ("2", "h2-edited"), ("3", "h3")]
+    assert store.stale("phase1", events, "prompt-a", "model-x") == {"2", "3"}
+    assert store.stale("phase1", events, "prompt-b", "model-x") == {"1", "2", "3"}
+    assert store.stale("phase1", events, "prompt-a", "model-y") == {"1", "2", "3"}
+    assert store.stale("phase2", events, "prompt-a", "model-x") == {"1", "2", "3"}
+
+
+def test_record_overwrites_previous_fingerprint(tmp_path):
+    """Test re-recording an event replaces its fingerprint."""
+    store = FingerprintStore(tmp_path / "fp.sqlite")
+    store.record("phase1", [("1", "h1")], "prompt-a", "model-x")
+    store.record("phase1", [("1", "h1")], "prompt-b", "model-x")
+
+    assert len(store) == 1
+    assert store.stale("phase1", [("1", "h1")], "prompt-b", "model-x") == set()
+
+
+def test_stale_handles_more_ids_than_one_query(tmp_path):
+    """Test lookups are chunked below SQLite's parameter limit."""
+    store = FingerprintStore(tmp_path / "fp.sqlite")
+    events = [(str(i), "h") for i in range(1500)]
+    store.record("phase1", events[:1200], "p", "m")
+
+    assert store.stale("phase1", events, "p", "m") == {str(i) for i in range(1200, 1500)}
+
+
+def test_watermarks_resolve_for_changed_since(tmp_path):
+    """Test 'last' resolves to the stored watermark per phase."""
+    store = FingerprintStore(tmp_path / "fp.sqlite")
+    assert resolve_changed_since(store, "phase1", "last") is None
+
+    store.set_watermark("phase1", "2026-10-01T00:00:00+00:00")
+    assert resolve_changed_since(store, "phase1", "last") == "2026-10-01T00:00:00+00:00"
+    assert resolve_changed_since(store, "phase2", "last") is None
+    assert resolve_changed_since(store, "phase1", "2026-09-01") == "2026-09-01T00:00:00"
+    assert resolve_changed_since(store, "phase1", None) is None
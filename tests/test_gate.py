@@ -0,0 +1,108 @@
+"""Tests for the local first-stage classifier gate."""
+import json
+
+import pytest
+
+from bikeclf.gate import GATE_MODEL_ID, LocalGate, gate_summary, load_training_examples
+
+BIKE_TEXTS = [
+    "Radweg\nDer Radweg ist voller Scherben",
+    "Radweg\nSchlagloch auf dem Radweg",
+    "Fahrrad\nRadfahrer müssen auf die Straße ausweichen",
+    "Radweg\nRadweg zugeparkt von Autos",
+    "Radweg\nGlasscherben auf dem Fahrradweg",
+    "Fahrrad\nRadwegmarkierung fehlt",
+]
+OTHER_TEXTS = [
+    "Container\nAltkleidercontainer ist voll",
+    "Müll\nSperrmüll auf dem Gehweg abgestellt",
+    "Graffiti\nGraffiti an der Hauswand",
+    "Container\nGlascontainer überfüllt",
+    "Müll\nMüllsäcke am Straßenrand",
+    "Graffiti\nSchmiererei an der Brücke",
+]
+
+
+def trained_gate(**kwargs):
+    texts = BIKE_TEXTS + OTHER_TEXTS
+    labels = [True] * len(BIKE_TEXTS) + [False] * len(OTHER_TEXTS)
+    return LocalGate(**kwargs).fit(texts, labels)
+
+
+def test_load_training_examples_skips_uncertain_and_gate_labels(tmp_path):
+    """Test only LLM true/false labels are used, last occurrence winning."""
+    path = tmp_path / "predictions.jsonl"
+    rows = [
+        {"id": 1, "subject": "Radweg", "description": "a", "pred": {"label": "false"}},
+        {"id": 1, "subject": "Radweg", "description": "a", "pred": {"label": "true"}},
+        {"id": 2, "subject": "x", "description": "b", "pred": {"label": "uncertain"}},
+        {
+            "id": 3,
+            "subject": "x",
+            "description": "c",
+            "pred": {"label": "false"},
+            "meta": {"model_id": GATE_MODEL_ID},
+        },
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n", encoding="utf-8")
+
+    texts, labels = load_training_examples([path])
+
+    assert texts == ["Radweg\na"]
+    assert labels == [True]
+
+
+def test_gate_labels_confident_events_and_defers_the_rest():
+    """Test thresholds map probabilities to labels or to the LLM."""
+    gate = LocalGate(negative_threshold=0.2, positive_threshold=0.8)
+
+    assert gate.label_for(0.1) == "false"
+    assert gate.label_for(0.5) is None
+    assert gate.label_for(0.9) == "true"
+
+
+def test_gate_separates_training_classes():
+    """Test a fitted gate scores bike texts above unrelated ones."""
+    gate = trained_gate()
+    bike, other = gate.predict_proba(
+        ["Radweg\nScherben auf dem Radweg", "Container\nAltkleidercontainer voll"]
+    )
+
+    assert bike > 0.5 > other
+
+
+def test_gate_audit_selection_is_deterministic():
+    """Test audit picks are stable per ID and close to the configured rate."""
+    gate = LocalGate(audit_rate=0.1)
+    picks = [gate.should_audit(str(i)) for i in range(5000)]
+
+    assert picks == [gate.should_audit(str(i)) for i in range(5000)]
+    assert 0.07 < sum(picks) / len(picks) < 0.13
+    assert not LocalGate(audit_rate=0.0).should_audit("1")
+
+
+def test_gate_save_and_load_roundtrip(tmp_path):
+    """Test a saved gate reproduces its probabilities."""
+    gate = trained_gate()
+    path = tmp_path / "gate.pkl"
+    gate.save(path)
+
+    loaded = LocalGate.load(path, negative_threshold=0.1, positive_threshold=0.9)
+
+    assert loaded.predict_proba(BIKE_TEXTS) == gate.predict_proba(BIKE_TEXTS)
+    assert loaded.negative_threshold == 0.1
+
+
+def test_gate_rejects_inverted_thresholds():
+    """Test negative threshold must be below positive threshold."""
+    with pytest.raises(ValueError):
+        LocalGate(negative_threshold=0.9, positive_threshold=0.1)
+
+
+def test_gate_summary():
+    """Test skip rate and agreement computation."""
+    assert gate_summary(seen=10, skipped=4, audited=2, agreed=1) == {
+        "skip_rate": 0.4,
+        "agreement": 0.5,
+    }
+    assert gate_summary(seen=0, skipped=0, audited=0, agreed=0)["agreement"] is None
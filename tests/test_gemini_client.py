@@ -0,0 +1,141 @@
+"""Tests for the Gemini client wrappers using a stubbed SDK client."""
+import json
+from types import SimpleNamespace
+from google.genai import errors as genai_errors
+from bikeclf.config import APIConfig
+from bikeclf.errors import ErrorKind
+from bikeclf.gemini_client import FusedGeminiClient, GeminiClient
+from bikeclf.schema import FusedClassificationOutput
+
+
+class StubModels:
+    """Stand-in for ``genai.Client().models`` returning queued responses."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def generate_content(self, model, contents, config):
+        self.calls.append({"model": model, "contents": contents, "config": config})
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return SimpleNamespace(text=response)
+
+
+def make_client(responses, client_class=GeminiClient, **config_overrides):
+    config_overrides = {"requests_per_minute": 0, "tokens_per_minute": 0, **config_overrides}
+    config = APIConfig(api_key="test-key", backoff_base_seconds=0.0, **config_overrides)
+    client = client_class(config)
+    client.client = SimpleNamespace(models=StubModels(responses))
+    return client
+
+
+def output_json(label="true", **extra):
+    return json.dumps(
+        {"label": label, "evidence": [], "reasoning": "Test.", "confidence": 0.9, **extra}
+    )
+
+
+def test_transient_errors_are_retried_with_backoff():
+    """Test 429 responses are retried and reported as attempts."""
+    quota = genai_errors.ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}})
+    client = make_client([quota, quota, output_json()])
+
+    output, _, attempts, error = client.classify_with_retry("prompt", "gemini-2.5-flash-lite")
+
+    assert output.label == "true"
+    assert attempts == 3
+    assert error is None
+
+
+def test_validation_error_uses_repair_prompt_once():
+    """Test invalid JSON triggers exactly one repair retry."""
+    client = make_client(['{"label": "maybe"}', '{"label": "maybe"}'])
+
+    output, _, attempts, error = client.classify_with_retry("prompt", "gemini-2.5-flash-lite")
+
+    assert output is None
+    assert attempts == 2
+    assert error.kind == ErrorKind.VALIDATION
+    assert "IMPORTANT" in client.client.models.calls[1]["contents"]
+
+
+def test_classify_many_splits_batch_and_retries_missing_items():
+    """Test batched results are mapped by ID and missing IDs fall back."""
+    batch = json.dumps(
+        {
+            "results": [
+                json.loads(output_json("false", id="B")),
+                json.loads(output_json("true", id="A")),
+                json.loads(output_json("true", id="unknown")),
+            ]
+        }
+    )
+    client = make_client([batch, output_json("uncertain")])
+
+    results = client.classify_many(
+        "batch prompt",
+        {"A": "prompt A", "B": "prompt B", "C": "prompt C"},
+        "gemini-2.5-flash-lite",
+    )
+
+    assert results["A"][0].label == "true"
+    assert results["B"][0].label == "false"
+    assert results["C"][0].label == "uncertain"
+
+    calls = client.client.models.calls
+    assert len(calls) == 2
+    assert calls[0]["config"]["max_output_tokens"] == 512 * 3
+    assert calls[1]["contents"] == "prompt C"
+
+
+def test_fused_client_returns_issue_for_bike_related_reports():
+    """Test fused output carries the Phase 2 category only for label 'true'."""
+    issue = {
+        "category": "Oberflächenqualität / Schäden",
+        "evidence": ["Schlagloch"],
+        "reasoning": "Test.",
+        "confidence": 0.8,
+    }
+    client = make_client(
+        [output_json("true", issue=issue), output_json("false", issue=issue)],
+        client_class=FusedGeminiClient,
+    )
+
+    bike, _, _, _ = client.classify_with_retry("prompt", "gemini-2.5-flash-lite")
+    other, _, _, _ = client.classify_with_retry("prompt2", "gemini-2.5-flash-lite")
+
+    assert bike.issue.category == "Oberflächenqualität / Schäden"
+    assert other.issue is None
+    schema = client.client.models.calls[0]["config"]["response_json_schema"]
+    assert "issue" in schema["properties"]
+
+
+def test_output_schema_is_built_once_and_batch_items_are_narrowed(monkeypatch):
+    """Test the schema is reused across requests and batch items equal single outputs."""
+    issue = {"category": "Oberflächenqualität / Schäden", "evidence": ["x" * 250], "reasoning": "Test.", "confidence": 0.8}
+    item = json.loads(output_json("true", evidence=["y" * 250], issue=issue))
+    client = make_client(
+        [json.dumps({"results": [{**item, "id": 7}]}), output_json(), output_json()],
+        client_class=FusedGeminiClient,
+    )
+    built = []
+    original = FusedClassificationOutput.model_json_schema.__func__
+    monkeypatch.setattr(
+        FusedClassificationOutput,
+        "model_json_schema",
+        classmethod(lambda cls, *args, **kwargs: built.append(cls) or original(cls, *args, **kwargs)),
+    )
+
+    results = client.classify_many("batch prompt", {"7": "prompt 7"}, "gemini-2.5-flash-lite")
+    client.classify("prompt", "gemini-2.5-flash-lite")
+    client.classify("prompt", "gemini-2.5-flash-lite")
+
+    assert built == [FusedClassificationOutput]
+    calls = client.client.models.calls
+    assert calls[1]["config"]["response_json_schema"] is calls[2]["config"]["response_json_schema"]
+    output = results["7"][0]
+    assert type(output) is FusedClassificationOutput
+    assert output == FusedClassificationOutput.model_validate(item)
+    assert len(output.evidence[0]) == 200 and len(output.issue.evidence[0]) == 200
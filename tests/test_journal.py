@@ -0,0 +1,77 @@
+"""Tests for the per-event journal and atomic JSON writes."""
+import json
+
+from bikeclf.io import write_json
+from bikeclf.journal import Journal, replay
+
+
+def make_prediction(event_id, label="true"):
+    return {"id": event_id, "pred": {"label": label}, "meta": {}}
+
+
+def test_replay_recovers_unwritten_results_and_written_ids(tmp_path):
+    """Test written IDs are skipped and unwritten results are reused."""
+    path = tmp_path / "journal.jsonl"
+    with Journal(path, fsync_every=2) as journal:
+        journal.record_result(make_prediction("1"))
+        journal.record_result(make_prediction("2", "false"))
+        journal.record_written(["1"])
+        journal.record_written(["3"])  # Written from a gate prediction
+
+    state = replay(path)
+
+    assert state.written == {"1", "3"}
+    assert state.results == {"2": make_prediction("2", "false")}
+
+    events = [{"id": "1"}, {"id": "2"}, {"id": "3"}, {"id": "4"}]
+    pending, recovered, skipped = state.split(events, lambda e: e["id"])
+    assert pending == [{"id": "4"}]
+    assert recovered == [make_prediction("2", "false")]
+    assert skipped == 2
+
+
+def test_replay_ignores_truncated_last_line(tmp_path):
+    """Test a crash mid-append doesn't break resume."""
+    path = tmp_path / "journal.jsonl"
+    with Journal(path) as journal:
+        journal.record_result(make_prediction("1"))
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write('{"type": "result", "id": "2", "predic')
+
+    assert set(replay(path).results) == {"1"}
+
+
+def test_reopening_repairs_the_tail_before_appending(tmp_path):
+    """Test a partial last line is dropped and a lost newline restored."""
+    path = tmp_path / "journal.jsonl"
+    with Journal(path) as journal:
+        journal.record_result(make_prediction("1"))
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write('{"type": "result", "id": "2", "predic')
+
+    with Journal(path) as journal:
+        journal.record_written(["1"])
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["type"] for line in lines] == ["result", "written"]
+
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(json.dumps({"type": "written", "ids": ["2"]}))
+    with Journal(path) as journal:
+        journal.record_written(["3"])
+    assert replay(path).written == {"1", "2", "3"}
+
+
+def test_replay_of_missing_journal_is_empty(tmp_path):
+    """Test fresh runs start with an empty state."""
+    state = replay(tmp_path / "missing.jsonl")
+    assert state.results == {} and state.written == set()
+
+
+def test_write_json_replaces_file_atomically(tmp_path):
+    """Test write_json leaves no temp files and overwrites the target."""
+    path = tmp_path / "checkpoint.json"
+    write_json({"last_id": "1"}, path)
+    write_json({"last_id": "2"}, path)
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {"last_id": "2"}
+    assert [p.name for p in tmp_path.iterdir()] == ["checkpoint.json"]
@@ -0,0 +1,147 @@
+"""Tests for the SQLite-backed PostgREST stand-in."""
+import pytest
+
+from bikeclf.local_postgrest import (
+    LocalPostgREST,
+    events_from_csv,
+    split_top_level,
+    start_background_server,
+    synthetic_events,
+)
+from bikeclf.shards import SupabaseLeaseStore, compute_boundaries, range_upper_params
+from bikeclf.supabase import SupabaseClient, bulk_write
+from config.supabase_config import (
+    DEFINITELY_EXCLUDE,
+    postgrest_excluded_category_params,
+    postgrest_prefilter_params,
+    should_check_with_llm,
+)
+
+
+@pytest.fixture
+def local_supabase(tmp_path):
+    store = LocalPostgREST(tmp_path / "local.sqlite")
+    server, url = start_background_server(store)
+    client = SupabaseClient(url, "local-key", compress_requests=True, retries=1)
+    yield store, client
+    client.close()
+    server.shutdown()
+    store.close()
+
+
+def test_split_top_level_respects_quotes_and_parentheses():
+    """Test commas inside quotes and nested lists do not split."""
+    assert split_top_level('a.is.null,b.not.in.("x,y",z),or(c.eq.1,d.eq.2)') == [
+        "a.is.null",
+        'b.not.in.("x,y",z)',
+        "or(c.eq.1,d.eq.2)",
+    ]
+
+
+def test_keyset_pagination_with_prefilter(local_supabase):
+    """Test the pipelines' fetch query pages through prefiltered rows in key order."""
+    store, client = local_supabase
+    events = list(synthetic_events(300, seed=1))
+    store.seed(events)
+    expected = sorted(
+        e["service_request_id"]
+        for e in events
+        if e["description"] and e["service_name"] not in DEFINITELY_EXCLUDE
+    )
+
+    seen, last_id = [], None
+    while True:
+        params = {"select": "service_request_id,description", "order": "service_request_id", "limit": "50"}
+        if last_id:
+            params["service_request_id"] = f"gt.{last_id}"
+        params.update(postgrest_prefilter_params())
+        rows = client.request_json("GET", "/rest/v1/events", params=params)
+        if not rows:
+            break
+        seen.extend(row["service_request_id"] for row in rows)
+        last_id = rows[-1]["service_request_id"]
+
+    assert seen == expected
+    upper = client.request_json(
+        "GET", "/rest/v1/events", params={"select": "service_request_id", **range_upper_params("syn-0000009")}
+    )
+    assert len(upper) == 10
+
+
+def test_count_offset_and_boundaries(local_supabase):
+    """Test count=exact Content-Range and offset queries used to split backfills."""
+    store, client = local_supabase
+    store.seed(synthetic_events(100))
+
+    response = client.request("HEAD", "/rest/v1/events", params={"select": "service_request_id"}, headers={"Prefer": "count=exact"})
+    assert response.headers["Content-Range"] == "0-99/100"
+    assert compute_boundaries(client, 4) == ["syn-0000024", "syn-0000049", "syn-0000074"]
+
+
+def test_bulk_upsert_rpc_and_patch(local_supabase):
+    """Test write-back merges classification columns without touching updated_at."""
+    store, client = local_supabase
+    store.seed(events_from_csv("data/supabase_test_200.csv"))
+    before = client.request_json("GET", "/rest/v1/events", params={"select": "service_request_id,updated_at", "service_request_id": "eq.1-2025"})
+
+    rows = [{"service_request_id": "1-2025", "bike_related": True, "bike_confidence": 0.9, "bike_evidence": ["Radweg"]}]
+    assert bulk_write(client, rows) == []
+    assert bulk_write(client, [{"service_request_id": "missing", "bike_related": True}]) == []
+    assert bulk_write(client, [{"service_request_id": "1-2026", "bike_issue_category": "Oberfläche"}], rpc_function="update_bike_issue_classifications") == []
+    client.request("PATCH", "/rest/v1/events", params={"service_request_id": "eq.10-2025"}, body={"bike_related": False}, headers={"Prefer": "return=minimal"})
+
+    first = client.request_json("GET", "/rest/v1/events", params={"service_request_id": "eq.1-2025"})[0]
+    assert (first["bike_related"], first["bike_evidence"], first["updated_at"]) == (True, ["Radweg"], before[0]["updated_at"])
+    classified = client.request_json("GET", "/rest/v1/events", params={"select": "service_request_id", "or": "(bike_related.is.true,bike_issue_category.not.is.null,bike_related.is.false)", "order": "service_request_id"})
+    assert [r["service_request_id"] for r in classified] == ["1-2025", "1-2026", "10-2025"]
+    assert client.request_json("GET", "/rest/v1/events", params={"service_request_id": "eq.missing"}) == []
+
+    # Editing report content bumps updated_at, like the Postgres trigger
+    client.request("PATCH", "/rest/v1/events", params={"service_request_id": "eq.1-2025"}, body={"description": "Neu"})
+    after = client.request_json("GET", "/rest/v1/events", params={"service_request_id": "eq.1-2025"})[0]
+    assert after["updated_at"] > before[0]["updated_at"]
+
+    with pytest.raises(RuntimeError, match="400"):
+        client.request_json("GET", "/rest/v1/events", params={"nope": "eq.1"})
+
+
+def test_backfill_lease_functions(local_supabase):
+    """Test the lease RPCs hand out each range once and honour ownership."""
+    _, client = local_supabase
+    store = SupabaseLeaseStore(client)
+    store.create_ranges("job", [(None, "m"), ("m", None)])
+    store.create_ranges("job", [(None, "x")])  # Ignored duplicate
+
+    first = store.claim("job", "w1", ttl=60)
+    second = store.claim("job", "w2", ttl=60)
+    assert (first.range_id, second.range_id) == (0, 1)
+    assert store.claim("job", "w3", ttl=60) is None
+
+    assert store.renew(first, ttl=60, cursor="f")
+    first.owner = "intruder"
+    assert not store.renew(first, ttl=60)
+    first.owner = "w1"
+    store.release(first, done=True)
+    store.release(second, done=True)
+    assert store.all_done("job")
+
+
+def test_excluded_category_patch_skips_blank_descriptions(local_supabase):
+    """Test the server-side prefilter labels only what the local check excludes."""
+    store, client = local_supabase
+    name = sorted(DEFINITELY_EXCLUDE)[0]
+    descriptions = {"1": "Container voll", "2": None, "3": "", "4": " \t\n ", "5": "  Scherben "}
+    store.seed(
+        {"service_request_id": event_id, "title": name, "description": description, "service_name": name}
+        for event_id, description in descriptions.items()
+    )
+
+    client.request("PATCH", "/rest/v1/events", params=postgrest_excluded_category_params(name), body={"bike_related": False})
+
+    patched = client.request_json("GET", "/rest/v1/events", params={"select": "service_request_id", "bike_related": "is.false"})
+    excluded = {
+        event_id
+        for event_id, description in descriptions.items()
+        if should_check_with_llm(name, description)[1].startswith("excluded_category")
+    }
+    assert {row["service_request_id"] for row in patched} == excluded == {"1", "5"}
@@ -0,0 +1,141 @@
+"""Tests for the in-process Phase 1 -> Phase 2 handoff."""
+import json
+
+from bikeclf.dedup import Deduplicator
+from bikeclf.journal import Journal
+from bikeclf.phase2.gemini_client import Phase2GeminiClient
+from bikeclf.phase2.pipeline import (
+    Phase2Handoff,
+    build_subject,
+    classify_batch,
+    write_predictions_to_supabase,
+)
+from tests.test_gemini_client import make_client
+from tests.test_supabase import FakeSupabase
+
+
+def category_json(category="Oberflächenqualität / Schäden"):
+    return json.dumps(
+        {"category": category, "evidence": [], "reasoning": "Test.", "confidence": 0.8}
+    )
+
+
+def make_event(event_id, description="Schlagloch auf dem Radweg"):
+    return {
+        "service_request_id": event_id,
+        "title": "Radweg",
+        "description": description,
+        "service_name": "Straßen",
+        "category": "Straßen",
+        "subcategory": "Radweg",
+        "subcategory2": "NULL",
+    }
+
+
+def test_build_subject_skips_null_subcategories():
+    """Test subject joins category fields and drops NULL placeholders."""
+    assert build_subject(make_event("1")) == "Straßen - Radweg"
+
+
+def test_handoff_classifies_and_writes_in_background(tmp_path):
+    """Test submitted events are categorized, written and logged."""
+    client = make_client([category_json(), category_json()], client_class=Phase2GeminiClient)
+    supabase = FakeSupabase()
+    handoff = Phase2Handoff(
+        client=client,
+        supabase_client=supabase,
+        system_prompt="Categorize.",
+        prompt_hash="abc",
+        prompt_version="v001",
+        model="gemini-2.5-flash-lite",
+        run_dir=tmp_path,
+    )
+
+    handoff.submit([make_event("1"), make_event("2")])
+    handoff.submit([])
+    stats = handoff.close()
+
+    assert stats == {"submitted": 2, "unchanged": 0, "recovered": 0, "classified": 2, "written": 2, "errors": 0}
+    assert {request[0] for request in supabase.requests} == {"PATCH"}
+    assert {request[2]["service_request_id"] for request in supabase.requests} == {"eq.1", "eq.2"}
+    assert supabase.requests[0][3]["bike_issue_category"] == "Oberflächenqualität / Schäden"
+    lines = (tmp_path / "phase2_predictions.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0])["subject"] == "Straßen - Radweg"
+
+
+def test_handoff_dry_run_skips_writes(tmp_path):
+    """Test dry runs classify without touching Supabase."""
+    client = make_client([category_json()], client_class=Phase2GeminiClient)
+    supabase = FakeSupabase()
+    handoff = Phase2Handoff(
+        client=client,
+        supabase_client=supabase,
+        system_prompt="Categorize.",
+        prompt_hash="abc",
+        prompt_version="v001",
+        model="gemini-2.5-flash-lite",
+        run_dir=tmp_path,
+        dry_run=True,
+    )
+
+    handoff.submit([make_event("1")])
+    stats = handoff.close()
+
+    assert supabase.requests == []
+    assert stats["classified"] == 1 and stats["written"] == 0 and stats["errors"] == 0
+
+
+def test_duplicates_are_reported_once_expanded():
+    """Test on_prediction also sees results fanned out to duplicates."""
+    client = make_client([category_json()], client_class=Phase2GeminiClient)
+    seen = []
+
+    predictions, errors = classify_batch(
+        client, "Categorize.", "abc", [make_event("1"), make_event("2")], "v001",
+        "gemini-2.5-flash-lite", 0.0, dedup=Deduplicator(namespace="test"),
+        on_prediction=lambda pred: seen.append(pred["id"]),
+    )
+
+    assert errors == [] and [pred["id"] for pred in predictions] == ["1", "2"]
+    assert sorted(seen) == ["1", "2"]
+
+
+def test_handoff_resumes_from_its_journal(tmp_path):
+    """Test journaled results are written first and written events skipped."""
+    with Journal(tmp_path / "phase2_journal.jsonl") as journal:
+        journal.record_result({"id": "1", "pred": json.loads(category_json())})
+        journal.record_result({"id": "2", "pred": json.loads(category_json())})
+        journal.record_written(["2"])
+    client = make_client([category_json()], client_class=Phase2GeminiClient)
+    supabase = FakeSupabase()
+    handoff = Phase2Handoff(
+        client=client,
+        supabase_client=supabase,
+        system_prompt="Categorize.",
+        prompt_hash="abc",
+        prompt_version="v001",
+        model="gemini-2.5-flash-lite",
+        run_dir=tmp_path,
+    )
+
+    handoff.submit([make_event("2"), make_event("3")])
+    stats = handoff.close()
+
+    assert [request[2]["service_request_id"] for request in supabase.requests] == ["eq.1", "eq.3"]
+    assert (stats["recovered"], stats["classified"], stats["written"]) == (2, 1, 2)
+    assert client.client.models.responses == []
+
+
+def test_write_predictions_upsert_sends_one_post_per_chunk():
+    """Test the opt-in upsert writes each chunk with a single on_conflict POST."""
+    supabase = FakeSupabase()
+    predictions = [{"id": str(i), "pred": json.loads(category_json())} for i in range(3)]
+
+    failed = write_predictions_to_supabase(supabase, predictions, chunk_size=2, upsert=True)
+
+    assert failed == []
+    assert [(method, path, params) for method, path, params, _, _ in supabase.requests] == [
+        ("POST", "/rest/v1/events", {"on_conflict": "service_request_id"}),
+    ] * 2
+    assert [len(body) for _, _, _, body, _ in supabase.requests] == [2, 1]
+    assert supabase.requests[0][3][0]["bike_issue_category"] == "Oberflächenqualität / Schäden"
@@ -0,0 +1,98 @@
+"""Tests for the streaming pipeline stages."""
+import threading
+import time
+
+import pytest
+
+from bikeclf.pipeline import OrderedWriter, prefetch_pages
+
+
+def make_fetch(pages):
+    """Return a fetch_page function serving ``pages`` by cursor."""
+    by_cursor = {}
+    cursor = None
+    for page in pages:
+        by_cursor[cursor] = page
+        cursor = page[-1]
+    calls = []
+
+    def fetch_page(cursor):
+        calls.append(cursor)
+        return by_cursor.get(cursor, [])
+
+    return fetch_page, calls
+
+
+def test_prefetch_pages_follows_keyset_cursor():
+    """Test pages are yielded in order and each fetch uses the previous last ID."""
+    fetch_page, calls = make_fetch([[1, 2], [3, 4], [5]])
+
+    pages = list(prefetch_pages(fetch_page, next_cursor=lambda page: page[-1]))
+
+    assert pages == [[1, 2], [3, 4], [5]]
+    assert calls == [None, 2, 4, 5]
+
+
+def test_prefetch_pages_fetches_ahead_of_consumer():
+    """Test the next page is fetched while the current one is processed."""
+    fetch_page, calls = make_fetch([[1], [2], [3]])
+    pages = prefetch_pages(fetch_page, next_cursor=lambda page: page[-1], depth=1)
+
+    assert next(pages) == [1]
+    deadline = time.monotonic() + 2
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(calls) >= 2
+    pages.close()
+
+
+def test_prefetch_pages_reraises_fetch_errors():
+    """Test errors from the prefetch thread surface in the consumer."""
+
+    def fetch_page(cursor):
+        if cursor is None:
+            return [1]
+        raise RuntimeError("Supabase API error: 500")
+
+    pages = prefetch_pages(fetch_page, next_cursor=lambda page: page[-1])
+    assert next(pages) == [1]
+    with pytest.raises(RuntimeError, match="500"):
+        next(pages)
+
+
+def test_ordered_writer_preserves_submission_order():
+    """Test items are written FIFO in a background thread."""
+    written = []
+    threads = set()
+
+    def write(item):
+        threads.add(threading.current_thread().name)
+        written.append(item)
+
+    with OrderedWriter(write, max_pending=1) as writer:
+        for i in range(10):
+            writer.submit(i)
+
+    assert written == list(range(10))
+    assert threads == {"bikeclf-writer"}
+
+
+def test_ordered_writer_reraises_and_stops_after_error():
+    """Test a write error is raised on close and later items are skipped."""
+    written = []
+
+    def write(item):
+        if item == 1:
+            raise RuntimeError("disk full")
+        written.append(item)
+
+    writer = OrderedWriter(write, max_pending=1)
+    writer.submit(0)
+    writer.submit(1)
+    time.sleep(0.05)
+    with pytest.raises(RuntimeError, match="disk full"):
+        for i in range(2, 5):
+            writer.submit(i)
+        writer.close()
+
+    assert written == [0]
@@ -0,0 +1,37 @@
+"""Tests for the PostgREST compilation of the LLM pre-filter."""
+from bikeclf.supabase import content_range_count
+from config.supabase_config import (
+    DEFINITELY_EXCLUDE,
+    postgrest_excluded_category_params,
+    postgrest_prefilter_params,
+    should_check_with_llm,
+)
+
+
+def test_prefilter_params_exclude_every_category():
+    """Test every excluded category is quoted in the not.in list."""
+    params = postgrest_prefilter_params()
+
+    assert params["description"] == "not.is.null"
+    assert params["or"].startswith("(service_name.is.null,service_name.not.in.(")
+    for name in DEFINITELY_EXCLUDE:
+        assert f'"{name}"' in params["or"]
+
+
+def test_excluded_category_params_match_local_reason():
+    """Test the per-category filter selects what the local check rejects."""
+    name = sorted(DEFINITELY_EXCLUDE)[0]
+    params = postgrest_excluded_category_params(name)
+
+    assert params == {"service_name": f"eq.{name}", "description": r"match.\S"}
+    assert should_check_with_llm(name, "Text") == (False, f"excluded_category: {name}")
+    for blank in (None, "", " \t\n"):
+        assert should_check_with_llm(name, blank) == (False, "no_description")
+
+
+def test_content_range_count():
+    """Test totals are parsed from PostgREST Content-Range headers."""
+    assert content_range_count("0-24/3573") == 3573
+    assert content_range_count("*/26") == 26
+    assert content_range_count("0-24/*") == 0
+    assert content_range_count(None) == 0
@@ -0,0 +1,82 @@
+"""Tests for the token-bucket rate limiter."""
+import time
+
+import pytest
+
+from bikeclf.config import APIConfig
+from bikeclf.rate_limit import ModelRateLimiters, RateLimiter, estimate_tokens, rpm_from_sleep
+
+
+def test_unlimited_limiter_never_waits():
+    """Test limiter without budgets is a no-op."""
+    limiter = RateLimiter()
+    assert not limiter.enabled
+    assert limiter.acquire(10_000) == 0.0
+
+
+def test_request_budget_paces_calls():
+    """Test RPM budget spaces requests once the burst is used up."""
+    limiter = RateLimiter(rpm=1200, headroom=1.0)  # 20 requests/second
+
+    start = time.monotonic()
+    for _ in range(30):
+        limiter.acquire()
+    elapsed = time.monotonic() - start
+
+    # 20 burst + 10 paced at 50ms each
+    assert 0.4 <= elapsed < 1.0
+
+
+def test_token_budget_allows_oversized_request_then_waits():
+    """Test a request larger than the bucket goes through but delays the next."""
+    limiter = RateLimiter(tpm=6000, headroom=1.0)  # 100 tokens/second
+
+    assert limiter.acquire(150) == 0.0
+    waited = limiter.acquire(10)
+    assert 0.4 <= waited < 0.8
+
+
+def test_estimate_tokens():
+    """Test token estimate includes reserved output tokens."""
+    assert estimate_tokens("x" * 400, max_output_tokens=512) == 612
+
+
+def test_default_budget_follows_model_quota():
+    """Test unset budgets default to the tier quota and explicit 0 disables pacing."""
+    config = APIConfig(api_key="key", requests_per_minute=None, tokens_per_minute=None, quota_tier="free")
+    assert config.rate_budget("gemini-2.5-flash") == (10, 250_000)
+    config.quota_tier = "tier1"
+    assert config.rate_budget("gemini-2.5-flash-lite") == (4_000, 4_000_000)
+
+    config.requests_per_minute = 0
+    assert config.rate_budget("gemini-2.5-flash") == (0, 1_000_000)
+    config.tokens_per_minute = 0
+    assert config.rate_budget("unknown-model") == (0, 0)
+
+
+def test_unknown_model_without_budget_is_refused():
+    """Test a model without a known quota needs an explicit budget."""
+    config = APIConfig(api_key="key", requests_per_minute=None, tokens_per_minute=None, quota_tier="free")
+    with pytest.raises(ValueError, match="--rpm"):
+        config.rate_budget("unknown-model")
+    config.quota_tier = "enterprise"
+    with pytest.raises(ValueError, match="GEMINI_TIER"):
+        config.validate_required()
+
+
+def test_model_limiters_are_created_once_per_model():
+    """Test per-model limiters use each model's budget and are reused."""
+    limiters = ModelRateLimiters({"a": (60, 0), "b": (0, 0)}.get)
+    assert limiters.for_model("a") is limiters.for_model("a")
+    assert limiters.for_model("a").rpm == 60
+    assert not limiters.for_model("b").enabled
+
+    shared = RateLimiter(rpm=60)
+    assert shared.for_model("a") is shared.for_model("b") is shared
+
+
+def test_sleep_maps_to_rpm():
+    """Test the deprecated --sleep seconds map to an RPM budget."""
+    assert rpm_from_sleep(0.1) == 600
+    assert rpm_from_sleep(2.0) == 30
+    assert rpm_from_sleep(0) == 0
@@ -0,0 +1,102 @@
+"""Tests for static shard ranges and lease-based range claiming."""
+import httpx
+import pytest
+
+from bikeclf.shards import (
+    LeaseKeeper,
+    SQLiteLeaseStore,
+    compute_boundaries,
+    parse_shard,
+    range_upper_params,
+    ranges_from_boundaries,
+    shard_range,
+)
+from bikeclf.supabase import SupabaseClient
+
+
+def test_parse_shard_validates_index():
+    """Test i/N parsing and bounds."""
+    assert parse_shard("1/4") == (1, 4)
+    for bad in ("4/4", "-1/2", "a/b", "3"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def offset_client(ids):
+    """SupabaseClient answering count and offset queries over ``ids`` (in DB order)."""
+
+    def handler(request):
+        params = request.url.params
+        if "offset" in params:
+            return httpx.Response(200, json=[{"service_request_id": ids[int(params["offset"])]}])
+        return httpx.Response(200, json=[], headers={"Content-Range": f"0-0/{len(ids)}"})
+
+    return SupabaseClient("https://example.supabase.co", "key", transport=httpx.MockTransport(handler))
+
+
+def test_compute_boundaries_uses_row_quantiles():
+    """Test boundaries are the last IDs of equal-sized parts."""
+    ids = [f"{i:03d}" for i in range(10)]
+    boundaries = compute_boundaries(offset_client(ids), 3)
+
+    assert boundaries == ["002", "005"]
+    assert ranges_from_boundaries(boundaries) == [(None, "002"), ("002", "005"), ("005", None)]
+    assert range_upper_params("005") == {"and": '(service_request_id.lte."005")'}
+    assert range_upper_params(None) == {}
+
+
+def test_compute_boundaries_keeps_database_collation_order():
+    """Test boundaries follow the database's order, not Python's."""
+    ids = ["a-1", "a-2", "B-1", "B-2", "c-1", "c-2"]  # Case-insensitive collation
+    assert compute_boundaries(offset_client(ids), 3) == ["a-2", "B-2"]
+    assert compute_boundaries(offset_client(["x"] * 4), 4) == ["x"]
+
+
+def test_shard_ranges_are_cut_once_per_job(tmp_path):
+    """Test every shard of a job gets its own range of the first cut."""
+    store = SQLiteLeaseStore(tmp_path / "leases.sqlite")
+    client = offset_client([f"{i:03d}" for i in range(10)])
+
+    ranges = [shard_range(store, "phase1:shards3", (i, 3), client) for i in range(3)]
+    assert ranges == [(None, "002"), ("002", "005"), ("005", None)]
+
+    few = offset_client(["001"])
+    assert shard_range(store, "phase1:shards3", (1, 3), few) == ("002", "005")
+    assert shard_range(store, "other:shards3", (1, 3), few) is None
+
+
+def test_leases_are_exclusive_until_expired(tmp_path):
+    """Test workers claim distinct ranges and take over expired ones with their cursor."""
+    store = SQLiteLeaseStore(tmp_path / "leases.sqlite")
+    store.create_ranges("job", [(None, "b"), ("b", None)])
+    store.create_ranges("job", [(None, "x")])  # Later workers keep the first split
+
+    first = store.claim("job", "worker-1", ttl=60)
+    second = store.claim("job", "worker-2", ttl=-1)  # Expires immediately
+    assert (first.range_id, second.range_id) == (0, 1)
+    assert store.claim("job", "worker-3", ttl=60).range_id == 1  # Took over the expired lease
+
+    assert store.renew(first, ttl=60, cursor="a")
+    assert not store.renew(second, ttl=60)  # worker-2 lost its lease
+
+
+def test_released_ranges_resume_from_cursor(tmp_path):
+    """Test an unfinished release keeps progress and done ranges stay done."""
+    store = SQLiteLeaseStore(tmp_path / "leases.sqlite")
+    store.create_ranges("job", [(None, "m"), ("m", None)])
+    keeper = LeaseKeeper(store, ttl=60)
+
+    lease = store.claim("job", "worker-1", ttl=60)
+    keeper.hold(lease)
+    keeper.progress(lease, "f")
+    keeper.release(lease, done=False)
+
+    resumed = store.claim("job", "worker-2", ttl=60)
+    assert (resumed.range_id, resumed.cursor) == (0, "f")
+    keeper.release(resumed, done=True)
+    other = store.claim("job", "worker-2", ttl=60)
+    keeper.release(other, done=True)
+    keeper.stop()
+
+    assert store.claim("job", "worker-3", ttl=60) is None
+    assert store.all_done("job")
@@ -0,0 +1,166 @@
+"""Tests for the shared Supabase client and bulk write-back."""
+import gzip
+import json
+
+import httpx
+import pytest
+
+from bikeclf.supabase import SupabaseClient, SupabaseError, bulk_write
+
+
+class FakeSupabase:
+    """Records requests and rejects any chunk containing a bad row."""
+
+    def __init__(self, bad_ids=(), functions=()):
+        self.bad_ids = set(bad_ids)
+        self.functions = set(functions)
+        self.requests = []
+
+    def request_json(self, method, path, params=None, body=None, headers=None):
+        self.requests.append((method, path, params, body, headers))
+        if method == "PATCH":
+            rows = [{"service_request_id": params["service_request_id"].removeprefix("eq.")}]
+        elif path.startswith("/rest/v1/rpc/"):
+            if path.rsplit("/", 1)[1] not in self.functions:
+                raise SupabaseError(404, "Could not find the function")
+            rows = body["rows"]
+        else:
+            rows = body
+        if any(row["service_request_id"] in self.bad_ids for row in rows):
+            raise SupabaseError(400, "bad row")
+        return None
+
+
+def make_rows(n):
+    return [{"service_request_id": str(i), "bike_related": True} for i in range(n)]
+
+
+def test_bulk_write_patches_existing_rows_by_default():
+    """Test rows are updated one PATCH per row, never inserted."""
+    client = FakeSupabase()
+    failed = bulk_write(client, make_rows(3))
+
+    assert failed == []
+    assert [(r[0], r[2], r[3]) for r in client.requests] == [
+        ("PATCH", {"service_request_id": f"eq.{i}"}, {"bike_related": True}) for i in range(3)
+    ]
+
+
+def test_bulk_write_chunks_rows_into_opt_in_upserts():
+    """Test upsert mode sends merge-duplicates upserts of chunk_size rows."""
+    client = FakeSupabase()
+    failed = bulk_write(client, make_rows(5), chunk_size=2, upsert=True)
+
+    assert failed == []
+    assert [len(r[3]) for r in client.requests] == [2, 2, 1]
+    method, path, params, _, headers = client.requests[0]
+    assert (method, path) == ("POST", "/rest/v1/events")
+    assert params == {"on_conflict": "service_request_id"}
+    assert "merge-duplicates" in headers["Prefer"]
+
+
+def test_bulk_write_uses_rpc_function():
+    """Test RPC mode posts {"rows": [...]} to the function endpoint."""
+    client = FakeSupabase(functions={"update_bike_classifications"})
+    bulk_write(client, make_rows(3), rpc_function="update_bike_classifications")
+
+    assert len(client.requests) == 1
+    _, path, _, body, _ = client.requests[0]
+    assert path == "/rest/v1/rpc/update_bike_classifications"
+    assert len(body["rows"]) == 3
+
+
+def test_bulk_write_falls_back_to_patch_without_rpc_function():
+    """Test a missing RPC function is tried once, then rows are PATCHed."""
+    client = FakeSupabase(bad_ids={"4"})
+    failed = bulk_write(client, make_rows(6), chunk_size=3, rpc_function="update_bike_classifications", retries=1)
+
+    assert failed == ["4"]
+    assert [r[0] for r in client.requests] == ["POST"] + ["PATCH"] * 6
+
+
+def test_bulk_write_bisects_to_isolate_bad_rows():
+    """Test a failing chunk is split until only the bad rows are dropped."""
+    client = FakeSupabase(bad_ids={"3", "6"})
+    failed = bulk_write(client, make_rows(8), chunk_size=8, retries=1, upsert=True)
+
+    assert sorted(failed) == ["3", "6"]
+    written = {
+        row["service_request_id"]
+        for _, _, _, body, _ in client.requests
+        for row in body
+        if not client.bad_ids.intersection(r["service_request_id"] for r in body)
+    }
+    assert written == {"0", "1", "2", "4", "5", "7"}
+
+
+def make_client(handler, **kwargs):
+    """Build a SupabaseClient backed by an in-process mock transport."""
+    kwargs.setdefault("retry_delay", 0.0)
+    return SupabaseClient(
+        "https://example.supabase.co/",
+        "secret",
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+def test_client_sends_auth_headers_and_postgrest_params():
+    """Test auth headers and unescaped PostgREST filter syntax."""
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=[{"service_request_id": "1"}])
+
+    client = make_client(handler)
+    rows = client.request_json(
+        "GET", "/rest/v1/events", params={"service_name": "not.in.(a,b)"}
+    )
+
+    assert rows == [{"service_request_id": "1"}]
+    request = seen[0]
+    assert request.headers["apikey"] == "secret"
+    assert request.headers["Authorization"] == "Bearer secret"
+    assert "gzip" in request.headers["Accept-Encoding"]
+    assert "not.in.(a,b)" in str(request.url)
+
+
+def test_client_gzips_large_request_bodies():
+    """Test bodies above the threshold are sent gzip-compressed when enabled."""
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(201)
+
+    client = make_client(handler, compress_requests=True)
+    body = make_rows(200)
+    assert client.request_json("POST", "/rest/v1/events", body=body) is None
+
+    request = seen[0]
+    assert request.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(request.content)) == body
+
+
+def test_client_retries_server_errors_but_not_client_errors():
+    """Test 5xx responses are retried and 4xx responses raise immediately."""
+    statuses = [503, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json={})
+
+    client = make_client(handler)
+    assert client.request_json("GET", "/rest/v1/events") == {}
+    assert statuses == []
+
+    calls = []
+
+    def bad_request(request):
+        calls.append(request)
+        return httpx.Response(400, text="bad filter")
+
+    client = make_client(bad_request)
+    with pytest.raises(RuntimeError, match="400 bad filter"):
+        client.request_json("GET", "/rest/v1/events")
+    assert len(calls) == 1
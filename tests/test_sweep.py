@@ -0,0 +1,74 @@
+"""Tests for prompt/model/temperature sweeps."""
+import json
+
+from bikeclf.phase1.eval import classify_row
+from bikeclf.sweep import (
+    SweepConfig,
+    expand_grid,
+    parse_list,
+    rank_leaderboard,
+    run_sweep,
+    write_leaderboard,
+)
+from tests.test_gemini_client import make_client, output_json
+
+
+def test_parse_list_flattens_repeated_and_comma_separated_values():
+    """Test CLI values are split on commas, stripped and deduplicated."""
+    assert parse_list(["v001,v002", " v003 ", "v001", ""]) == ["v001", "v002", "v003"]
+
+
+def test_run_sweep_groups_results_per_config_in_row_order():
+    """Test every (row, config) pair runs once and results keep dataset order."""
+    configs = expand_grid(["v001", "v002"], ["m1"], [0.0, 0.5])
+    progress = []
+
+    results = run_sweep(
+        lambda config, row: (config.prompt_version, config.temperature, row),
+        configs,
+        [1, 2, 3],
+        concurrency=4,
+        on_done=lambda done, total: progress.append((done, total)),
+    )
+
+    assert len(configs) == 4
+    assert progress[-1] == (12, 12)
+    assert results[SweepConfig("v002", "m1", 0.5)] == [("v002", 0.5, 1), ("v002", 0.5, 2), ("v002", 0.5, 3)]
+
+
+def test_sweep_classifies_rows_with_each_prompt_version():
+    """Test sweep rows go through the same classification path as evaluate."""
+    client = make_client([output_json("true"), output_json("false")])
+    row = {"id": "1", "subject": "Radweg", "description": "Schlagloch", "gold_label": "true"}
+    prompts = {"v001": "Prompt one", "v002": "Prompt two"}
+
+    results = run_sweep(
+        lambda config, r: classify_row(
+            client, r, prompts[config.prompt_version], config.prompt_version, config.model_id
+        ),
+        expand_grid(["v001", "v002"], ["gemini-2.5-flash-lite"], [0.0]),
+        [row],
+    )
+
+    (v1,), (v2,) = results.values()
+    assert v1[0].meta.prompt_version == "v001" and v1[0].pred.label == "true"
+    assert v2[0].meta.prompt_version == "v002" and v2[0].pred.label == "false"
+    assert v1[1] is None and v2[1] is None
+
+
+def test_leaderboard_ranks_by_macro_f1_with_failed_configs_last(tmp_path):
+    """Test ranking order and the combined leaderboard file."""
+    entries = [
+        {"prompt_version": "v001", "macro_f1": 0.7, "accuracy": 0.8},
+        {"prompt_version": "v002", "macro_f1": None, "accuracy": None},
+        {"prompt_version": "v003", "macro_f1": 0.9, "accuracy": 0.85},
+    ]
+
+    ranked = write_leaderboard(tmp_path / "leaderboard.json", entries, {"sweep_id": "s1"})
+
+    assert [e["prompt_version"] for e in ranked] == ["v003", "v001", "v002"]
+    assert [e["rank"] for e in ranked] == [1, 2, 3]
+    saved = json.loads((tmp_path / "leaderboard.json").read_text(encoding="utf-8"))
+    assert saved["sweep_id"] == "s1"
+    assert saved["leaderboard"] == ranked
+    assert rank_leaderboard([]) == []
@@ -0,0 +1,100 @@
+"""Tests for per-stage timing histograms."""
+import json
+
+from bikeclf import timing
+from bikeclf.concurrency import map_concurrent
+from bikeclf.config import APIConfig
+from bikeclf.fake_backend import FakeBackend, FakeBackendConfig
+from bikeclf.gemini_client import GeminiClient
+from bikeclf.pipeline import OrderedWriter, prefetch_pages
+from bikeclf.timing import Timings, percentile, recording, span
+
+
+def test_percentile_interpolates():
+    """Test linear interpolation between ranks."""
+    assert percentile([], 50) is None
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([5.0], 99) == 5.0
+
+
+def test_spans_record_only_while_recording():
+    """Test span is a no-op without an active recorder and records errors too."""
+    with span("fetch"):
+        pass
+    timings = Timings()
+    with recording(timings):
+        with span("fetch"):
+            pass
+        try:
+            with span("write"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+    with span("fetch"):
+        pass
+
+    stages = timings.summary()["stages"]
+    assert list(stages) == ["fetch", "write"]
+    assert stages["fetch"]["count"] == 1 and stages["write"]["count"] == 1
+    assert timing.active() is None
+
+
+def test_recorder_follows_context_into_pipeline_threads():
+    """Test worker, prefetch and writer threads record into the caller's Timings."""
+    timings = Timings()
+    pages = iter([[1, 2], [3], []])
+
+    def fetch(cursor):
+        with span("fetch"):
+            return next(pages)
+
+    def write(item):
+        with span("write"):
+            pass
+
+    def classify(item):
+        with span("llm_wait"):
+            return item
+
+    with recording(timings):
+        with OrderedWriter(write) as writer:
+            for page in prefetch_pages(fetch, next_cursor=lambda page: str(page[-1])):
+                map_concurrent(classify, page, concurrency=2)
+                writer.submit(page)
+
+    stages = timings.summary()["stages"]
+    assert stages["fetch"]["count"] == 3
+    assert stages["llm_wait"]["count"] == 3
+    assert stages["write"]["count"] == 2
+
+
+def test_client_records_llm_stages(tmp_path):
+    """Test a classification records rate-limit wait, LLM wait and validation."""
+    backend = FakeBackend(FakeBackendConfig.parse("latency=fixed:0"))
+    client = GeminiClient(APIConfig(api_key="", backend="fake"), backend=backend)
+    timings = Timings()
+    with recording(timings):
+        client.classify_with_retry("Radweg blockiert", "gemini-2.5-flash-lite")
+
+    stages = timings.summary()["stages"]
+    assert [stages[s]["count"] for s in ("rate_limit_wait", "llm_wait", "parse_validate")] == [1, 1, 1]
+
+    timings.write_json(tmp_path / "timings.json")
+    saved = json.loads((tmp_path / "timings.json").read_text(encoding="utf-8"))
+    assert set(saved["stages"]["llm_wait"]) >= {"count", "total_seconds", "p50_ms", "p95_ms", "p99_ms"}
+
+
+def test_prometheus_text_has_cumulative_buckets(tmp_path):
+    """Test the exposition format: cumulative buckets, +Inf, sum and count."""
+    timings = Timings(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.05, 0.5):
+        timings.observe("write", seconds)
+
+    path = tmp_path / "metrics.prom"
+    timings.write_prometheus(path, labels={"run": 'a"b'})
+    lines = path.read_text(encoding="utf-8").splitlines()
+
+    assert 'bikeclf_stage_duration_seconds_bucket{run="a\\"b",stage="write",le="0.01"} 1' in lines
+    assert 'bikeclf_stage_duration_seconds_bucket{run="a\\"b",stage="write",le="0.1"} 2' in lines
+    assert 'bikeclf_stage_duration_seconds_bucket{run="a\\"b",stage="write",le="+Inf"} 3' in lines
+    assert 'bikeclf_stage_duration_seconds_count{run="a\\"b",stage="write"} 3' in lines
@@ -0,0 +1,94 @@
+"""Tests for token usage and cost accounting."""
+from types import SimpleNamespace
+
+import pytest
+
+from bikeclf.cache import ResponseCache
+from bikeclf.concurrency import map_concurrent
+from bikeclf.config import APIConfig
+from bikeclf.fake_backend import FakeBackend, FakeBackendConfig
+from bikeclf.gemini_client import GeminiClient
+from bikeclf.phase1.eval import classify_row
+from bikeclf.usage import UsageMeter, estimate_cost, metering, record
+
+
+def response(prompt=0, output=0, cached=None):
+    return SimpleNamespace(
+        text="{}",
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=prompt,
+            candidates_token_count=output,
+            cached_content_token_count=cached,
+            thoughts_token_count=None,
+        ),
+    )
+
+
+def fake_client(cache=None):
+    backend = FakeBackend(FakeBackendConfig.parse("latency=fixed:0"))
+    return GeminiClient(APIConfig(api_key="", backend="fake"), backend=backend, cache=cache)
+
+
+def test_cost_bills_cached_prompt_tokens_at_cache_rate():
+    """Test cached tokens are priced separately and unknown models have no cost."""
+    counts = {"prompt_tokens": 1_000_000, "cached_tokens": 400_000, "output_tokens": 100_000}
+    # 600k input at $0.10 + 400k cached at $0.025 + 100k output at $0.40
+    assert estimate_cost("gemini-2.0-flash-001", counts) == pytest.approx(0.06 + 0.01 + 0.04)
+    assert estimate_cost("local-gate", counts) is None
+
+    meter = UsageMeter()
+    meter.add("gemini-2.0-flash-001", {"calls": 1, **counts})
+    meter.add("local-gate", {"calls": 1, "prompt_tokens": 10})
+    summary = meter.summary(events=2)
+    assert summary["calls"] == 2 and summary["cost_usd"] is None
+    assert summary["by_model"]["gemini-2.0-flash-001"]["cost_usd"] == pytest.approx(0.11)
+
+
+def test_nested_meters_follow_context_into_worker_threads():
+    """Test calls count towards every active meter, also from map_concurrent workers."""
+    run = UsageMeter()
+    record("gemini-2.5-flash", response(prompt=100))  # No active meter: ignored
+
+    def classify(item):
+        with metering(UsageMeter()) as row:
+            record("gemini-2.5-flash", response(prompt=100, output=10))
+        return row.total().prompt_tokens
+
+    with metering(run):
+        assert map_concurrent(classify, range(4), concurrency=2) == [100] * 4
+        record("gemini-2.5-flash", SimpleNamespace(text="{}"))  # No usage_metadata
+
+    summary = run.summary(events=4)
+    assert (summary["calls"], summary["prompt_tokens"], summary["output_tokens"]) == (4, 400, 40)
+    assert summary["tokens_per_event"] == 110.0
+    assert summary["cost_per_1k_events"] == pytest.approx((100 * 0.30 + 10 * 2.50) / 1_000_000 * 1000)
+
+
+def test_client_records_usage_but_not_response_cache_hits(tmp_path):
+    """Test API responses are metered while cached answers cost nothing."""
+    client = fake_client(cache=ResponseCache(tmp_path / "responses.sqlite"))
+    meter = UsageMeter()
+    with metering(meter):
+        client.classify_with_retry("Radweg blockiert", "gemini-2.5-flash-lite")
+        client.classify_with_retry("Radweg blockiert", "gemini-2.5-flash-lite")
+
+    usage = meter.total()
+    assert usage.calls == 1
+    assert usage.prompt_tokens > 0 and usage.output_tokens > 0
+    assert usage.cost_usd > 0
+
+
+def test_prediction_meta_includes_escalation_tokens():
+    """Test a cascaded row's usage covers both models."""
+    client = fake_client()
+    row = {"id": "1", "subject": "Radweg", "description": "Schlagloch", "gold_label": "true"}
+
+    prediction, error = classify_row(
+        client, row, "Prompt", "v001", "gemini-2.5-flash-lite",
+        cascade_model="gemini-2.5-flash", cascade_threshold=1.1,
+    )
+
+    assert error is None
+    assert prediction.meta.cascade.escalated
+    assert prediction.meta.usage.calls == 2
+    assert prediction.meta.usage.cost_usd > 0